@@ -0,0 +1,133 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from checksum_pool import ChecksumPool, part_digest, part_ranges
+
+
+def bench_serial(file_paths, part_size):
+    """
+    Per-part digests computed one after another on the main thread.
+
+    """
+    for file_path in file_paths:
+        for offset, length in part_ranges(os.path.getsize(file_path), part_size):
+            part_digest(file_path, offset, length)
+
+
+def bench_threads(file_paths, part_size, workers):
+    """
+    Per-part digests computed within a thread pool (i.e. sharing the GIL w/ the transfer threads).
+
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(part_digest, file_path, offset, length)
+                   for file_path in file_paths
+                   for offset, length in part_ranges(os.path.getsize(file_path), part_size)]
+        [future.result() for future in futures]
+
+
+def bench_processes(file_paths, part_size, workers):
+    """
+    Per-part digests computed within the ChecksumPool.
+
+    """
+    with ChecksumPool(max_workers=workers) as pool:
+        futures = [future for file_path in file_paths for future in pool.submit_part_digests(file_path, part_size)]
+        [future.result() for future in futures]
+
+
+def bench_upload(file_paths, part_size, workers, endpoint_url, bucket, checksums):
+    """
+    End-to-end memory-mapped uploads of the data files, one after another, w/out checksums
+    or w/ the per-part Content-MD5 & ETag computed within a thread pool or the ChecksumPool.
+
+    Return (float): Seconds spent uploading.
+
+    """
+    from transfer_session import TransferSession
+    from upload_data import UploadData
+
+    bucket_name, profile_name = UploadData.BUCKETS[bucket]
+    pool = ChecksumPool(max_workers=workers, use_processes=checksums == 'processes') if checksums else None
+    with TransferSession(profile_name, endpoint_url=endpoint_url) as session:
+        uploader = UploadData(None, bucket, checksum_pool=pool, transfer_session=session)
+        start_time = time.time()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for file_path in file_paths:
+                uploader.work_dir = os.path.dirname(file_path) + '/'
+                uploader.upload_single_file_mmap(os.path.basename(file_path),
+                                                 f"benchmarks/checksums/{os.path.basename(file_path)}",
+                                                 part_size=part_size)
+        delta = time.time() - start_time
+        session.s3.Bucket(bucket_name).objects.filter(Prefix='benchmarks/checksums/').delete()
+    if pool is not None:
+        pool.shutdown()
+
+    return delta
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Benchmark per-part checksums: serial vs threads vs processes.")
+    parser.add_argument('files', nargs='*', help="Data files to hash. If none, synthetic files are generated.")
+    parser.add_argument('--part-mb', type=int, default=50, help="Part size in MB.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--synthetic-gb', type=float, default=2.0, help="Total size of the synthetic files.")
+    parser.add_argument('--upload', action='store_true',
+                        help="Also time end-to-end uploads w/out checksums vs w/ the thread pool vs w/ the process pool.")
+    parser.add_argument('--bucket', default='srw', help="Bucket of the uploads ('rt', 'srw' or 'mrw').")
+    parser.add_argument('--endpoint-url', default=None,
+                        help="S3-compatible endpoint of the uploads (e.g. a MinIO server). If unset, a moto "
+                             "server is started unless '--real-bucket' is set.")
+    parser.add_argument('--real-bucket', action='store_true', help="Upload to the real bucket (requires bucket credentials).")
+    args = parser.parse_args()
+
+    MB = 1024**2
+    part_size = args.part_mb * MB
+    tmp_dir = None
+    file_paths = args.files
+    if not file_paths:
+        tmp_dir = tempfile.TemporaryDirectory()
+        n_files = 4
+        file_size = int(args.synthetic_gb * 1024**3 / n_files)
+        for i in range(n_files):
+            file_path = os.path.join(tmp_dir.name, f"synthetic_{i}.grib2")
+            with open(file_path, 'wb') as f:
+                for _ in range(file_size // MB):
+                    f.write(os.urandom(MB))
+            file_paths.append(file_path)
+    total_bytes = sum(os.path.getsize(file_path) for file_path in file_paths)
+
+    # Warm the page cache so each mode measures CPU rather than disk throughput.
+    bench_serial(file_paths, part_size)
+
+    print(f"{len(file_paths)} files, {total_bytes / MB:.0f} MB, part size {args.part_mb} MB, "
+          f"{args.workers} workers, {os.cpu_count()} CPUs\n")
+    print(f"{'mode':<12}{'seconds':>10}{'MB/s':>12}")
+    for mode, func, func_args in [('serial', bench_serial, (file_paths, part_size)),
+                                  ('threads', bench_threads, (file_paths, part_size, args.workers)),
+                                  ('processes', bench_processes, (file_paths, part_size, args.workers))]:
+        start_time = time.time()
+        func(*func_args)
+        delta = time.time() - start_time
+        print(f"{mode:<12}{delta:>10.2f}{total_bytes / MB / delta:>12.1f}")
+
+    if args.upload:
+        from mock_s3 import mock_endpoint
+        endpoint = contextlib.nullcontext() if args.real_bucket else mock_endpoint(args.endpoint_url)
+        with endpoint as endpoint_url:
+            print(f"\nEnd-to-end upload -> {endpoint_url or 'cloud'}\n")
+            print(f"{'checksums':<12}{'seconds':>10}{'MB/s':>12}")
+            for checksums in [None, 'threads', 'processes']:
+                delta = bench_upload(file_paths, part_size, args.workers, endpoint_url, args.bucket, checksums)
+                print(f"{checksums or 'none':<12}{delta:>10.2f}{total_bytes / MB / delta:>12.1f}")
+
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
@@ -0,0 +1,160 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from get_srw_data import GetSrwData
+from srw_tree import srw_layout, build_tree, build_tar, cycle_name
+
+
+def discovery_phases(srw, extract_dir, n_cycles=2):
+    """
+    Discovery phases of GetSrwData in the order GetSrwData.scan runs them, each storing its
+    result on the instance for the phases which follow.
+
+    Args:
+        srw (GetSrwData): Instance created w/ scan=False.
+        extract_dir (str): Working directory the tars are extracted into.
+        n_cycles (int): Number of cycles selected by the timestamp filter.
+
+    Return (list): (phase name, function) pairs.
+
+    """
+    timestamps = [cycle_name(cycle) for cycle in range(n_cycles)]
+
+    def walk(data_type, attr):
+        def phase():
+            setattr(srw, attr, srw.get_data_dirs(data_type))
+        return phase
+
+    def partition(method, attr):
+        def phase():
+            setattr(srw, attr, method())
+        return phase
+
+    def specific():
+        srw.get_specific_model_analysis_files(timestamps, timestamps, timestamps, timestamps, timestamps)
+
+    def tar(dataset_type, attr):
+        def phase():
+            shutil.rmtree(extract_dir, ignore_errors=True)
+            os.makedirs(extract_dir)
+            cwd = os.getcwd()
+            os.chdir(extract_dir)
+            try:
+                setattr(srw, attr, srw.get_tar_data_dirs(dataset_type))
+            finally:
+                os.chdir(cwd)
+        return phase
+
+    phases = [('get_data_dirs[input_model_data]', walk('input_model_data', 'ma_file_dirs')),
+              ('get_data_dirs[fix_data]', walk('fix_data', 'fix_file_dirs')),
+              ('get_data_dirs[ne_data]', walk('ne_data', 'ne_dirs')),
+              ('get_model_analysis_data', partition(srw.get_model_analysis_data, 'partition_ma_datasets')),
+              ('get_specific_model_analysis_files', specific),
+              ('get_fixed_data', partition(srw.get_fixed_data, 'partition_fixed_datasets')),
+              ('get_ne_data', partition(srw.get_ne_data, 'partition_ne_datasets'))]
+    if srw.input_model_data_dir is not None:
+        phases.append(('get_tar_data_dirs[input_model_data]', tar('input_model_data', 'ma_data_list')))
+    if srw.fix_data_dir is not None:
+        phases.append(('get_tar_data_dirs[fix_data]', tar('fix_data', 'fix_data_list')))
+
+    return phases
+
+
+def measure(phase, trace_memory):
+    """
+    Args:
+        phase (function): Discovery phase.
+        trace_memory (bool): If set, the phase is run again under tracemalloc.
+
+    Return (tuple): (seconds, MB retained, MB peak). The memory is None unless traced.
+
+    """
+    # Timed w/out tracing, which would slow the phase down several fold. The phases'
+    # listings are discarded rather than printed.
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start_time = time.perf_counter()
+        phase()
+        delta = time.perf_counter() - start_time
+        if not trace_memory:
+            return delta, None, None
+
+        tracemalloc.start()
+        phase()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return delta, current / 1024**2, peak / 1024**2
+
+
+def run(srw_data_root, fix_tar, ma_tar, work_dir, args):
+    """
+    Time (& memory-profile) each discovery phase over one SRW tree.
+
+    Return: None
+
+    """
+    srw = GetSrwData(None, None, None, None, fix_tar, ma_tar, None, None,
+                     extract_workers=args.extract_workers, srw_data_root=srw_data_root, scan=False)
+    print(f"{'phase':<40}{'s':>10}{'retained MB':>14}{'peak MB':>10}")
+    total = 0.0
+    for name, phase in discovery_phases(srw, os.path.join(work_dir, 'extract'), args.cycles):
+        delta, current, peak = measure(phase, args.trace_memory)
+        total += delta
+        memory = f"{current:>14.1f}{peak:>10.1f}" if current is not None else f"{'-':>14}{'-':>10}"
+        print(f"{name:<40}{delta:>10.2f}{memory}")
+    print(f"{'total':<40}{total:>10.2f}\n")
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Time & memory-profile the GetSrwData discovery phases on synthetic SRW trees.")
+    parser.add_argument('--n-files', type=int, nargs='+', default=[10000, 100000],
+                        help="Sizes of the synthetic trees (e.g. 10000 100000 1000000 10000000).")
+    parser.add_argument('--root', default=None,
+                        help="Existing SRW tree (e.g. written by srw_tree.py) to profile rather than synthetic ones.")
+    parser.add_argument('--fix-tar', default=None, help="fix tar of '--root' (default: <root>/fix.tar if present).")
+    parser.add_argument('--ma-tar', default=None,
+                        help="input_model_data tar of '--root' (default: <root>/input_model_data.tar if present).")
+    parser.add_argument('--dir', default=None, help="Folder for the synthetic trees & extractions (e.g. on the parallel filesystem).")
+    parser.add_argument('--no-tars', action='store_true', help="Skip the tar listing & extraction phases.")
+    parser.add_argument('--trace-memory', action='store_true', help="Also run each phase under tracemalloc.")
+    parser.add_argument('--cycles', type=int, default=2, help="Cycles selected by the timestamp filter.")
+    parser.add_argument('--extract-workers', type=int, default=16)
+    args = parser.parse_args()
+
+    if args.dir is not None:
+        os.makedirs(args.dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(dir=args.dir)
+    try:
+        if args.root is not None:
+            fix_tar = args.fix_tar or os.path.join(args.root, 'fix.tar')
+            ma_tar = args.ma_tar or os.path.join(args.root, 'input_model_data.tar')
+            fix_tar = fix_tar if os.path.exists(fix_tar) and not args.no_tars else None
+            ma_tar = ma_tar if os.path.exists(ma_tar) and not args.no_tars else None
+            print(f"SRW tree: {args.root}\n")
+            run(args.root, fix_tar, ma_tar, work_dir, args)
+        for n_files in ([] if args.root is not None else args.n_files):
+            tree_dir = os.path.join(work_dir, f"srw_{n_files}")
+            start_time = time.perf_counter()
+            layout = srw_layout(n_files)
+            build_tree(tree_dir, layout)
+            fix_tar = ma_tar = None
+            if not args.no_tars:
+                fix_tar = os.path.join(tree_dir, 'fix.tar')
+                ma_tar = os.path.join(tree_dir, 'input_model_data.tar')
+                build_tar(fix_tar, 'fix', layout['fix'])
+                build_tar(ma_tar, 'input_model_data', layout['input_model_data'])
+            del layout
+            print(f"Synthetic SRW tree: {n_files} data files (written in {time.perf_counter() - start_time:.1f} s)\n")
+            run(tree_dir, fix_tar, ma_tar, work_dir, args)
+            shutil.rmtree(tree_dir, ignore_errors=True)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
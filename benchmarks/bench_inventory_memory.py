@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from path_inventory import PathInventory
+
+ROOT_DIR = "/home/schin/work/noaa/fv3-cam/UFS_SRW_App/develop/input_model_data"
+
+# File names per cycle of each external model (w/ the cycle hour & forecast hour filled in).
+MODEL_FILES = {'FV3GFS/grib2': "gfs.t{hh}z.pgrb2.0p25.f{fhr:03d}",
+               'FV3GFS/nemsio': "gfs.t{hh}z.atmf{fhr:03d}.nemsio",
+               'HRRR': "hrrr.t{hh}z.wrfprsf{fhr:02d}.grib2",
+               'RAP': "rap.t{hh}z.wrfprsf{fhr:02d}.grib2",
+               'NAM': "nam.t{hh}z.conusnest.hiresf{fhr:02d}.tm00.grib2",
+               'GSMGFS': "gfs.t{hh}z.atmf{fhr:03d}.nemsio"}
+FORECAST_HOURS = 49
+
+
+def synthetic_walk(n_files):
+    """
+    Synthetic walk of an SRW input model data tree (no files on disk): one folder per
+    model & cycle, each holding the forecast hours of the cycle.
+
+    Args:
+        n_files (int): Number of data files to generate.
+
+    Return (generator): Yields (root_dir, subfolders, filenames) tuples as os.walk.
+
+    """
+    count, cycle = 0, 0
+    while count < n_files:
+        day, hh = divmod(cycle, 4)
+        ymdh = f"2019{1 + day // 28 % 12:02d}{1 + day % 28:02d}{6 * hh:02d}"
+        for model, pattern in MODEL_FILES.items():
+            n = min(FORECAST_HOURS, n_files - count)
+            if n <= 0:
+                break
+            filenames = [pattern.format(hh=f"{6 * hh:02d}", fhr=fhr) for fhr in range(n)]
+            count += n
+            yield os.path.join(ROOT_DIR, model, ymdh), [], filenames
+        cycle += 1
+
+
+def build_lists(n_files):
+    """
+    Previous layout: a list of full path strings & partitions copying the paths.
+
+    """
+    file_dirs = []
+    for root_dir, subfolders, filenames in synthetic_walk(n_files):
+        for file in filenames:
+            file_dirs.append(os.path.join(root_dir, file))
+    partitions = defaultdict(list)
+    for file_dir in file_dirs:
+        for model in ['FV3GFS', 'GSMGFS', 'HRRR', 'NAM', 'RAP']:
+            if model in file_dir:
+                partitions[model].append(file_dir.replace("./", ""))
+
+    return file_dirs, partitions
+
+
+def build_inventory(n_files):
+    """
+    Compact layout: a PathInventory & partitions as views over it.
+
+    """
+    inventory = PathInventory()
+    inventory.add_walk(synthetic_walk(n_files))
+    file_dirs = inventory.view()
+    partitions = file_dirs.partition(['FV3GFS', 'GSMGFS', 'HRRR', 'NAM', 'RAP'], replace=("./", ""))
+
+    return file_dirs, partitions
+
+
+def measure(build, n_files):
+    """
+    Args:
+        build (function): Builds the file directories & partitions.
+        n_files (int): Number of data files.
+
+    Return (tuple): (MB retained, MB peak while building, build seconds, iteration seconds).
+
+    """
+    # Timed w/out tracing, which would slow the build down several fold.
+    start_time = time.perf_counter()
+    file_dirs, partitions = build(n_files)
+    build_secs = time.perf_counter() - start_time
+    del file_dirs, partitions
+
+    tracemalloc.start()
+    file_dirs, partitions = build(n_files)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Walk every partition's paths, as upload_files2cloud does.
+    start_time = time.perf_counter()
+    n = sum(len(file_dir) for ts_files in partitions.values() for file_dir in ts_files)
+    iter_secs = time.perf_counter() - start_time
+    assert n > 0 and len(file_dirs) == n_files
+
+    return current / 1024**2, peak / 1024**2, build_secs, iter_secs
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Memory of the path lists vs the compact inventory on a synthetic tree.")
+    parser.add_argument('--n-files', type=int, default=1000000)
+    args = parser.parse_args()
+
+    sample = next(synthetic_walk(1))
+    print(f"{args.n_files} synthetic data files (e.g. {os.path.join(sample[0], sample[2][0])})\n")
+    print(f"{'layout':<12}{'retained MB':>14}{'peak MB':>10}{'B/file':>10}{'build s':>10}{'iterate s':>11}")
+    results = {}
+    for layout, build in [('lists', build_lists), ('inventory', build_inventory)]:
+        results[layout] = current, peak, build_secs, iter_secs = measure(build, args.n_files)
+        print(f"{layout:<12}{current:>14.1f}{peak:>10.1f}{current * 1024**2 / args.n_files:>10.0f}"
+              f"{build_secs:>10.2f}{iter_secs:>11.2f}")
+    print(f"\nRetained memory reduced {results['lists'][0] / results['inventory'][0]:.1f}x")
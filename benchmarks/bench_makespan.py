@@ -0,0 +1,60 @@
+import os
+import sys
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from makespan import MakespanScheduler, sized_items
+
+
+def synthetic_mix(n_fix, n_ma, seed=0):
+    """
+    Synthetic fix & input_model_data mix: many small-to-medium fix files & a tail of
+    multi-GB GRIB2/nemsio analyses.
+
+    Args:
+        n_fix (int): Number of fix data files.
+        n_ma (int): Number of input model data files.
+        seed (int): Random seed.
+
+    Return (list): ((dataset_type, file_dir), size) pairs in listing order.
+
+    """
+    rng = random.Random(seed)
+    items = [(('fix', f"fix/fix_am/file_{i:05d}.nc"), int(rng.lognormvariate(13, 2))) for i in range(n_fix)]
+    for i in range(n_ma):
+        size = int(rng.uniform(1, 4) * 1024**3) if rng.random() < 0.05 else int(rng.lognormvariate(17, 1.5))
+        items.append((('FV3GFS', f"input_model_data/FV3GFS/grib2/file_{i:05d}.grib2"), size))
+
+    return items
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Expected makespan of the listing order vs the size-aware schedule.")
+    parser.add_argument('--tree', nargs='*', default=None, help="Folders to scan (e.g. develop/fix develop/input_model_data).")
+    parser.add_argument('--n-fix', type=int, default=20000)
+    parser.add_argument('--n-ma', type=int, default=3000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[4, 8, 16, 32])
+    parser.add_argument('--throughput-mbps', type=float, default=50)
+    parser.add_argument('--batch-size', type=int, default=50, help="Claim batch size of the listing order.")
+    args = parser.parse_args()
+
+    if args.tree:
+        file_relative_dirs = {}
+        for folder in args.tree:
+            file_relative_dirs[folder] = [os.path.join(root, f) for root, _, files in os.walk(folder, followlinks=True)
+                                          for f in sorted(files)]
+        items = sized_items(file_relative_dirs)
+    else:
+        items = synthetic_mix(args.n_fix, args.n_ma)
+    total = sum(size for _, size in items)
+    print(f"{len(items)} data files, {total / 1024**3:.1f} GB, largest {max(s for _, s in items) / 1024**3:.2f} GB\n")
+
+    print(f"{'workers':>8}{'tasks':>8}{'listing min':>14}{'scheduled min':>15}{'lower bound min':>17}{'gain':>8}")
+    for n_workers in args.workers:
+        scheduler = MakespanScheduler(n_workers, throughput=args.throughput_mbps * 1024**2)
+        summary = scheduler.schedule(items, fifo_batch_size=args.batch_size).summary()
+        print(f"{n_workers:>8}{summary['tasks']:>8}{summary['fifo_makespan'] / 60:>14.1f}"
+              f"{summary['expected_makespan'] / 60:>15.1f}{summary['lower_bound'] / 60:>17.1f}"
+              f"{summary['fifo_makespan'] / summary['expected_makespan']:>8.2f}")
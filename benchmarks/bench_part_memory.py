@@ -0,0 +1,129 @@
+import io
+import os
+import sys
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from part_reader import MemoryBudget, MmapPartReader, open_mmap
+
+# Bytes handed to the socket per send (mimics http.client's body streaming).
+SEND_BLOCK = 64 * 1024
+
+
+def send(body, send_secs):
+    """
+    Consume a part body the way the HTTP connection streams it & simulate network latency.
+
+    """
+    while True:
+        block = body.read(SEND_BLOCK)
+        if not len(block):
+            break
+    time.sleep(send_secs)
+
+
+def run_bytes(file_paths, part_size, concurrency, send_secs):
+    """
+    Baseline: each part is copied into a new bytes buffer before it is sent.
+
+    """
+    def upload_part(file_path, offset, length):
+        with open(file_path, 'rb') as f:
+            f.seek(offset)
+            buf = f.read(length)
+        send(io.BytesIO(buf), send_secs)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(upload_part, file_path, offset, min(part_size, os.path.getsize(file_path) - offset))
+                   for file_path in file_paths
+                   for offset in range(0, os.path.getsize(file_path), part_size)]
+        [future.result() for future in futures]
+
+
+def run_mmap(file_paths, part_size, concurrency, send_secs, max_inflight):
+    """
+    Each part is served as memoryview slices of a memory map & bounded by the memory budget.
+
+    """
+    budget = MemoryBudget(max_inflight)
+    maps = {file_path: open_mmap(file_path) for file_path in file_paths}
+
+    def upload_part(file_path, offset, length):
+        body = MmapPartReader(maps[file_path], offset, length)
+        try:
+            send(body, send_secs)
+        finally:
+            body.close()
+            budget.release(length)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = []
+        for file_path in file_paths:
+            file_size = os.path.getsize(file_path)
+            for offset in range(0, file_size, part_size):
+                length = min(part_size, file_size - offset)
+                budget.acquire(length)
+                futures.append(executor.submit(upload_part, file_path, offset, length))
+        [future.result() for future in futures]
+    for mm in maps.values():
+        mm.close()
+
+    return budget.peak
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Peak RSS of multipart part buffers: bytes copies vs mmap slices.")
+    parser.add_argument('files', nargs='*', help="Data files to 'upload'. If none, synthetic files are generated.")
+    parser.add_argument('--part-mb', type=int, default=48)
+    parser.add_argument('--concurrency', type=int, default=10, help="Concurrent parts per upload x uploads.")
+    parser.add_argument('--max-inflight-mb', type=int, default=128, help="Memory budget for the mmap mode.")
+    parser.add_argument('--send-secs', type=float, default=0.05, help="Simulated network time per part.")
+    parser.add_argument('--synthetic-gb', type=float, default=2.0)
+    parser.add_argument('--mode', choices=['bytes', 'mmap'], default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    MB = 1024**2
+
+    # Child process: run a single mode & report its peak RSS (ru_maxrss is in KB on Linux).
+    if args.mode is not None:
+        start_time = time.time()
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if args.mode == 'bytes':
+            run_bytes(args.files, args.part_mb * MB, args.concurrency, args.send_secs)
+            peak_budget = 0
+        else:
+            peak_budget = run_mmap(args.files, args.part_mb * MB, args.concurrency, args.send_secs,
+                                   args.max_inflight_mb * MB)
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"{args.mode:<8}{rss_before / 1024:>14.1f}{rss_after / 1024:>14.1f}"
+              f"{peak_budget / MB:>16.1f}{time.time() - start_time:>10.2f}")
+        sys.exit(0)
+
+    tmp_dir = None
+    file_paths = args.files
+    if not file_paths:
+        tmp_dir = tempfile.TemporaryDirectory()
+        for i in range(2):
+            file_path = os.path.join(tmp_dir.name, f"synthetic_{i}.tar")
+            with open(file_path, 'wb') as f:
+                for _ in range(int(args.synthetic_gb * 1024 / 2)):
+                    f.write(os.urandom(MB))
+            file_paths.append(file_path)
+
+    print(f"part size {args.part_mb} MB, concurrency {args.concurrency}, mmap budget {args.max_inflight_mb} MB\n")
+    print(f"{'mode':<8}{'RSS before MB':>14}{'peak RSS MB':>14}{'budget peak MB':>16}{'seconds':>10}")
+    sys.stdout.flush()
+    for mode in ['bytes', 'mmap']:
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--mode', mode,
+                        '--part-mb', str(args.part_mb), '--concurrency', str(args.concurrency),
+                        '--max-inflight-mb', str(args.max_inflight_mb), '--send-secs', str(args.send_secs)]
+                       + file_paths, check=True)
+
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
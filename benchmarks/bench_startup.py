@@ -0,0 +1,116 @@
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules which must never be imported by the transfer CLI's startup path.
+HEAVY_MODULES = ['pandas', 'numpy', 'matplotlib']
+
+# Module imported by each subcommand of srw_xfer.py before it does any work.
+SUBCOMMAND_MODULES = {'help': 'srw_xfer',
+                      'upload/purge/list': 'upload_data',
+                      'tar': 'transfer_srw_tar',
+                      'sync/verify': 'verify_upload'}
+
+
+def run(command):
+    """
+    Args:
+        command (list): Command to run from the repository's folder.
+
+    Return (tuple): (wall time in seconds, completed process).
+
+    """
+    start_time = time.perf_counter()
+    completed = subprocess.run(command, cwd=ROOT_DIR, capture_output=True, text=True)
+
+    return time.perf_counter() - start_time, completed
+
+
+def time_command(command, repeat):
+    """
+    Args:
+        command (list): Command to time.
+        repeat (int): Number of runs.
+
+    Return (float): Median wall time in milliseconds (None if the command failed).
+
+    """
+    deltas = []
+    for _ in range(repeat):
+        delta, completed = run(command)
+        if completed.returncode != 0:
+            return None
+        deltas.append(delta)
+
+    return 1000 * statistics.median(deltas)
+
+
+def top_imports(module, n):
+    """
+    Args:
+        module (str): Module to import.
+        n (int): Number of imports to report.
+
+    Return (list): (cumulative microseconds, imported module) of the n slowest imports as
+    reported by 'python -X importtime'.
+
+    """
+    _, completed = run([sys.executable, '-X', 'importtime', '-c', f"import {module}"])
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # e.g. 'import time:       412 |       1530 | tarfile'
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        imports.append((int(cumulative_us), name.strip()))
+
+    return sorted(imports, reverse=True)[:n]
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Startup time of the transfer CLI & the modules of its subcommands.")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8, help="Number of slowest imports to report per module.")
+    parser.add_argument('--max-help-ms', type=float, default=None,
+                        help="Fail (exit 1) if 'srw_xfer.py --help' takes longer than this.")
+    args = parser.parse_args()
+
+    baseline = time_command([sys.executable, '-c', 'pass'], args.repeat)
+    help_ms = time_command([sys.executable, 'srw_xfer.py', '--help'], args.repeat)
+    print(f"{'startup':<44}{'median ms':>12}{'over python ms':>16}")
+    print(f"{'python -c pass':<44}{baseline:>12.1f}{0:>16.1f}")
+    print(f"{'srw_xfer.py --help':<44}{help_ms:>12.1f}{help_ms - baseline:>16.1f}")
+    for subcommand, module in SUBCOMMAND_MODULES.items():
+        module_ms = time_command([sys.executable, '-c', f"import {module}"], args.repeat)
+        label = f"import {module} ({subcommand})"
+        if module_ms is None:
+            print(f"{label:<44}{'n/a (missing dependency)':>28}")
+        else:
+            print(f"{label:<44}{module_ms:>12.1f}{module_ms - baseline:>16.1f}")
+
+    # Heavy modules pulled in by the startup path of each subcommand.
+    print()
+    status = 0
+    for module in sorted(set(SUBCOMMAND_MODULES.values())):
+        check = (f"import sys, {module}; "
+                 f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+        _, completed = run([sys.executable, '-c', check])
+        if completed.returncode != 0:
+            continue
+        loaded = completed.stdout.strip()
+        if loaded:
+            status = 1
+        print(f"import {module}: heavy modules loaded: {loaded or 'none'}")
+        for cumulative_us, name in top_imports(module, args.top):
+            print(f"    {cumulative_us / 1000:>8.1f} ms  {name}")
+
+    if args.max_help_ms is not None and help_ms > args.max_help_ms:
+        print(f"\nsrw_xfer.py --help took {help_ms:.1f} ms (budget {args.max_help_ms:.1f} ms)")
+        status = 1
+    sys.exit(status)
@@ -0,0 +1,121 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tarfile
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tar_extract import ParallelTarExtractor
+
+
+def make_tar(tar_dir, n_small, small_kb, n_large, large_mb):
+    """
+    Write a synthetic SRW-like tar: many small fix files & a few large model files.
+
+    Args:
+        tar_dir (str): Path of the tar to write.
+        n_small (int): Number of small data files.
+        small_kb (int): Size of each small data file in KB.
+        n_large (int): Number of large data files.
+        large_mb (int): Size of each large data file in MB.
+
+    Return (int): Total size of the members' data in bytes.
+
+    """
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(tar_dir)) as src_dir:
+        for i in range(n_small):
+            folder = os.path.join(src_dir, 'fix', f"fix_am_{i % 20:02d}")
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, f"global_file_{i:05d}.nc"), 'wb') as f:
+                f.write(os.urandom(small_kb * 1024))
+        folder = os.path.join(src_dir, 'input_model_data', 'FV3GFS', '2019061518')
+        os.makedirs(folder, exist_ok=True)
+        chunk = os.urandom(1024**2)
+        for i in range(n_large):
+            with open(os.path.join(folder, f"gfs.t18z.atmf{i:03d}.nemsio"), 'wb') as f:
+                for _ in range(large_mb):
+                    f.write(chunk)
+        with tarfile.open(tar_dir, 'w') as tar_file:
+            tar_file.add(os.path.join(src_dir, 'fix'), arcname='fix')
+            tar_file.add(os.path.join(src_dir, 'input_model_data'), arcname='input_model_data')
+
+    return n_small * small_kb * 1024 + n_large * large_mb * 1024**2
+
+
+def drop_caches():
+    """
+    Drop the page cache (root only), so each run reads the tar from storage.
+
+    """
+    os.sync()
+    try:
+        with open('/proc/sys/vm/drop_caches', 'w') as f:
+            f.write('3\n')
+        return True
+    except OSError:
+        return False
+
+
+def extractall(tar_dir, out_dir, avoid):
+    with tarfile.open(tar_dir, 'r') as tar_file:
+        tar_file.extractall(out_dir, members=[x for x in tar_file.getmembers() if x.name not in avoid])
+
+
+def parallel(workers):
+    def extract(tar_dir, out_dir, avoid):
+        with tarfile.open(tar_dir, 'r') as tar_file:
+            members = [x for x in tar_file.getmembers() if x.name not in avoid]
+            ParallelTarExtractor(max_workers=workers).extract(tar_file, members, out_dir)
+    return extract
+
+
+def tree_size(folder):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(folder) for f in files)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="tarfile.extractall vs ParallelTarExtractor on a synthetic tar.")
+    parser.add_argument('--dir', default=None, help="Folder for the tar & the extractions (e.g. on the parallel filesystem).")
+    parser.add_argument('--tar', default=None, help="Existing tar to extract rather than a synthetic one.")
+    parser.add_argument('--n-small', type=int, default=4000)
+    parser.add_argument('--small-kb', type=int, default=128)
+    parser.add_argument('--n-large', type=int, default=8)
+    parser.add_argument('--large-mb', type=int, default=128)
+    parser.add_argument('--workers', type=int, nargs='+', default=[4, 16, 32])
+    parser.add_argument('--repeat', type=int, default=2)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(dir=args.dir)
+    try:
+        tar_dir = args.tar
+        if tar_dir is None:
+            tar_dir = os.path.join(work_dir, 'synthetic.tar')
+            total = make_tar(tar_dir, args.n_small, args.small_kb, args.n_large, args.large_mb)
+            print(f"Synthetic tar: {args.n_small} x {args.small_kb} KB + {args.n_large} x {args.large_mb} MB "
+                  f"({total / 1024**3:.2f} GB)")
+        avoid = ['fix', 'input_model_data']
+        cold = drop_caches()
+        print(f"Page cache {'dropped before each run' if cold else 'not dropped (not root) -- warm reads'}\n")
+
+        print(f"{'extractor':<20}{'best s':>10}{'MB/s':>10}{'speedup':>10}")
+        baseline = None
+        modes = [('extractall', extractall)] + [(f"parallel x{w}", parallel(w)) for w in args.workers]
+        for mode, extract in modes:
+            best = None
+            for _ in range(args.repeat):
+                out_dir = os.path.join(work_dir, 'out')
+                shutil.rmtree(out_dir, ignore_errors=True)
+                drop_caches()
+                start_time = time.time()
+                extract(tar_dir, out_dir, avoid)
+                os.sync()
+                delta = time.time() - start_time
+                best = delta if best is None else min(best, delta)
+            size = tree_size(out_dir)
+            baseline = baseline or best
+            print(f"{mode:<20}{best:>10.2f}{size / 1024**2 / best:>10.1f}{baseline / best:>10.2f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
@@ -0,0 +1,123 @@
+import io
+import os
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from boto3.s3.transfer import TransferConfig
+from transfer_session import TransferSession
+from upload_data import UploadData
+from mock_s3 import add_latency, mock_endpoint
+
+
+def per_file_manager(session, bucket_name, file_paths, prefix, latency=0):
+    """
+    Previous behavior: a new TransferConfig & client.upload_file (i.e. a new TransferManager
+    & thread pool) per data file, over a client w/ botocore's default connection pool.
+
+    """
+    client = session.session.client('s3', endpoint_url=session.client.meta.endpoint_url)
+    add_latency(client, latency)
+    KB, MB = 1024, 1024**2
+    for file_path in file_paths:
+        config = TransferConfig(multipart_threshold=100*MB, max_concurrency=10,
+                                multipart_chunksize=50000*KB, num_download_attempts=2, use_threads=True)
+        client.upload_file(file_path, bucket_name, prefix + os.path.basename(file_path), Config=config)
+
+
+def shared_session(session, bucket_name, file_paths, prefix, latency=0):
+    """
+    Shared TransferSession, uploading the data files one after another.
+
+    """
+    for file_path in file_paths:
+        session.upload(file_path, bucket_name, prefix + os.path.basename(file_path)).result()
+
+
+def shared_session_concurrent(session, bucket_name, file_paths, prefix, latency=0):
+    """
+    Shared TransferSession, submitting all data files before waiting on them.
+
+    """
+    futures = [session.upload(file_path, bucket_name, prefix + os.path.basename(file_path))
+               for file_path in file_paths]
+    [future.result() for future in futures]
+
+
+def batch_upload(session, bucket_name, file_paths, prefix, max_in_flight):
+    """
+    UploadData.upload_files2cloud over the shared TransferSession, w/ up to max_in_flight
+    data files uploading at once (1 for the previous file-by-file behavior).
+
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+
+        # The keys are the data files' paths relative to the work directory.
+        os.makedirs(os.path.dirname(os.path.join(tmp_dir, prefix.rstrip('/'))), exist_ok=True)
+        os.symlink(os.path.dirname(file_paths[0]), os.path.join(tmp_dir, prefix.rstrip('/')))
+        uploader = UploadData({'bench': [prefix + os.path.basename(file_path) for file_path in file_paths]},
+                              'srw', transfer_session=session)
+        uploader.work_dir = tmp_dir + '/'
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = uploader.upload_files2cloud(failure_manifest=os.path.join(tmp_dir, 'upload_failures.json'),
+                                                 max_in_flight=max_in_flight)
+        if result['failed']:
+            raise RuntimeError(f"{result['failed']} benchmark uploads failed")
+
+
+def batch_sequential(session, bucket_name, file_paths, prefix, latency=0):
+    batch_upload(session, bucket_name, file_paths, prefix, max_in_flight=1)
+
+
+def batch_concurrent(session, bucket_name, file_paths, prefix, latency=0):
+    batch_upload(session, bucket_name, file_paths, prefix, max_in_flight=None)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Per-file overhead of small uploads: new TransferManager per file vs shared session.")
+    parser.add_argument('--bucket', default='srw', help="Bucket ('rt', 'srw' or 'mrw').")
+    parser.add_argument('--prefix', default='benchmarks/transfer_session/', help="Key prefix of the benchmark objects (deleted afterwards).")
+    parser.add_argument('--n-files', type=int, default=200)
+    parser.add_argument('--size-kb', type=int, default=64)
+    parser.add_argument('--max-concurrency', type=int, default=10)
+    parser.add_argument('--endpoint-url', default=None,
+                        help="S3-compatible endpoint (e.g. a MinIO server). If unset, a moto server is started "
+                             "unless '--real-bucket' is set.")
+    parser.add_argument('--real-bucket', action='store_true', help="Upload to the real bucket (requires bucket credentials).")
+    parser.add_argument('--latency-ms', type=float, default=0,
+                        help="Delay added to every request (e.g. 30 for the round trip from on-prem to the bucket region).")
+    args = parser.parse_args()
+
+    bucket_name, profile_name = UploadData.BUCKETS[args.bucket]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_paths = []
+        for i in range(args.n_files):
+            file_path = os.path.join(tmp_dir, f"small_{i:05d}.nc")
+            with open(file_path, 'wb') as f:
+                f.write(os.urandom(args.size_kb * 1024))
+            file_paths.append(file_path)
+
+        endpoint = contextlib.nullcontext() if args.real_bucket else mock_endpoint(args.endpoint_url)
+        with endpoint as endpoint_url, \
+             TransferSession(profile_name, max_concurrency=args.max_concurrency, endpoint_url=endpoint_url) as session:
+            add_latency(session.client, args.latency_ms / 1000)
+            print(f"{args.n_files} files x {args.size_kb} KB -> s3://{bucket_name}/{args.prefix} "
+                  f"({endpoint_url or 'cloud'}, +{args.latency_ms:g} ms/request)\n")
+            print(f"{'mode':<28}{'seconds':>10}{'ms/file':>10}")
+            for mode, func in [('per_file_manager', per_file_manager),
+                               ('shared_session', shared_session),
+                               ('shared_session_concurrent', shared_session_concurrent),
+                               ('batch_sequential', batch_sequential),
+                               ('batch_concurrent', batch_concurrent)]:
+                start_time = time.time()
+                func(session, bucket_name, file_paths, f"{args.prefix}{mode}/", args.latency_ms / 1000)
+                delta = time.time() - start_time
+                print(f"{mode:<28}{delta:>10.2f}{1000 * delta / args.n_files:>10.1f}")
+
+            # Remove the benchmark objects.
+            session.s3.Bucket(bucket_name).objects.filter(Prefix=args.prefix).delete()
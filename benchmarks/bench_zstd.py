@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import argparse
+from collections import defaultdict
+
+import zstandard
+
+
+def compress_stream(file_path, level, threads, read_size=4 * 1024**2):
+    """
+    Stream a data file through the zstd compressor as the uploader does, discarding the output.
+
+    Args:
+        file_path (str): Data file's full directory path (incl. filename).
+        level (int): zstd compression level.
+        threads (int): Number of zstd compression threads.
+        read_size (int): Bytes requested per read (i.e. mimics the multipart part reads).
+
+    Return (int): Compressed size in bytes.
+
+    """
+    compressor = zstandard.ZstdCompressor(level=level, threads=threads, write_checksum=True)
+    compressed_size = 0
+    with open(file_path, 'rb') as f:
+        with compressor.stream_reader(f, size=os.path.getsize(file_path)) as reader:
+            while True:
+                chunk = reader.read(read_size)
+                if not chunk:
+                    break
+                compressed_size += len(chunk)
+
+    return compressed_size
+
+
+def file_type(file_path):
+    """
+    Group SRW data files by type (e.g. '.grib2', '.nc', '.tar' or the fix file prefix).
+
+    """
+    name = os.path.basename(file_path)
+    ext = os.path.splitext(name)[1]
+    if ext and not ext[1:].isdigit():
+        return ext
+
+    return name.split('.')[0].split('_')[0]
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Benchmark zstd compression ratio vs throughput on SRW data files.")
+    parser.add_argument('files', nargs='+', help="SRW data files (e.g. fix_am, fix_orog, FV3GFS grib2/nemsio files).")
+    parser.add_argument('--levels', default='1,3,6,9,15', help="Comma-separated compression levels.")
+    parser.add_argument('--threads', type=int, default=-1, help="Compression threads (-1 for all CPUs).")
+    args = parser.parse_args()
+
+    MB = 1024**2
+    levels = [int(level) for level in args.levels.split(',')]
+    by_type = defaultdict(list)
+    for file_path in args.files:
+        by_type[file_type(file_path)].append(file_path)
+
+    print(f"{'type':<16}{'level':>6}{'MB':>10}{'ratio':>8}{'MB/s':>10}")
+    for ftype, file_paths in sorted(by_type.items()):
+        original_size = sum(os.path.getsize(file_path) for file_path in file_paths)
+        for level in levels:
+            start_time = time.time()
+            compressed_size = sum(compress_stream(file_path, level, args.threads) for file_path in file_paths)
+            delta = time.time() - start_time
+            print(f"{ftype:<16}{level:>6}{original_size / MB:>10.1f}"
+                  f"{original_size / max(compressed_size, 1):>8.2f}{original_size / MB / delta:>10.1f}")
+    sys.stdout.flush()
@@ -0,0 +1,105 @@
+import os
+import sys
+import time
+import socket
+import tempfile
+import contextlib
+import subprocess
+
+import boto3
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from upload_data import UploadData
+
+
+def free_port():
+    """
+    Args:
+        None
+
+    Return (int): Unused local TCP port.
+
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def mock_endpoint(endpoint_url=None):
+    """
+    S3-compatible endpoint for the benchmarks, w/ the buckets & credentials profiles of
+    UploadData.BUCKETS. Unless an endpoint is given (e.g. a local MinIO server whose buckets
+    already exist), a moto server is started in a separate process (requires moto[server]).
+
+    Args:
+        endpoint_url (str): Existing endpoint (e.g. 'http://localhost:9000').
+
+    Return (str): URL of the endpoint, to pass to TransferSession.
+
+    """
+    server = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env_vars = {}
+        if endpoint_url is None:
+
+            # Dummy credentials of each profile -- moto accepts any.
+            credentials = os.path.join(tmp_dir, 'credentials')
+            config = os.path.join(tmp_dir, 'config')
+            profiles = sorted({profile_name for _, profile_name in UploadData.BUCKETS.values()})
+            with open(credentials, 'w') as f:
+                for profile_name in profiles:
+                    f.write(f"[{profile_name}]\naws_access_key_id = testing\naws_secret_access_key = testing\n")
+            with open(config, 'w') as f:
+                for profile_name in profiles:
+                    section = 'default' if profile_name == 'default' else f"profile {profile_name}"
+                    f.write(f"[{section}]\nregion = us-east-1\n")
+            env_vars = {'AWS_SHARED_CREDENTIALS_FILE': credentials, 'AWS_CONFIG_FILE': config}
+
+            port = free_port()
+            endpoint_url = f"http://127.0.0.1:{port}"
+            server = subprocess.Popen([sys.executable, '-m', 'moto.server', '-p', str(port)],
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        saved = {name: os.environ.get(name) for name in env_vars}
+        os.environ.update(env_vars)
+        try:
+            if server is not None:
+                deadline = time.time() + 30
+                while True:
+                    try:
+                        socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                        break
+                    except OSError:
+                        if server.poll() is not None or time.time() > deadline:
+                            raise RuntimeError("moto server did not start (pip install 'moto[server]')")
+                        time.sleep(0.1)
+                for bucket_name, profile_name in UploadData.BUCKETS.values():
+                    boto3.Session(profile_name=profile_name).client('s3', endpoint_url=endpoint_url).create_bucket(Bucket=bucket_name)
+            yield endpoint_url
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+
+def add_latency(client, latency):
+    """
+    Delay every request of a client, as the round trip to a remote endpoint would (a local
+    endpoint answers in well under a millisecond, hiding the per-request overhead).
+
+    Args:
+        client (botocore.client.S3): S3 client.
+        latency (float): Delay of each request in seconds.
+
+    Return: None
+
+    """
+    if latency > 0:
+        client.meta.events.register('before-send.s3', lambda **kwargs: time.sleep(latency))
+
+    return
@@ -0,0 +1,249 @@
+import os
+import tarfile
+import argparse
+import itertools
+
+# Share of the data files w/in each SRW dataset folder (the input model data dominate).
+DEFAULT_SHARES = {'fix': 0.08, 'input_model_data': 0.91, 'NaturalEarth': 0.01}
+
+# Size of each data file in bytes w/in each SRW dataset folder. The trees are written as
+# sparse files, whereas the tars hold the data bytes.
+DEFAULT_SIZES = {'fix': 0, 'input_model_data': 0, 'NaturalEarth': 0}
+
+# File names per cycle of each external model (w/ the cycle hour & forecast hour filled in).
+MODEL_FILES = {'FV3GFS/grib2': "gfs.t{hh}z.pgrb2.0p25.f{fhr:03d}",
+               'FV3GFS/nemsio': "gfs.t{hh}z.atmf{fhr:03d}.nemsio",
+               'HRRR': "hrrr.t{hh}z.wrfprsf{fhr:02d}.grib2",
+               'RAP': "rap.t{hh}z.wrfprsf{fhr:02d}.grib2",
+               'NAM': "nam.t{hh}z.conusnest.hiresf{fhr:02d}.tm00.grib2",
+               'GSMGFS': "gfs.t{hh}z.atmf{fhr:03d}.nemsio"}
+FORECAST_HOURS = 49
+
+# Fixed data of each grid resolution.
+FIX_AM_FILES = ["global_albedo4.1x1.grb", "global_glacier.2x2.grb", "global_maxice.2x2.grb",
+                "global_mxsnoalb.uariz.t126.384.190.rg.grb", "global_o3prdlos.f77", "global_shdmax.0.144x0.144.grb",
+                "global_shdmin.0.144x0.144.grb", "global_slope.1x1.grb", "global_snoclim.1.875.grb",
+                "global_soilmgldas.t126.384.190.grb", "global_soiltype.statsgo.t126.384.190.rg.grb",
+                "global_tg3clim.2.6x1.5.grb", "global_vegfrac.0.144.decpercent.grb", "global_vegtype.igbp.t126.384.190.rg.grb",
+                "global_zorclim.1x1.grb", "global_sstclim.2x2.grb", "global_snowfree_albedo.bosu.t126.384.190.rg.grb",
+                "seaice_newland.grb", "RTGSST.1982.2012.monthly.clim.grb", "CFSR.SEAICE.1982.2012.monthly.clim.grb"]
+FIX_LUT_FILES = ["optics_BC.v1_3.dat", "optics_DU.v15_3.dat", "optics_OC.v1_3.dat", "optics_SS.v3_3.dat", "optics_SU.v1_3.dat"]
+SFC_CLIMO_VARS = ["facsf", "maximum_snow_albedo", "slope_type", "snowfree_albedo", "soil_type",
+                  "substrate_temperature", "vegetation_greenness", "vegetation_type"]
+NE_RASTER_FILES = ["NE1_50M_SR_W.tif", "NE1_HR_LC_SR_W.tif", "NE2_50M_SR_W.tif", "GRAY_50M_SR_W.tif", "HYP_50M_SR_W.tif"]
+NE_SHAPEFILES = ["ne_10m_coastline", "ne_10m_lakes", "ne_50m_admin_0_countries", "ne_50m_admin_1_states_provinces",
+                 "ne_50m_rivers_lake_centerlines", "ne_110m_land"]
+
+
+def cycle_name(cycle):
+    """
+    Args:
+        cycle (int): Index of a 6-hourly cycle.
+
+    Return (str): Cycle folder name (YYYYMMDDHH) of the cycle.
+
+    """
+    day, hh = divmod(cycle, 4)
+
+    return f"{2019 + day // 336}{1 + day // 28 % 12:02d}{1 + day % 28:02d}{6 * hh:02d}"
+
+
+def model_files():
+    """
+    Input model data files: one folder per external model & cycle, each holding the
+    forecast hours of the cycle.
+
+    Args:
+        None
+
+    Return (generator): Yields the data files' paths relative to the input_model_data folder.
+
+    """
+    for cycle in itertools.count():
+        ymdh = cycle_name(cycle)
+        hh = ymdh[-2:]
+        for model, pattern in MODEL_FILES.items():
+            for fhr in range(FORECAST_HOURS):
+                yield f"{model}/{ymdh}/{pattern.format(hh=hh, fhr=fhr)}"
+
+
+def fix_files():
+    """
+    Fixed data files: the fix_am, fix_aer & fix_lut tables, followed by the orography &
+    surface climatology tiles of increasing grid resolutions (C48, C96, ...).
+
+    Args:
+        None
+
+    Return (generator): Yields the data files' paths relative to the fix folder.
+
+    """
+    for name in FIX_AM_FILES:
+        yield f"fix_am/{name}"
+    for year in range(1956, 2024):
+        yield f"fix_am/co2dat_4a/global_co2historicaldata_{year}.txt"
+    for year in range(2009, 2024):
+        yield f"fix_am/fix_co2_proj/global_co2historicaldata_{year}.txt"
+    for month in range(1, 13):
+        yield f"fix_aer/merra2.aerclim.2003-2014.m{month:02d}.nc"
+    for name in FIX_LUT_FILES:
+        yield f"fix_lut/{name}"
+    for res in itertools.count(48, 48):
+        for tile in range(1, 7):
+            yield f"fix_orog/C{res}/C{res}_grid.tile{tile}.nc"
+            yield f"fix_orog/C{res}/C{res}_oro_data.tile{tile}.nc"
+            for var in SFC_CLIMO_VARS:
+                yield f"fix_sfc_climo/C{res}.{var}.tile{tile}.nc"
+
+
+def ne_files():
+    """
+    Natural Earth data files: rasters & the components of the shapefiles, repeated at
+    increasing versions past the real set.
+
+    Args:
+        None
+
+    Return (generator): Yields the data files' paths relative to the NaturalEarth folder.
+
+    """
+    for version in itertools.count():
+        suffix = f"_v{version}" if version else ""
+        for name in NE_RASTER_FILES:
+            yield f"raster_files/{name.replace('.tif', suffix + '.tif')}"
+        for name in NE_SHAPEFILES:
+            for ext in ['shp', 'shx', 'dbf', 'prj']:
+                yield f"shapefiles/{name}{suffix}.{ext}"
+
+
+DATASET_FILES = {'fix': fix_files, 'input_model_data': model_files, 'NaturalEarth': ne_files}
+
+# Command line flag of each dataset folder.
+FLAGS = {'fix': 'fix', 'input_model_data': 'ma', 'NaturalEarth': 'ne'}
+
+
+def srw_layout(n_files, shares=None):
+    """
+    Split a number of data files across the SRW dataset folders.
+
+    Args:
+        n_files (int): Total number of data files.
+        shares (dict): Share of the data files w/in each dataset folder (see DEFAULT_SHARES).
+
+    Return (dict): Dataset folder mapped to the paths of its data files (relative to the folder).
+
+    """
+    shares = shares or DEFAULT_SHARES
+    counts = {folder: int(n_files * share) for folder, share in shares.items()}
+    counts['input_model_data'] += n_files - sum(counts.values())
+
+    return {folder: list(itertools.islice(DATASET_FILES[folder](), count)) for folder, count in counts.items()}
+
+
+def build_tree(root_dir, layout, sizes=None):
+    """
+    Write an SRW-shaped tree of sparse data files (e.g. as the srw_data_root of GetSrwData).
+
+    Args:
+        root_dir (str): Directory the dataset folders are written under.
+        layout (dict): Dataset folder mapped to its data files' relative paths (see srw_layout).
+        sizes (dict): Size of each data file in bytes w/in each dataset folder.
+
+    Return (int): Number of data files written.
+
+    """
+    sizes = sizes or DEFAULT_SIZES
+    count = 0
+    made = set()
+    for folder, paths in layout.items():
+        size = sizes.get(folder, 0)
+        for path in paths:
+            file_dir = os.path.join(root_dir, folder, path)
+            parent = os.path.dirname(file_dir)
+            if parent not in made:
+                os.makedirs(parent, exist_ok=True)
+                made.add(parent)
+            with open(file_dir, 'wb') as f:
+                if size:
+                    f.truncate(size)
+            count += 1
+
+    return count
+
+
+class _Zeros():
+    """
+    File object of zero bytes, the data of the synthetic tar members.
+
+    """
+
+    def read(self, size=-1):
+        return bytes(max(size, 0))
+
+
+def build_tar(tar_dir, folder, paths, size=0):
+    """
+    Write a tar of a dataset folder (as the fix & input_model_data tars GetSrwData extracts)
+    w/out writing the data files to disk first.
+
+    Args:
+        tar_dir (str): Path of the tar to write.
+        folder (str): Dataset folder the members are named under (e.g. 'fix').
+        paths (list): Data files' paths relative to the folder.
+        size (int): Size of each data file in bytes.
+
+    Return (int): Number of members written (directories included).
+
+    """
+    zeros = _Zeros()
+    made = set()
+    count = 0
+    with tarfile.open(tar_dir, 'w') as tar_file:
+        for path in paths:
+            name = f"{folder}/{path}"
+            parts = name.split('/')
+            for i in range(1, len(parts)):
+                parent = '/'.join(parts[:i])
+                if parent not in made:
+                    made.add(parent)
+                    info = tarfile.TarInfo(parent)
+                    info.type = tarfile.DIRTYPE
+                    info.mode = 0o755
+                    tar_file.addfile(info)
+                    count += 1
+            info = tarfile.TarInfo(name)
+            info.size = size
+            info.mode = 0o644
+            tar_file.addfile(info, zeros if size else None)
+            count += 1
+
+    return count
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Write a synthetic SRW-shaped tree (fix, input_model_data, NaturalEarth) & tars.")
+    parser.add_argument('root_dir', help="Directory the dataset folders (& tars) are written under.")
+    parser.add_argument('--n-files', type=int, default=10000)
+    for folder, flag in FLAGS.items():
+        parser.add_argument(f"--{flag}-share", type=float, default=DEFAULT_SHARES[folder],
+                            help=f"Share of the data files w/in {folder}.")
+        parser.add_argument(f"--{flag}-bytes", type=int, default=DEFAULT_SIZES[folder],
+                            help=f"Size of each data file w/in {folder}.")
+    parser.add_argument('--tars', action='store_true', help="Also write fix.tar & input_model_data.tar.")
+    parser.add_argument('--no-tree', action='store_true', help="Only write the tars.")
+    args = parser.parse_args()
+
+    shares = {folder: getattr(args, f"{flag}_share") for folder, flag in FLAGS.items()}
+    sizes = {folder: getattr(args, f"{flag}_bytes") for folder, flag in FLAGS.items()}
+    layout = srw_layout(args.n_files, shares)
+    if not args.no_tree:
+        count = build_tree(args.root_dir, layout, sizes)
+        print(f"Wrote {count} data files under {args.root_dir}: " +
+              ", ".join(f"{folder} {len(paths)}" for folder, paths in layout.items()))
+    if args.tars:
+        os.makedirs(args.root_dir, exist_ok=True)
+        for folder in ['fix', 'input_model_data']:
+            tar_dir = os.path.join(args.root_dir, f"{folder}.tar")
+            count = build_tar(tar_dir, folder, layout[folder], sizes[folder])
+            print(f"Wrote {tar_dir} ({count} members)")
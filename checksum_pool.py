@@ -0,0 +1,187 @@
+import base64
+import hashlib
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+def part_ranges(file_size, part_size):
+    """
+    Partition a data file into the byte ranges of its multipart upload parts.
+
+    Args:
+        file_size (int): Size of the data file in bytes.
+        part_size (int): Partition size of each part in bytes.
+
+    Return (list): List of (offset, length) tuples.
+
+    """
+    if file_size == 0:
+        return [(0, 0)]
+
+    return [(offset, min(part_size, file_size - offset)) for offset in range(0, file_size, part_size)]
+
+
+def part_digest(file_path, offset, length):
+    """
+    MD5 digest of a byte range of a data file. Executed within the process pool's workers.
+
+    Args:
+        file_path (str): Data file's full directory path (incl. filename).
+        offset (int): Starting byte of the range.
+        length (int): Number of bytes in the range.
+
+    Return (bytes): MD5 digest of the byte range.
+
+    The byte range is hashed straight from a memory-mapped view of the data file, so the
+    data itself never crosses the process boundary -- the workers & the upload threads
+    share the pages of the OS page cache & only the 16 byte digest is returned.
+
+    """
+    md5 = hashlib.md5()
+    if length == 0:
+        return md5.digest()
+    with open(file_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                md5.update(view[offset:offset + length])
+            finally:
+                view.release()
+
+    return md5.digest()
+
+
+class ChecksumPool():
+    """
+    Process pool for the CPU-bound checksum work of the upload pipeline.
+
+    The boto3 transfer threads are I/O-bound & spend most of their time waiting on the
+    network, while the per-part checksums are CPU-bound. Running the checksums within
+    separate processes keeps them from competing w/ the transfer threads for the GIL.
+
+    """
+
+    def __init__(self, max_workers=None, use_processes=True):
+        """
+        Args:
+            max_workers (int): Number of worker processes. If None, set to the number of
+                               CPUs available to this process.
+            use_processes (bool): If False, the checksums run w/in a thread pool instead
+                                  (e.g. to compare against the process pool).
+
+        """
+        if max_workers is None:
+            max_workers = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+        self.max_workers = max_workers
+        self.executor = (ProcessPoolExecutor if use_processes else ThreadPoolExecutor)(max_workers=max_workers)
+
+    def submit_part_digests(self, file_path, part_size):
+        """
+        Submit the per-part MD5 digests of a data file to the process pool.
+
+        Args:
+            file_path (str): Data file's full directory path (incl. filename).
+            part_size (int): Partition size of each part in bytes.
+
+        Return (list): List of futures resolving to each part's MD5 digest.
+
+        """
+        file_size = os.path.getsize(file_path)
+
+        return [self.executor.submit(part_digest, file_path, offset, length)
+                for offset, length in part_ranges(file_size, part_size)]
+
+    def submit_etag(self, file_path, multipart_threshold, part_size):
+        """
+        Submit the computation of the ETag expected from cloud data storage for a data file.
+        Returns immediately so the checksums may run alongside the upload.
+
+        Args:
+            file_path (str): Data file's full directory path (incl. filename).
+            multipart_threshold (int): Transfer size threshold at which a multipart upload is
+                                       triggered (see TransferConfig).
+            part_size (int): Partition size of each part (see TransferConfig).
+
+        Return (ExpectedETag): Handle resolving to the expected ETag.
+
+        """
+        file_size = os.path.getsize(file_path)
+        if file_size < multipart_threshold:
+            return ExpectedETag(self.submit_part_digests(file_path, max(file_size, 1)), multipart=False)
+
+        return ExpectedETag(self.submit_part_digests(file_path, part_size), multipart=True)
+
+    def shutdown(self):
+        """
+        Shut down the worker processes.
+
+        Args:
+            None
+
+        Return: None
+
+        """
+        self.executor.shutdown(wait=True)
+
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+        return False
+
+
+class ExpectedETag():
+    """
+    ETag expected from cloud data storage once the per-part digests resolve.
+
+    """
+
+    def __init__(self, digest_futures, multipart):
+        """
+        Args:
+            digest_futures (list): Futures resolving to each part's MD5 digest.
+            multipart (bool): If True, the data file is uploaded as a multipart upload.
+
+        """
+        self.digest_futures = digest_futures
+        self.multipart = multipart
+
+    def part_digests(self):
+        """
+        Args:
+            None
+
+        Return (list): MD5 digest of each part (blocks until computed).
+
+        """
+        return [future.result() for future in self.digest_futures]
+
+    def content_md5(self, part_index):
+        """
+        Args:
+            part_index (int): Index of the part (part number - 1).
+
+        Return (str): Base64 encoded MD5 of the part, as expected by the Content-MD5 header
+        (blocks until computed).
+
+        """
+        return base64.b64encode(self.digest_futures[part_index].result()).decode('ascii')
+
+    def result(self):
+        """
+        Args:
+            None
+
+        Return (str): Expected ETag. For a multipart upload, the ETag is the MD5 of the
+        concatenated part digests suffixed w/ the number of parts.
+
+        """
+        digests = self.part_digests()
+        if not self.multipart:
+            return digests[0].hex()
+
+        return f"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(digests)}"
@@ -0,0 +1,369 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import botocore.exceptions
+
+from part_reader import MmapPartReader, open_mmap
+from progress_bar import ProgressPercentage
+
+# Error codes of a server-side copy refused for lack of access (e.g. the credentials of the
+# destination bucket cannot read the source bucket), which fall back to a broadcast.
+REFUSED_COPY_CODES = {'AccessDenied', 'AccessForbidden', 'Forbidden', 'AllAccessDisabled', '403'}
+
+
+def is_refused_copy(error):
+    """
+    Args:
+        error (Exception): Error raised by a server-side copy.
+
+    Return (bool): True if the copy was refused for lack of access. Other errors (e.g. a
+    missing destination bucket or throttling past the retries) are reported as failures.
+
+    """
+    if not isinstance(error, botocore.exceptions.ClientError):
+        return False
+    code = error.response.get('Error', {}).get('Code', '')
+    status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+
+    return code in REFUSED_COPY_CODES or status == 403
+
+
+class FanOutUpload():
+    """
+    Upload each data file to several buckets (e.g. the same fix data to the srw & mrw
+    buckets) while reading it from disk only once.
+
+    Two ways of reaching the extra buckets:
+
+        'broadcast': The data file (or each of its parts) is memory-mapped once & the same
+                     pages are sent to all buckets concurrently -- each bucket receives its own
+                     PUT or multipart upload, so the bytes cross the on-prem link once per bucket.
+        'copy':      The data file is uploaded to the first bucket, then server-side copies are
+                     made into the other buckets -- the bytes cross the on-prem link once, at the
+                     cost of waiting for the first upload to finish.
+
+    In 'auto' mode, data files below the copy threshold are broadcast (a copy costs the same
+    request as a PUT, plus the wait) & larger data files are copied. A bucket whose copy is
+    refused for lack of access (e.g. its credentials cannot read the first bucket) falls
+    back to a broadcast.
+
+    Broadcasts are split into parts as the first bucket's TransferManager splits its uploads
+    (multipart threshold & chunksize of its session), so an object gets the same ETag
+    whichever way it reached a bucket.
+
+    """
+
+    def __init__(self, uploaders, mode='auto', part_size=None, max_concurrency=10, copy_threshold=None):
+        """
+        Args:
+            uploaders (list): UploadData instances of the target buckets. The first bucket is
+                              the source of the server-side copies.
+            mode (str): 'broadcast', 'copy' or 'auto'.
+            part_size (int): Partition size of each part in bytes. If None, the multipart
+                             chunksize of the first bucket's session. Any other size gives
+                             the broadcast objects a different multipart ETag than the copied
+                             ones (reported as 'etag_unverified' by verify_upload).
+            max_concurrency (int): Maximum number of parts in flight per bucket.
+            copy_threshold (int): In 'auto' mode, data files of at least this size are copied.
+                                  If None, the multipart threshold of the first bucket's session.
+
+        """
+        self.uploaders = uploaders
+        self.primary = uploaders[0]
+        self.mode = mode
+        config = self.primary.transfer_session.config
+        self.part_size = part_size or config.multipart_chunksize
+        self.multipart_threshold = config.multipart_threshold
+        self.copy_threshold = copy_threshold or config.multipart_threshold
+
+        # Cap on the part bytes in flight -- a part counts once however many buckets it is sent to.
+        self.memory_budget = self.primary.memory_budget
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency * len(uploaders))
+
+    def method(self, file_size):
+        """
+        Args:
+            file_size (int): Size of the data file in bytes.
+
+        Return (str): 'broadcast' or 'copy'.
+
+        """
+        if len(self.uploaders) == 1:
+            return 'broadcast'
+        if self.mode != 'auto':
+            return self.mode
+
+        return 'copy' if file_size >= self.copy_threshold else 'broadcast'
+
+    def upload_file(self, file_dir, key_path=None):
+        """
+        Upload a data file to all buckets.
+
+        Args:
+            file_dir (str): Relative directory path of the data file on-prem.
+            key_path (str): Key of the object in cloud. If None, the file directory.
+
+        Return (dict): Bucket name mapped to the outcome of its upload: 'method' ('broadcast',
+        'copy' or 'broadcast (copy refused)'), 'bytes_sent' over the on-prem link, 'seconds'
+        & 'error' (None on success).
+
+        """
+        if key_path is None:
+            key_path = file_dir
+        file_path = self.primary.work_dir + file_dir
+        start_time = time.time()
+        if self.method(os.path.getsize(file_path)) == 'broadcast':
+            return self.broadcast(file_path, key_path, self.uploaders, start_time)
+
+        return self.copy(file_path, key_path, start_time)
+
+    def broadcast(self, file_path, key_path, uploaders, start_time, method='broadcast'):
+        """
+        Send a memory-mapped data file to several buckets concurrently.
+
+        Args:
+            file_path (str): Data file's full directory path (incl. filename).
+            key_path (str): Key of the object in cloud.
+            uploaders (list): UploadData instances of the buckets.
+            start_time (float): Time the data file's upload started.
+            method (str): Method recorded w/in the outcomes.
+
+        Return (dict): Bucket name mapped to the outcome of its upload.
+
+        """
+        file_size = os.path.getsize(file_path)
+        progress = ProgressPercentage(file_path)
+        errors, finished = {}, {}
+        lock = threading.Lock()
+
+        def done(uploader, error=None):
+            with lock:
+                if error is not None:
+                    errors.setdefault(uploader.bucket_name, error)
+                finished[uploader.bucket_name] = time.time()
+
+        mm = open_mmap(file_path)
+        try:
+            if file_size < self.multipart_threshold:
+                self._broadcast_single(mm, file_size, key_path, uploaders, progress, done)
+            else:
+                self._broadcast_multipart(mm, file_size, key_path, uploaders, progress, errors, done)
+        finally:
+            if mm is not None:
+                mm.close()
+
+        return {uploader.bucket_name: {'method': method,
+                                       'bytes_sent': 0 if uploader.bucket_name in errors else file_size,
+                                       'seconds': finished.get(uploader.bucket_name, time.time()) - start_time,
+                                       'error': errors.get(uploader.bucket_name)} for uploader in uploaders}
+
+    def _broadcast_single(self, mm, file_size, key_path, uploaders, progress, done):
+        """
+        PUT the same memory-mapped data file into each bucket.
+
+        """
+        readers = [MmapPartReader(mm, 0, file_size, progress if i == 0 else None) if mm is not None else b''
+                   for i in range(len(uploaders))]
+
+        def put(uploader, body):
+            try:
+                uploader.s3.meta.client.put_object(Bucket=uploader.bucket_name, Key=key_path,
+                                                   Body=body, ContentLength=file_size)
+            except Exception as e:
+                done(uploader, f"{type(e).__name__}: {e}")
+                return
+            done(uploader)
+
+        self.memory_budget.acquire(file_size)
+        try:
+            wait([self.executor.submit(put, uploader, body) for uploader, body in zip(uploaders, readers)])
+        finally:
+            if mm is not None:
+                for i, reader in enumerate(readers):
+                    reader.close(drop_pages=i == len(readers) - 1)
+            self.memory_budget.release(file_size)
+
+        return
+
+    def _broadcast_multipart(self, mm, file_size, key_path, uploaders, progress, errors, done):
+        """
+        Send each part of a memory-mapped data file to the multipart uploads of all buckets.
+        A part's bytes are held w/in the memory budget until every bucket has received it.
+
+        """
+        upload_ids, parts = {}, {}
+        for uploader in uploaders:
+            try:
+                upload_ids[uploader.bucket_name] = uploader.s3.meta.client.create_multipart_upload(
+                    Bucket=uploader.bucket_name, Key=key_path)['UploadId']
+                parts[uploader.bucket_name] = []
+            except Exception as e:
+                done(uploader, f"{type(e).__name__}: {e}")
+        live = [uploader for uploader in uploaders if uploader.bucket_name in upload_ids]
+        lock = threading.Lock()
+        remaining = {}
+
+        def release(part_number, reader, length):
+            with lock:
+                remaining[part_number] -= 1
+                last = remaining[part_number] == 0
+            reader.close(drop_pages=last)
+            if last:
+                self.memory_budget.release(length)
+
+        def upload_part(uploader, part_number, offset, length, callback):
+            reader = MmapPartReader(mm, offset, length, callback)
+            try:
+                response = uploader.s3.meta.client.upload_part(Bucket=uploader.bucket_name, Key=key_path,
+                                                               UploadId=upload_ids[uploader.bucket_name],
+                                                               PartNumber=part_number, Body=reader,
+                                                               ContentLength=length)
+                with lock:
+                    parts[uploader.bucket_name].append({'ETag': response['ETag'], 'PartNumber': part_number})
+            except Exception as e:
+                with lock:
+                    errors.setdefault(uploader.bucket_name, f"{type(e).__name__}: {e}")
+            finally:
+                release(part_number, reader, length)
+
+        futures = []
+        for part_number, offset in enumerate(range(0, file_size, self.part_size), start=1):
+
+            # Stop sending parts to buckets whose upload has failed.
+            targets = [uploader for uploader in live if uploader.bucket_name not in errors]
+            if not targets:
+                break
+            length = min(self.part_size, file_size - offset)
+            self.memory_budget.acquire(length)
+            remaining[part_number] = len(targets)
+            for i, uploader in enumerate(targets):
+                futures.append(self.executor.submit(upload_part, uploader, part_number, offset, length,
+                                                    progress if i == 0 else None))
+        wait(futures)
+
+        # Complete the uploads every part of which was received & abort the rest, so no
+        # orphaned parts are billed.
+        for uploader in live:
+            client = uploader.s3.meta.client
+            upload_id = upload_ids[uploader.bucket_name]
+            try:
+                if uploader.bucket_name in errors:
+                    client.abort_multipart_upload(Bucket=uploader.bucket_name, Key=key_path, UploadId=upload_id)
+                else:
+                    client.complete_multipart_upload(Bucket=uploader.bucket_name, Key=key_path, UploadId=upload_id,
+                                                     MultipartUpload={'Parts': sorted(parts[uploader.bucket_name],
+                                                                                      key=lambda p: p['PartNumber'])})
+            except Exception as e:
+                errors.setdefault(uploader.bucket_name, f"{type(e).__name__}: {e}")
+            done(uploader, errors.get(uploader.bucket_name))
+
+        return
+
+    def copy(self, file_path, key_path, start_time):
+        """
+        Upload a data file to the first bucket, then copy it server-side into the others.
+
+        Args:
+            file_path (str): Data file's full directory path (incl. filename).
+            key_path (str): Key of the object in cloud.
+            start_time (float): Time the data file's upload started.
+
+        Return (dict): Bucket name mapped to the outcome of its upload.
+
+        """
+        primary, others = self.primary, self.uploaders[1:]
+        try:
+            primary.transfer_session.upload(file_path, primary.bucket_name, key_path,
+                                            callback=ProgressPercentage(file_path)).result()
+        except Exception as e:
+            # Nothing to copy from -- send the data file to the other buckets directly.
+            results = self.broadcast(file_path, key_path, others, start_time) if others else {}
+            results[primary.bucket_name] = {'method': 'copy', 'bytes_sent': 0,
+                                            'seconds': time.time() - start_time,
+                                            'error': f"{type(e).__name__}: {e}"}
+            return results
+
+        file_size = os.path.getsize(file_path)
+        results = {primary.bucket_name: {'method': 'copy', 'bytes_sent': file_size,
+                                         'seconds': time.time() - start_time, 'error': None}}
+        copy_source = {'Bucket': primary.bucket_name, 'Key': key_path}
+        futures = [(uploader, uploader.transfer_session.transfer_manager.copy(copy_source, uploader.bucket_name, key_path,
+                                                                              source_client=primary.transfer_session.client))
+                   for uploader in others]
+        refused = []
+        for uploader, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                if is_refused_copy(e):
+                    print(f"\nCopy of {key_path} into {uploader.bucket_name} refused, uploading instead: {e}")
+                    refused.append(uploader)
+                    continue
+                results[uploader.bucket_name] = {'method': 'copy', 'bytes_sent': 0,
+                                                 'seconds': time.time() - start_time,
+                                                 'error': f"{type(e).__name__}: {e}"}
+                continue
+            results[uploader.bucket_name] = {'method': 'copy', 'bytes_sent': 0,
+                                             'seconds': time.time() - start_time, 'error': None}
+        if refused:
+            results.update(self.broadcast(file_path, key_path, refused, start_time, method='broadcast (copy refused)'))
+
+        return results
+
+    def upload_files(self, file_relative_dirs, report_path='fan_out_report.json'):
+        """
+        Upload the data files to all buckets, continuing past failures.
+
+        Args:
+            file_relative_dirs (dict): Dictionary partitioning the file directories into the
+                                       dataset types.
+            report_path (str): JSON file to which the per-bucket report is written.
+
+        Return (dict): Bucket name mapped to its uploaded, copied & failed data files, the
+        bytes sent over the on-prem link & the seconds spent.
+
+        """
+        report = {uploader.bucket_name: {'uploaded': [], 'copied': [], 'failed': [], 'bytes_sent': 0, 'seconds': 0.0}
+                  for uploader in self.uploaders}
+        bytes_read = 0
+        for dataset_type, ts_files in file_relative_dirs.items():
+            for file_dir in ts_files:
+                bytes_read += os.path.getsize(self.primary.work_dir + file_dir)
+                for bucket_name, result in self.upload_file(file_dir).items():
+                    entry = report[bucket_name]
+                    entry['bytes_sent'] += result['bytes_sent']
+                    entry['seconds'] += result['seconds']
+                    if result['error'] is not None:
+                        entry['failed'].append({'dataset_type': dataset_type, 'file_dir': file_dir,
+                                                'method': result['method'], 'error': result['error']})
+                    elif result['method'] == 'copy' and bucket_name != self.primary.bucket_name:
+                        entry['copied'].append(file_dir)
+                    else:
+                        entry['uploaded'].append(file_dir)
+
+        with open(report_path, 'w') as f:
+            json.dump({'bytes_read': bytes_read, 'buckets': report}, f, indent=1)
+        print("\033[1m" + f"\n{'bucket':<28}{'uploaded':>10}{'copied':>10}{'failed':>10}{'sent GB':>10}{'min':>8}" + "\033[0m")
+        for bucket_name, entry in report.items():
+            print(f"{bucket_name:<28}{len(entry['uploaded']):>10}{len(entry['copied']):>10}{len(entry['failed']):>10}"
+                  f"{entry['bytes_sent'] / 1024**3:>10.2f}{entry['seconds'] / 60:>8.1f}")
+        print(f"Read {bytes_read / 1024**3:.2f} GB on-prem once for {len(self.uploaders)} buckets (report: {report_path})")
+
+        return report
+
+    def close(self):
+        """
+        Shut down the part upload threads.
+
+        Args:
+            None
+
+        Return: None
+
+        """
+        self.executor.shutdown()
+
+        return
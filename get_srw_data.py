@@ -3,6 +3,10 @@ import pickle
 from collections import defaultdict
 import subprocess
 import tarfile
+from scan_cache import ScanCache
+from path_inventory import PathInventory
+from tar_extract import ParallelTarExtractor
+from profiling import profiled, span
 
 
 class GetSrwData():
@@ -13,7 +17,8 @@ class GetSrwData():
     
     """
     
-    def __init__(self, avoid_ma_fldrs, avoid_fix_fldrs, avoid_ne_fldrs, avoid_fc_sample_fldrs, fix_data_dir, input_model_data_dir, ne_data_dir, fc_sample_data_dir):
+    def __init__(self, avoid_ma_fldrs, avoid_fix_fldrs, avoid_ne_fldrs, avoid_fc_sample_fldrs, fix_data_dir, input_model_data_dir, ne_data_dir, fc_sample_data_dir, scan_cache_path=None, extract_workers=16,
+                 srw_data_root="/home/schin/work/noaa/fv3-cam/UFS_SRW_App/develop/", scan=True):
         """
         Args: 
             avoid_ma_fldrs (str): Foldername to ignore within main input model data directory 
@@ -28,6 +33,16 @@ class GetSrwData():
             input_model_data_dir (str): Source directory of the input model datasets.
             ne_data_dir (str): Source directory of the natural earth datasets. 
             fc_sample_data_dir (str): Source directory of the natural earth datasets. 
+            scan_cache_path (str): If set, directory listings are cached w/in this file & 
+                                   directories unchanged since the previous run are served
+                                   from the cache rather than relisted.
+            extract_workers (int): Number of concurrent workers copying the tar members' data
+                                   during extraction.
+            srw_data_root (str): Main directory on-prem holding the SRW dataset folders (fix,
+                                 input_model_data, NaturalEarth) which are walked.
+            scan (bool): If set, all datasets are walked, partitioned & extracted from their 
+                         tars on creation. Otherwise, the phases are left to be called 
+                         individually (e.g. to benchmark them).
 
         """
         # == Proposed setup to transfer SRW fix, input data, natural earth, & fc data samples while reserving the 
@@ -38,18 +53,40 @@ class GetSrwData():
         self.ne_data_dir = ne_data_dir
         self.fc_sample_data_dir = fc_sample_data_dir
         
-        # Extract all data directories residing w/in datasets' main hpc directories.
-        self.ma_file_dirs = self.get_data_dirs('input_model_data')
-        self.fix_file_dirs = self.get_data_dirs('fix_data')
-        self.ne_dirs = self.get_data_dirs('ne_data')
-        self.fc_sample_dirs = self.get_data_dirs('fc_sample_data')
-        
         # Remove file directories comprise of a folder name.        
         self.avoid_ma_fldrs = avoid_ma_fldrs
         self.avoid_fix_fldrs = avoid_fix_fldrs
         self.avoid_ne_fldrs = avoid_ne_fldrs
         self.avoid_fc_sample_fldrs = avoid_fc_sample_fldrs
         
+        # Persistent cache of the directory listings from previous runs.
+        self.scan_cache = ScanCache(scan_cache_path) if scan_cache_path is not None else None
+        
+        # Extracts the filtered tar members w/ concurrent reads of their data.
+        self.tar_extractor = ParallelTarExtractor(max_workers=extract_workers)
+        
+        # Main directory of the SRW datasets on-prem.
+        self.srw_data_root = srw_data_root
+        
+        if scan:
+            self.scan()
+    
+    def scan(self):
+        """
+        Walk, partition & extract all datasets of interest.
+        
+        Args:
+            None
+            
+        Return: None
+        
+        """
+        # Extract all data directories residing w/in datasets' main hpc directories.
+        self.ma_file_dirs = self.get_data_dirs('input_model_data')
+        self.fix_file_dirs = self.get_data_dirs('fix_data')
+        self.ne_dirs = self.get_data_dirs('ne_data')
+        self.fc_sample_dirs = self.get_data_dirs('fc_sample_data')
+        
         # List of all model analysis data files for SRW's multi-preprocessor.
         self.partition_ma_datasets = self.get_model_analysis_data()
 
@@ -74,7 +111,12 @@ class GetSrwData():
         
         # TODO: Adding SRW forecast samples to support SRW application (include: Observation, Model Forecast Output)
         self.fc_sample_data_list = self.get_tar_data_dirs('fc_sample_data')   
+        
+        # Persist the directory listings for the next run.
+        if self.scan_cache is not None:
+            self.scan_cache.save()
     
+    @profiled()
     def get_data_dirs(self, data_type):
         """
         Extract list of all file directories in datasets' main directory (not derived from tar).
@@ -83,8 +125,8 @@ class GetSrwData():
             data_type (str): Foldername of dataset category of interest. 
                              Options:'input_model_data', 'fix_data', 'ne_data', 'fc_sample_data'
             
-        Return (list): List of all file directories in datasets' main directory
-        of interest.
+        Return (InventoryView): All file directories in datasets' main directory
+        of interest, held w/in a compact PathInventory.
         
         """
         # Dataset category.
@@ -103,24 +145,19 @@ class GetSrwData():
         else:
             print(f"{data_type} does not exist")
           
-        # Generate list of all file directories residing w/in datasets' 
-        # main directory of interest. 
-        file_dirs = []
-        file_size = []
-        root_dirs = []
-        
-        # ** TODO: Grab the root of the folders of interests and set as an argument to class for non-tar 
-        # situations. If tar is being transferred, set to "./" + suffix_fldr**
-        for root_dir, subfolders, filenames in os.walk("/home/schin/work/noaa/fv3-cam/UFS_SRW_App/develop/" + suffix_fldr, followlinks=True):
-            root_dirs.append(root_dir)
-            for file in filenames:
-                file_dirs.append(os.path.join(root_dir, file))
+        # Generate inventory of all file directories residing w/in datasets' 
+        # main directory of interest (directories interned, sizes stat'ed on demand). 
+        inventory = PathInventory()
+        
+        # ** TODO: If tar is being transferred, set to "./" + suffix_fldr**
+        data_dir = os.path.join(self.srw_data_root, suffix_fldr)
+        with span(f"GetSrwData.walk[{data_type}]"):
+            root_dirs = inventory.add_walk(self.walk_data_dir(data_type, data_dir, avoid_fldrs))
+        file_dirs = inventory.view()
         
         # List of all data folders/files in datasets' main directory of interest.
         
-        # ** TODO: Grab the root of the folders of interests and set as an argument to class for non-tar 
-        # situations. If tar is being transferred, set to "./" + suffix_fldr**
-        root_list = os.listdir("/home/schin/work/noaa/fv3-cam/UFS_SRW_App/develop/" + suffix_fldr)
+        root_list = os.listdir(data_dir)
         print("\033[1m" +\
               "\nAll Primary Dataset Folders In SRW's " +\
               f"{data_type} Data Directory:" +\
@@ -128,10 +165,29 @@ class GetSrwData():
         
         # Removal of personal names.
         if avoid_fldrs != None:
-            file_dirs = [x for x in file_dirs if any(x for name in avoid_fldrs if name not in x)]
+            file_dirs = file_dirs.select(lambda x: any(x for name in avoid_fldrs if name not in x))
         
         return file_dirs
     
+    def walk_data_dir(self, data_type, data_dir, avoid_fldrs):
+        """
+        Walk a dataset's main directory, serving unchanged directories from the scan cache (if set).
+        
+        Args:
+            data_type (str): Foldername of dataset category of interest.
+            data_dir (str): Main directory of the dataset category.
+            avoid_fldrs (list): Foldernames to ignore w/in the main directory. The cached 
+                                listings are invalidated when these or the main directory change.
+            
+        Return (generator): Yields (root_dir, subfolders, filenames) tuples as os.walk.
+        
+        """
+        if self.scan_cache is None:
+            return os.walk(data_dir, followlinks=True)
+        
+        return self.scan_cache.walk(data_type, data_dir, (data_dir, tuple(avoid_fldrs or ())), followlinks=True)
+    
+    @profiled()
     def get_tar_data_dirs(self, dataset_type):
         """
         Extract list of all file directories in datasets' main directory (tar).
@@ -140,8 +196,9 @@ class GetSrwData():
             tar_data_dir (str):
             dataset_type (str):
             
-        Return (list): List of filtered file directories in datasets' extracted 
-        from source directory.
+        Return (InventoryView): Sorted file directories in datasets' extracted 
+        from source directory, held w/in a compact PathInventory (w/ the members'
+        sizes & mtimes).
         
         """
         # List of all directories from source.
@@ -170,26 +227,27 @@ class GetSrwData():
             avoid = []
         
         elif dataset_type == 'fc_sample_data': 
-            tar_data_dir = self.fc_sample_data
+            tar_data_dir = self.fc_sample_data_dir
             avoid = []
         
         # Open file in read mode.
         file_obj = tarfile.open(tar_data_dir,"r")
 
         # List of file directories in tar
-        tar_file_list = []
-        for f_dir in file_obj.getmembers():
-            tar_file_list.append(f_dir.name)
-        tar_file_list.sort()
+        with span(f"GetSrwData.tar_getmembers[{dataset_type}]"):
+            tar_file_list = PathInventory.from_tar(file_obj.getmembers()).view().sorted()
         print(f"\nObtained list of files from {dataset_type} source.")
         print(f"Total Files: {len(tar_file_list)}")
         
         # Filtered directories from source.
-        file_obj.extractall(members=[x for x in file_obj.getmembers() if x.name not in avoid])
-        print(f"Filtered files from {dataset_type} source extracted to working dir.")
+        with span(f"GetSrwData.extractall[{dataset_type}]"):
+            extracted = self.tar_extractor.extract(file_obj, members=[x for x in file_obj.getmembers() if x.name not in avoid])
+        print(f"Filtered files from {dataset_type} source extracted to working dir " +\
+              f"({extracted['bytes'] / 1024**2:.1f} MB in {extracted['seconds']:.1f} s).")
         
         return tar_file_list
 
+    @profiled()
     def get_model_analysis_data(self):
         """
         Extract list of all external model analysis file directories.
@@ -202,32 +260,14 @@ class GetSrwData():
 
         """
         
-        # Extract list of all external model analysis file directories.
-        partition_ma_datasets = defaultdict(list) 
-        for file_dir in self.ma_file_dirs:
-
-            # FV3GFS data files w/ root directory truncated.
-            if any(subfolder in file_dir for subfolder in ['FV3GFS']):
-                partition_ma_datasets['FV3GFS'].append(file_dir.replace("./", ""))
-
-            # GSMGFS data files w/ root directory truncated.
-            if any(subfolder in file_dir for subfolder in ['GSMGFS']):
-                partition_ma_datasets['GSMGFS'].append(file_dir.replace("./", ""))
-                
-            # HRRR data files w/ root directory truncated.
-            if any(subfolder in file_dir for subfolder in ['HRRR']):
-                partition_ma_datasets['HRRR'].append(file_dir.replace("./", ""))
-                
-            # NAM data files w/ root directory truncated.
-            if any(subfolder in file_dir for subfolder in ['NAM']):
-                partition_ma_datasets['NAM'].append(file_dir.replace("./", ""))
-                
-            # RAP data files w/ root directory truncated.
-            if any(subfolder in file_dir for subfolder in ['RAP']):
-                partition_ma_datasets['RAP'].append(file_dir.replace("./", ""))
+        # Extract views of the FV3GFS, GSMGFS, HRRR, NAM & RAP data files w/ root 
+        # directory truncated (indexes into the inventory rather than copied paths).
+        partition_ma_datasets = self.ma_file_dirs.partition(['FV3GFS', 'GSMGFS', 'HRRR', 'NAM', 'RAP'],
+                                                            replace=("./", ""))
 
         return partition_ma_datasets    
     
+    @profiled()
     def get_specific_model_analysis_files(self, fv3gfs_ts, gsmgfs_ts, hrrr_ts, nam_ts, rap_ts):
         """
         Filters directory paths to timestamps of interest.
@@ -284,6 +324,7 @@ class GetSrwData():
  
         return filter2specific_ts_datasets    
 
+    @profiled()
     def get_fixed_data(self):
         """
         Extract list of all fixed file directories.
@@ -296,29 +337,10 @@ class GetSrwData():
         
         """
         
-        # Extract list of all grid fixed file directories.
-        partition_fix_datasets = defaultdict(list) 
-        for file_dir in self.fix_file_dirs:
-
-            # Fixed aer data files w/ root directory truncated.
-            if any(subfolder in file_dir for subfolder in ['fix_aer']):
-                partition_fix_datasets['fix_aer'].append(file_dir.replace("./", ""))
-
-            # fixed am data files w/ root directory truncated.
-            if any(subfolder in file_dir for subfolder in ['fix_am']):
-                partition_fix_datasets['fix_am'].append(file_dir.replace("./", ""))
-                
-            # Fixed lut data files w/ root directory truncated.
-            if any(subfolder in file_dir for subfolder in ['fix_lut']):
-                partition_fix_datasets['fix_lut'].append(file_dir.replace("./", ""))
-                
-            # Fixed orog data files w/ root directory truncated.
-            if any(subfolder in file_dir for subfolder in ['fix_orog']):
-                partition_fix_datasets['fix_orog'].append(file_dir.replace("./", ""))
-                
-            # Fixed orog data files w/ root directory truncated.
-            if any(subfolder in file_dir for subfolder in ['fix_sfc_climo']):
-                partition_fix_datasets['fix_sfc_climo'].append(file_dir.replace("./", ""))
+        # Extract views of the fixed aer, am, lut, orog & sfc climo data files w/ root 
+        # directory truncated.
+        partition_fix_datasets = self.fix_file_dirs.partition(['fix_aer', 'fix_am', 'fix_lut', 'fix_orog', 'fix_sfc_climo'],
+                                                              replace=("./", ""))
 
         return partition_fix_datasets    
     
@@ -373,6 +395,7 @@ class GetSrwData():
                         
 #         return filter2specific_res_datasets    
 
+    @profiled()
     def get_ne_data(self):
         """
         Extract list of all Natural Eartch file directories.
@@ -385,20 +408,12 @@ class GetSrwData():
         
         """
         
-        # Extract list of all grid fixed file directories.
-        partition_ne_datasets = defaultdict(list) 
-        for file_dir in self.ne_dirs:
-
-            # Fixed raster data files w/ root directory truncated.
-            if any(subfolder in file_dir for subfolder in ['raster_files']):
-                partition_ne_datasets['raster_files'].append(file_dir.replace("./", ""))
-
-            # fixed shapefiles data files w/ root directory truncated.
-            if any(subfolder in file_dir for subfolder in ['shapefiles']):
-                partition_ne_datasets['shapefiles'].append(file_dir.replace("./", ""))
+        # Extract views of the raster & shapefiles data files w/ root directory truncated.
+        partition_ne_datasets = self.ne_dirs.partition(['raster_files', 'shapefiles'], replace=("./", ""))
 
         return partition_ne_datasets    
 
+    @profiled()
     def get_fc_data(self):
         """
         Extract list of all forecast sample file directories.
@@ -411,16 +426,7 @@ class GetSrwData():
         
         """
         
-        # Extract list of all grid fixed file directories.
-        partition_fc_datasets = defaultdict(list) 
-        for file_dir in self.fc_sample_dirs:
-
-            # Fixed raster data files w/ root directory truncated.
-            if any(subfolder in file_dir for subfolder in ['raster_files']):
-                partition_fc_datasets['raster_files'].append(file_dir.replace("./", ""))
-
-            # fixed shapefiles data files w/ root directory truncated.
-            if any(subfolder in file_dir for subfolder in ['shapefiles']):
-                partition_fc_datasets['shapefiles'].append(file_dir.replace("./", ""))
+        # Extract views of the raster & shapefiles data files w/ root directory truncated.
+        partition_fc_datasets = self.fc_sample_dirs.partition(['raster_files', 'shapefiles'], replace=("./", ""))
 
         return partition_fc_datasets   
\ No newline at end of file
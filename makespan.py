@@ -0,0 +1,173 @@
+import heapq
+import os
+
+
+def simulate_makespan(task_costs, n_workers):
+    """
+    Expected makespan of tasks pulled in order by the next idle worker (as the workers
+    claim from the work queue).
+
+    Args:
+        task_costs (list): Expected seconds of each task, in claim order.
+        n_workers (int): Number of concurrent workers.
+
+    Return (float): Seconds until the last worker finishes.
+
+    """
+    loads = [0.0] * n_workers
+    for cost in task_costs:
+        heapq.heapreplace(loads, loads[0] + cost)
+
+    return max(loads)
+
+
+class UploadSchedule():
+    """
+    Ordered upload tasks produced by MakespanScheduler. Each task is a list of
+    (item, size) pairs claimed & uploaded together by one worker.
+
+    """
+
+    def __init__(self, tasks, task_costs, n_workers, fifo_makespan, lower_bound):
+        self.tasks = tasks
+        self.task_costs = task_costs
+        self.n_workers = n_workers
+        self.expected_makespan = simulate_makespan(task_costs, n_workers)
+        self.fifo_makespan = fifo_makespan
+        self.lower_bound = lower_bound
+
+    def summary(self):
+        """
+        Args:
+            None
+
+        Return (dict): Number of tasks & items, w/ the expected makespan of the schedule,
+        of the unscheduled (FIFO) order & the lower bound, in seconds.
+
+        """
+        return {'workers': self.n_workers,
+                'tasks': len(self.tasks),
+                'items': sum(len(task) for task in self.tasks),
+                'bytes': sum(size for task in self.tasks for _, size in task),
+                'expected_makespan': self.expected_makespan,
+                'fifo_makespan': self.fifo_makespan,
+                'lower_bound': self.lower_bound}
+
+
+class MakespanScheduler():
+    """
+    Size-aware ordering of a batch of uploads across concurrent workers.
+
+    Pulling the data files in listing order lets a few multi-GB files (e.g. GRIB2 analyses)
+    start late & leave one worker uploading long after the others are idle. Instead, the
+    large files are ordered longest-first (LPT) & the small files are packed into batches
+    which come last, filling the gaps left between the workers' loads. A batch's cost is
+    capped at a fraction of the makespan so the workers finish close together.
+
+    Costs are estimated as a fixed per-file overhead (requests, ETag check) plus the size
+    over the per-worker throughput; the estimate only needs to be proportionate.
+
+    """
+
+    def __init__(self, n_workers, throughput=50*1024**2, per_file_secs=0.05, large_threshold=None,
+                 batch_fraction=0.02, min_batch_secs=1.0):
+        """
+        Args:
+            n_workers (int): Number of concurrent workers (e.g. Slurm array tasks).
+            throughput (float): Expected upload throughput of a worker in bytes/s.
+            per_file_secs (float): Expected fixed overhead of uploading a data file in seconds.
+            large_threshold (int): Data files of at least this size are scheduled on their own.
+                                   If None, the size a worker uploads in a batch's cost cap,
+                                   so every batch is shorter than any large data file & is
+                                   claimed after them.
+            batch_fraction (float): Cap on the cost of a batch of small files as a fraction
+                                    of the makespan's lower bound.
+            min_batch_secs (float): Floor on the cost of a batch (amortizes the claim).
+
+        """
+        self.n_workers = n_workers
+        self.throughput = throughput
+        self.per_file_secs = per_file_secs
+        self.large_threshold = large_threshold
+        self.batch_fraction = batch_fraction
+        self.min_batch_secs = min_batch_secs
+
+    def cost(self, size):
+        """
+        Args:
+            size (int): Size of a data file in bytes.
+
+        Return (float): Expected seconds to upload the data file.
+
+        """
+        return self.per_file_secs + size / self.throughput
+
+    def schedule(self, items, fifo_batch_size=50):
+        """
+        Args:
+            items (list): (item, size) pairs in listing order (e.g. ((dataset_type, file_dir), size)).
+            fifo_batch_size (int): Batch size of the unscheduled claims the schedule is
+                                   compared against.
+
+        Return (UploadSchedule): Tasks in claim order & the expected makespans.
+
+        """
+        costs = [self.cost(size) for _, size in items]
+        total = sum(costs)
+        lower_bound = max(total / self.n_workers, max(costs, default=0.0))
+        fifo_costs = [sum(costs[i:i + fifo_batch_size]) for i in range(0, len(costs), fifo_batch_size)]
+        fifo_makespan = simulate_makespan(fifo_costs, self.n_workers)
+
+        # Large data files on their own. Unless set, the threshold is the size uploaded w/in
+        # a batch's cost cap, so a data file too long to share a batch is never batched.
+        batch_secs = max(self.min_batch_secs, self.batch_fraction * lower_bound)
+        large_threshold = self.large_threshold
+        if large_threshold is None:
+            large_threshold = int(self.throughput * batch_secs)
+        tasks = [(self.cost(pair[1]), [pair]) for pair in items if pair[1] >= large_threshold]
+
+        # Small data files packed (largest first) into batches of bounded cost.
+        batch, batch_cost = [], 0.0
+        for pair in sorted((pair for pair in items if pair[1] < large_threshold), key=lambda pair: -pair[1]):
+            cost = self.cost(pair[1])
+            if batch and batch_cost + cost > batch_secs:
+                tasks.append((batch_cost, batch))
+                batch, batch_cost = [], 0.0
+            batch.append(pair)
+            batch_cost += cost
+        if batch:
+            tasks.append((batch_cost, batch))
+
+        # Longest first (LPT) -- the batches are the shortest tasks & fill the gaps at the end.
+        tasks.sort(key=lambda task: (-task[0], len(task[1]) > 1))
+
+        return UploadSchedule([task for _, task in tasks], [cost for cost, _ in tasks],
+                              self.n_workers, fifo_makespan, lower_bound)
+
+
+def sized_items(file_relative_dirs):
+    """
+    Pair each data file of the partitions w/ its size -- taken from the scan's
+    PathInventory where available, otherwise stat'ed.
+
+    Args:
+        file_relative_dirs (dict): Dictionary partitioning the file directories into the
+                                   dataset types (e.g. the partitions of GetSrwData).
+
+    Return (list): ((dataset_type, file_dir), size) pairs. Missing data files are sized 0 &
+    a data file w/in several partitions is paired once (w/ its first dataset type).
+
+    """
+    items = []
+    seen = set()
+    for dataset_type, ts_files in file_relative_dirs.items():
+        if hasattr(ts_files, 'sized'):
+            pairs = ts_files.sized()
+        else:
+            pairs = [(file_dir, os.path.getsize(file_dir) if os.path.exists(file_dir) else 0) for file_dir in ts_files]
+        for file_dir, size in pairs:
+            if file_dir not in seen:
+                seen.add(file_dir)
+                items.append(((dataset_type, file_dir), size))
+
+    return items
@@ -0,0 +1,178 @@
+import mmap
+import os
+import threading
+
+
+class MemoryBudget():
+    """
+    Hard cap on the total bytes of multipart upload parts in flight across all concurrent
+    uploads sharing the budget.
+
+    """
+
+    def __init__(self, max_bytes):
+        """
+        Args:
+            max_bytes (int): Maximum number of part bytes in flight at any given time.
+
+        """
+        self.max_bytes = max_bytes
+        self.in_flight = 0
+        self.peak = 0
+        self.cond = threading.Condition()
+
+    def acquire(self, nbytes):
+        """
+        Block until the part fits within the budget. A part larger than the whole budget
+        is admitted once nothing else is in flight.
+
+        Args:
+            nbytes (int): Size of the part in bytes.
+
+        Return: None
+
+        """
+        with self.cond:
+            while self.in_flight > 0 and self.in_flight + nbytes > self.max_bytes:
+                self.cond.wait()
+            self.in_flight += nbytes
+            self.peak = max(self.peak, self.in_flight)
+
+        return
+
+    def release(self, nbytes):
+        """
+        Return a part's bytes to the budget once its upload completes.
+
+        Args:
+            nbytes (int): Size of the part in bytes.
+
+        Return: None
+
+        """
+        with self.cond:
+            self.in_flight -= nbytes
+            self.cond.notify_all()
+
+        return
+
+
+# Process-wide budget shared by all uploaders not given their own (the default
+# max_concurrency x multipart_chunksize).
+DEFAULT_MEMORY_BUDGET = MemoryBudget(10 * 50000 * 1024)
+
+
+class MmapPartReader():
+    """
+    File-like view over a byte range of a memory-mapped data file, serving a multipart
+    upload part's body as memoryview slices rather than copying it into new buffers.
+
+    """
+
+    def __init__(self, mm, offset, length, callback=None):
+        """
+        Args:
+            mm (mmap.mmap): Memory-mapped data file.
+            offset (int): Starting byte of the part.
+            length (int): Number of bytes in the part.
+            callback (ProgressPercentage): If set, receives the bytes read. Bytes read again
+                                           after a rewind (e.g. a retried request or a
+                                           checksum computed over the body) are reported once.
+
+        """
+        self.mm = mm
+        self.offset = offset
+        self.length = length
+        self.callback = callback
+        self.view = memoryview(mm)[offset:offset + length]
+        self.pos = 0
+
+        # Highest position reported to the callback.
+        self.reported = 0
+
+    def read(self, size=-1):
+        """
+        Args:
+            size (int): Maximum number of bytes to read. If negative, read the rest of the part.
+
+        Return (memoryview): Zero-copy slice of the part.
+
+        """
+        if size is None or size < 0:
+            size = self.length - self.pos
+        chunk = self.view[self.pos:self.pos + size]
+        self.pos += len(chunk)
+        if self.callback is not None and self.pos > self.reported:
+            self.callback(self.pos - self.reported)
+            self.reported = self.pos
+
+        return chunk
+
+    def seek(self, pos, whence=0):
+        """
+        Reposition within the part (e.g. when botocore rewinds the body to retry a request).
+
+        Args:
+            pos (int): Offset relative to whence.
+            whence (int): 0 (start of part), 1 (current position) or 2 (end of part).
+
+        Return (int): New position within the part.
+
+        """
+        if whence == 1:
+            pos += self.pos
+        elif whence == 2:
+            pos += self.length
+        self.pos = min(max(pos, 0), self.length)
+
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def seekable(self):
+        return True
+
+    def readable(self):
+        return True
+
+    def __len__(self):
+        return self.length
+
+    def close(self, drop_pages=True):
+        """
+        Release the memoryview & drop the part's pages from this process' resident set.
+
+        Args:
+            drop_pages (bool): If False, the pages are kept (e.g. while other readers of the
+                               same part are still sending it).
+
+        Return: None
+
+        """
+        if self.view is not None:
+            self.view.release()
+            self.view = None
+            if drop_pages and hasattr(self.mm, 'madvise') and hasattr(mmap, 'MADV_DONTNEED'):
+                start = self.offset - self.offset % mmap.PAGESIZE
+                self.mm.madvise(mmap.MADV_DONTNEED, start, self.offset + self.length - start)
+
+        return
+
+
+def open_mmap(file_path):
+    """
+    Memory-map a data file for reading.
+
+    Args:
+        file_path (str): Data file's full directory path (incl. filename).
+
+    Return (mmap.mmap): Read-only memory map of the file. None for an empty file, which
+    cannot be mapped.
+
+    """
+    if os.path.getsize(file_path) == 0:
+        return None
+    with open(file_path, 'rb') as f:
+
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
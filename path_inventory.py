@@ -0,0 +1,343 @@
+import os
+import sys
+from array import array
+from collections import defaultdict
+
+# Size/mtime of an entry which has not been stat'ed.
+UNKNOWN = -1
+
+
+class PathInventory():
+    """
+    Compact inventory of the data files of a source tree (or tar).
+
+    Rather than a list of full path strings -- where the long root directory (e.g.
+    '/.../UFS_SRW_App/develop/input_model_data/FV3GFS/...') is repeated in every entry & again
+    in every partition copying the entry -- each entry is a (directory, name) pair of indexes
+    into interned directory & name tables, w/ the sizes & mtimes held alongside in arrays.
+    An entry costs 24 bytes plus its share of the unique directory & file names, which are
+    few (the same names recur across the cycle folders).
+
+    Path strings are built on access. Subsets & partitions of the inventory are
+    InventoryViews holding only an array of entry indexes.
+
+    """
+
+    def __init__(self):
+        self.dirs = []
+        self.dir_ids = {}
+        self.names = []
+        self.name_ids = {}
+        self.entry_dirs = array('I')
+        self.entry_names = array('I')
+        self.sizes = array('q')
+        self.mtimes = array('q')
+
+    def intern_dir(self, dir_path):
+        """
+        Args:
+            dir_path (str): Directory path.
+
+        Return (int): Index of the directory w/in the directory table.
+
+        """
+        dir_id = self.dir_ids.get(dir_path)
+        if dir_id is None:
+            dir_id = self.dir_ids[dir_path] = len(self.dirs)
+            self.dirs.append(sys.intern(dir_path))
+
+        return dir_id
+
+    def add(self, dir_id, name, size=UNKNOWN, mtime_ns=UNKNOWN):
+        """
+        Append an entry.
+
+        Args:
+            dir_id (int): Index of the entry's directory (see intern_dir).
+            name (str): File name of the entry.
+            size (int): Size in bytes (UNKNOWN if not stat'ed).
+            mtime_ns (int): Modification time in nanoseconds (UNKNOWN if not stat'ed).
+
+        Return (int): Index of the entry.
+
+        """
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            name_id = self.name_ids[name] = len(self.names)
+            self.names.append(sys.intern(name))
+        self.entry_dirs.append(dir_id)
+        self.entry_names.append(name_id)
+        self.sizes.append(size)
+        self.mtimes.append(mtime_ns)
+
+        return len(self.entry_dirs) - 1
+
+    def add_path(self, path, size=UNKNOWN, mtime_ns=UNKNOWN):
+        """
+        Append an entry from its full path (e.g. a tar member name).
+
+        Args:
+            path (str): Path of the entry.
+            size (int): Size in bytes (UNKNOWN if not stat'ed).
+            mtime_ns (int): Modification time in nanoseconds (UNKNOWN if not stat'ed).
+
+        Return (int): Index of the entry.
+
+        """
+        dir_path, _, name = path.rpartition('/')
+
+        return self.add(self.intern_dir(dir_path), name, size, mtime_ns)
+
+    def add_walk(self, walker):
+        """
+        Append the data files of a directory walk.
+
+        Args:
+            walker (iterable): (root_dir, subfolders, filenames) tuples as yielded by os.walk.
+
+        Return (list): Root directories walked.
+
+        """
+        root_dirs = []
+        for root_dir, subfolders, filenames in walker:
+            root_dirs.append(root_dir)
+            dir_id = self.intern_dir(root_dir)
+            for file in filenames:
+                self.add(dir_id, file)
+
+        return root_dirs
+
+    @classmethod
+    def from_tar(cls, tar_members):
+        """
+        Args:
+            tar_members (list): TarInfo members of a tar.
+
+        Return (PathInventory): Inventory of the members w/ their sizes & mtimes.
+
+        """
+        inventory = cls()
+        for member in tar_members:
+            inventory.add_path(member.name, member.size, int(member.mtime) * 10**9)
+
+        return inventory
+
+    def path(self, index):
+        """
+        Args:
+            index (int): Index of the entry.
+
+        Return (str): Full path of the entry (as os.path.join of its directory & name).
+
+        """
+        dir_path = self.dirs[self.entry_dirs[index]]
+        name = self.names[self.entry_names[index]]
+        if not dir_path:
+            return name
+        if dir_path.endswith('/'):
+            return dir_path + name
+
+        return dir_path + '/' + name
+
+    def stat(self, indexes=None):
+        """
+        Fill in the sizes & mtimes of the entries not stat'ed yet (e.g. before scheduling
+        the uploads by size). Entries which no longer exist keep UNKNOWN.
+
+        Args:
+            indexes (iterable): Indexes of the entries to stat. If None, all entries.
+
+        Return: None
+
+        """
+        sizes, mtimes = self.sizes, self.mtimes
+        for index in range(len(self)) if indexes is None else indexes:
+            if sizes[index] != UNKNOWN:
+                continue
+            try:
+                st = os.stat(self.path(index))
+            except OSError:
+                continue
+            sizes[index] = st.st_size
+            mtimes[index] = st.st_mtime_ns
+
+        return
+
+    def view(self, replace=None):
+        """
+        Args:
+            replace (tuple): (old, new) substring replacement applied to the paths on access
+                             (e.g. ('./', '') to truncate the root directory).
+
+        Return (InventoryView): View of all entries.
+
+        """
+        return InventoryView(self, array('I', range(len(self))), replace)
+
+    def nbytes(self):
+        """
+        Args:
+            None
+
+        Return (int): Approximate memory held by the inventory in bytes.
+
+        """
+        tables = sum(sys.getsizeof(s) for s in self.dirs) + sum(sys.getsizeof(s) for s in self.names)
+        tables += sum(sys.getsizeof(x) for x in (self.dirs, self.names, self.dir_ids, self.name_ids))
+        arrays = sum(sys.getsizeof(x) for x in (self.entry_dirs, self.entry_names, self.sizes, self.mtimes))
+
+        return tables + arrays
+
+    def __len__(self):
+        return len(self.entry_dirs)
+
+    def __iter__(self):
+        return (self.path(index) for index in range(len(self)))
+
+    def __getitem__(self, index):
+        return self.path(range(len(self))[index])
+
+
+class InventoryView():
+    """
+    Read-only sequence of a subset of a PathInventory's entries (e.g. the data files of one
+    dataset type), yielding their path strings on access. Stands in for the lists of file
+    directories (iteration, len & indexing).
+
+    """
+
+    def __init__(self, inventory, indexes, replace=None):
+        """
+        Args:
+            inventory (PathInventory): Inventory holding the entries.
+            indexes (array): Indexes of the entries w/in the inventory.
+            replace (tuple): (old, new) substring replacement applied to the paths on access.
+
+        """
+        self.inventory = inventory
+        self.indexes = indexes
+        self.replace = replace
+
+    def path(self, index):
+        path = self.inventory.path(index)
+        if self.replace is not None:
+            path = path.replace(*self.replace)
+
+        return path
+
+    def select(self, predicate):
+        """
+        Args:
+            predicate (function): Called w/ each entry's full path (before replacement).
+
+        Return (InventoryView): View of the entries for which the predicate is true.
+
+        """
+        path = self.inventory.path
+
+        return InventoryView(self.inventory, array('I', (i for i in self.indexes if predicate(path(i)))), self.replace)
+
+    def partition(self, keys, replace=None):
+        """
+        Partition the entries by the keys their full path contains (an entry containing
+        several keys belongs to each of their partitions).
+
+        The keys are matched once per interned directory & once per interned name rather
+        than once per entry.
+
+        Args:
+            keys (list): Substrings to partition by (e.g. ['FV3GFS', 'HRRR']).
+            replace (tuple): (old, new) substring replacement applied to the paths on access.
+
+        Return (defaultdict): Mapping of each key found to an InventoryView of its entries.
+
+        """
+        inventory = self.inventory
+        dirs, names = inventory.dirs, inventory.names
+        entry_dirs, entry_names = inventory.entry_dirs, inventory.entry_names
+
+        # Only a key containing '/' can straddle the directory & name of a path.
+        slash_keys = [key for key in keys if '/' in key]
+        dir_matches, name_matches = {}, {}
+        partitions = {key: array('I') for key in keys}
+        for index in self.indexes:
+            dir_id, name_id = entry_dirs[index], entry_names[index]
+            dir_keys = dir_matches.get(dir_id)
+            if dir_keys is None:
+                dir_keys = dir_matches[dir_id] = tuple(key for key in keys if key in dirs[dir_id])
+            name_keys = name_matches.get(name_id)
+            if name_keys is None:
+                name_keys = name_matches[name_id] = tuple(key for key in keys if key in names[name_id])
+            for key in dir_keys:
+                partitions[key].append(index)
+            for key in name_keys:
+                if key not in dir_keys:
+                    partitions[key].append(index)
+            for key in slash_keys:
+                if key not in dir_keys and key not in name_keys and key in inventory.path(index):
+                    partitions[key].append(index)
+
+        views = defaultdict(list)
+        for key, indexes in partitions.items():
+            if indexes:
+                views[key] = InventoryView(inventory, indexes, replace)
+
+        return views
+
+    def sorted(self):
+        """
+        Args:
+            None
+
+        Return (InventoryView): View of the entries sorted by path.
+
+        """
+        path = self.inventory.path
+
+        return InventoryView(self.inventory, array('I', sorted(self.indexes, key=path)), self.replace)
+
+    def sized(self):
+        """
+        Pair the entries' paths w/ their sizes, stat'ing the entries whose size is not known
+        yet (e.g. to schedule the uploads by size).
+
+        Args:
+            None
+
+        Return (list): (path, size) pairs. Entries which no longer exist are sized 0.
+
+        """
+        self.inventory.stat(self.indexes)
+        sizes = self.inventory.sizes
+
+        return [(self.path(i), max(sizes[i], 0)) for i in self.indexes]
+
+    def total_size(self):
+        """
+        Args:
+            None
+
+        Return (int): Total size of the entries in bytes (the entries not stat'ed are skipped).
+
+        """
+        sizes = self.inventory.sizes
+
+        return sum(sizes[i] for i in self.indexes if sizes[i] != UNKNOWN)
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def __iter__(self):
+        return (self.path(index) for index in self.indexes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return InventoryView(self.inventory, self.indexes[index], self.replace)
+
+        return self.path(self.indexes[index])
+
+    def __repr__(self):
+
+        # Printed as the list of paths it stands in for (e.g. the partitions printed by
+        # TransferSrwData).
+        return repr(list(self))
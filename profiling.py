@@ -0,0 +1,270 @@
+import atexit
+import functools
+import os
+import sys
+import threading
+import time
+
+
+class _NullSpan():
+    """
+    Span returned while profiling is disabled -- entering & exiting it does nothing.
+
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span():
+    """
+    Timing span of a phase while profiling is enabled.
+
+    """
+    __slots__ = ('profiler', 'name', 'start', 'mem_start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.mem_start = self.profiler.traced_memory()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        delta = time.perf_counter() - self.start
+        mem_delta = self.profiler.traced_memory() - self.mem_start
+        self.profiler.record(self.name, delta, mem_delta)
+        return False
+
+
+class Profiler():
+    """
+    Phase-level profiling of the transfer scripts: timing spans around each GetSrwData &
+    UploadData phase, an optional cProfile/tracemalloc capture & a summary table at the end
+    of the run. While disabled, a span costs a single attribute check.
+
+    Enabled w/ the '--profile' option of the transfer scripts or the SRW_PROFILE environment
+    variable: 'spans' (timing only), 'cprofile', 'tracemalloc', or a comma-separated
+    combination (e.g. SRW_PROFILE=cprofile,tracemalloc python transfer_srw_tar.py ...).
+
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.cprofiler = None
+        self.tracemalloc = None
+        self.output_prefix = 'srw_profile'
+        self.run_start = None
+
+    def enable(self, modes='spans', output_prefix='srw_profile'):
+        """
+        Enable profiling for the rest of the run & print the summary at exit.
+
+        Args:
+            modes (str): Comma-separated capture modes: 'spans', 'cprofile' and/or 'tracemalloc'.
+            output_prefix (str): Prefix of the files the cProfile stats are written to.
+
+        Return: None
+
+        """
+        if self.enabled:
+            return
+        modes = {mode.strip() for mode in modes.split(',')}
+        self.output_prefix = output_prefix
+        if 'tracemalloc' in modes:
+            import tracemalloc
+            self.tracemalloc = tracemalloc
+            tracemalloc.start()
+        if 'cprofile' in modes:
+            import cProfile
+            self.cprofiler = cProfile.Profile()
+            self.cprofiler.enable()
+        self.run_start = time.perf_counter()
+        self.enabled = True
+        atexit.register(self.summary)
+
+        return
+
+    def span(self, name):
+        """
+        Args:
+            name (str): Name of the phase.
+
+        Return (context manager): Span timing the phase (a no-op while disabled).
+
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+
+        return _Span(self, name)
+
+    def traced_memory(self):
+        """
+        Args:
+            None
+
+        Return (int): Bytes currently allocated as traced by tracemalloc (0 if not tracing).
+
+        """
+        if self.tracemalloc is None:
+            return 0
+
+        return self.tracemalloc.get_traced_memory()[0]
+
+    def record(self, name, delta, mem_delta=0):
+        """
+        Accumulate the duration of a phase.
+
+        Args:
+            name (str): Name of the phase.
+            delta (float): Duration in seconds.
+            mem_delta (int): Change in traced memory in bytes.
+
+        Return: None
+
+        """
+        with self.lock:
+            stat = self.stats.get(name)
+            if stat is None:
+                stat = self.stats[name] = [0, 0.0, 0.0, 0]
+            stat[0] += 1
+            stat[1] += delta
+            stat[2] = max(stat[2], delta)
+            stat[3] += mem_delta
+
+        return
+
+    def summary(self, stream=None):
+        """
+        Print the summary table of the phases (& the cProfile/tracemalloc captures).
+
+        Args:
+            stream (file): Stream to print to. If None, sys.stdout.
+
+        Return: None
+
+        """
+        stream = stream or sys.stdout
+        if self.cprofiler is not None:
+            self.cprofiler.disable()
+        total = time.perf_counter() - self.run_start if self.run_start is not None else 0.0
+        print("\n\033[1m" + f"Profile Summary (run time {total:.2f} s)" + "\033[0m", file=stream)
+        header = f"{'phase':<48}{'calls':>8}{'total s':>12}{'mean s':>12}{'max s':>12}{'% run':>8}"
+        if self.tracemalloc is not None:
+            header += f"{'mem MB':>10}"
+        print(header, file=stream)
+        for name, (calls, phase_total, phase_max, mem_delta) in sorted(self.stats.items(), key=lambda x: -x[1][1]):
+            row = (f"{name:<48}{calls:>8}{phase_total:>12.3f}{phase_total / calls:>12.4f}"
+                   f"{phase_max:>12.3f}{100 * phase_total / total if total else 0:>8.1f}")
+            if self.tracemalloc is not None:
+                row += f"{mem_delta / 1024**2:>10.1f}"
+            print(row, file=stream)
+
+        if self.tracemalloc is not None:
+            current, peak = self.tracemalloc.get_traced_memory()
+            print(f"\ntracemalloc: current {current / 1024**2:.1f} MB, peak {peak / 1024**2:.1f} MB", file=stream)
+            for stat in self.tracemalloc.take_snapshot().statistics('lineno')[:10]:
+                print(f"  {stat}", file=stream)
+
+        if self.cprofiler is not None:
+            import pstats
+            stats_path = f"{self.output_prefix}_{os.getpid()}.pstats"
+            self.cprofiler.dump_stats(stats_path)
+            print(f"\ncProfile stats written to {stats_path} (top 20 by cumulative time):", file=stream)
+            pstats.Stats(self.cprofiler, stream=stream).sort_stats('cumulative').print_stats(20)
+
+        return
+
+
+# Profiler shared by all modules of the run.
+PROFILER = Profiler()
+
+
+def span(name):
+    """
+    Args:
+        name (str): Name of the phase.
+
+    Return (context manager): Span timing the phase on the shared profiler.
+
+    """
+    return PROFILER.span(name)
+
+
+def profiled(name=None):
+    """
+    Decorator timing every call of a function/method as a phase.
+
+    Args:
+        name (str): Name of the phase. If None, the function's qualified name.
+
+    Return (function): Decorator.
+
+    """
+    def decorator(func):
+        phase = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+            with _Span(PROFILER, phase):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def enable_from_env():
+    """
+    Enable the shared profiler if the SRW_PROFILE environment variable is set.
+
+    Args:
+        None
+
+    Return: None
+
+    """
+    modes = os.environ.get('SRW_PROFILE')
+    if modes:
+        PROFILER.enable('spans' if modes in ('1', 'true', 'yes') else modes)
+
+    return
+
+
+def enable_from_argv(argv):
+    """
+    Enable the shared profiler from a '--profile[=modes]' option & strip the option from the
+    arguments, for entry points which take bare positional arguments.
+
+    Args:
+        argv (list): Command line arguments (e.g. sys.argv).
+
+    Return (list): Arguments w/out the '--profile' option.
+
+    """
+    remaining = []
+    for arg in argv:
+        if arg == '--profile':
+            PROFILER.enable('spans')
+        elif arg.startswith('--profile='):
+            PROFILER.enable(arg.split('=', 1)[1])
+        else:
+            remaining.append(arg)
+
+    return remaining
+
+
+enable_from_env()
@@ -56,4 +56,38 @@ class ProgressPercentage(object):
             # Return system resource back to memory.
             sys.stdout.flush()
         
-        return
\ No newline at end of file
+        return
+
+class ProgressReader(object):
+    """
+    Wrap a data file opened for reading & report the bytes read from it to a progress callback.
+    Used when the bytes transferred to cloud differ from the bytes of the source data file
+    (e.g. compressed while streaming).
+
+    """
+
+    def __init__(self, file_obj, callback):
+        """
+        Args:
+            file_obj (file): Data file opened in binary read mode.
+            callback (ProgressPercentage): Progress callback receiving the bytes read.
+
+        """
+        self.file_obj = file_obj
+        self.callback = callback
+
+    def read(self, size=-1):
+        """
+        Read from the data file & report the bytes read.
+
+        Args:
+            size (int): Maximum number of bytes to read.
+
+        Return (bytes): Bytes read from the data file.
+
+        """
+        data = self.file_obj.read(size)
+        if data:
+            self.callback(len(data))
+
+        return data
@@ -0,0 +1,326 @@
+import heapq
+import itertools
+import json
+import os
+import random
+import socket
+import time
+
+import botocore.exceptions
+
+# Error codes returned by cloud data storage which are worth retrying.
+TRANSIENT_ERROR_CODES = {'RequestTimeout', 'RequestTimeoutException', 'SlowDown', 'Throttling',
+                         'ThrottlingException', 'RequestLimitExceeded', 'InternalError',
+                         'ServiceUnavailable', 'BadDigest', 'IncompleteBody', '500', '502', '503', '504'}
+
+
+def is_transient_error(error):
+    """
+    Classify an upload error as transient (worth retrying) or permanent.
+
+    Args:
+        error (Exception): Error raised by the upload.
+
+    Return (bool): True if the error is transient (e.g. connection resets, timeouts,
+    throttling & 5xx responses). False for permanent errors (e.g. missing data files,
+    permission denied or invalid credentials).
+
+    """
+    if isinstance(error, (botocore.exceptions.ConnectionError,
+                          botocore.exceptions.HTTPClientError,
+                          socket.timeout,
+                          ConnectionError,
+                          TimeoutError)):
+        return True
+    if isinstance(error, botocore.exceptions.ClientError):
+        code = error.response.get('Error', {}).get('Code', '')
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+        return code in TRANSIENT_ERROR_CODES or status >= 500
+
+    # boto3's S3UploadFailedError only carries the underlying error in its message.
+    if type(error).__name__ == 'S3UploadFailedError':
+        return any(code in str(error) for code in TRANSIENT_ERROR_CODES) or 'timed out' in str(error).lower()
+
+    return False
+
+
+class RetryQueue():
+    """
+    Deferred queue of failed uploads awaiting a retry. Each retry is scheduled w/ jittered
+    exponential backoff so the remaining uploads continue while a flaky file waits.
+
+    """
+
+    def __init__(self, max_attempts=5, base_delay=2.0, max_delay=120.0):
+        """
+        Args:
+            max_attempts (int): Maximum number of attempts per item (incl. the first).
+            base_delay (float): Backoff of the first retry in seconds.
+            max_delay (float): Cap on the backoff in seconds.
+
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.heap = []
+        self.counter = itertools.count()
+
+    def backoff(self, attempts):
+        """
+        Full jitter backoff: uniformly drawn between 0 & the exponential backoff.
+
+        Args:
+            attempts (int): Number of attempts made so far.
+
+        Return (float): Seconds to wait before the next attempt.
+
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempts - 1)))
+
+    def defer(self, item, attempts, error):
+        """
+        Schedule a retry of a failed item if it has attempts left & the error is transient.
+
+        Args:
+            item (tuple): Item to retry.
+            attempts (int): Number of attempts made so far.
+            error (Exception): Error raised by the last attempt.
+
+        Return (bool): True if a retry was scheduled.
+
+        """
+        if attempts >= self.max_attempts or not is_transient_error(error):
+            return False
+        heapq.heappush(self.heap, (time.time() + self.backoff(attempts), next(self.counter), item, attempts))
+
+        return True
+
+    def pop_due(self):
+        """
+        Args:
+            None
+
+        Return (tuple): (item, attempts) of the next retry whose backoff has elapsed. None
+        if no retry is due.
+
+        """
+        if self.heap and self.heap[0][0] <= time.time():
+            _, _, item, attempts = heapq.heappop(self.heap)
+            return item, attempts
+
+        return None
+
+    def pop_next(self):
+        """
+        Wait for the next retry's backoff to elapse (once there is nothing else to upload).
+
+        Args:
+            None
+
+        Return (tuple): (item, attempts) of the next retry. None if the queue is empty.
+
+        """
+        if not self.heap:
+            return None
+        time.sleep(max(0, self.heap[0][0] - time.time()))
+        _, _, item, attempts = heapq.heappop(self.heap)
+
+        return item, attempts
+
+    def next_delay(self):
+        """
+        Args:
+            None
+
+        Return (float): Seconds until the next retry is due (0 if already due). None if the
+        queue is empty.
+
+        """
+        if not self.heap:
+            return None
+
+        return max(0, self.heap[0][0] - time.time())
+
+    def __len__(self):
+        return len(self.heap)
+
+    def pending(self):
+        """
+        Args:
+            None
+
+        Return (list): (item, attempts) of the retries still waiting (e.g. when the batch is
+        interrupted).
+
+        """
+        return [(item, attempts) for _, _, item, attempts in sorted(self.heap)]
+
+
+class UploadManifest():
+    """
+    Record of the uploaded & failed data files of a batch. The work list of the batch &
+    each outcome are appended to a JSON-lines journal as they happen, so a batch that crashes
+    or is killed still leaves a record of what was uploaded & what was never attempted. The
+    JSON manifest is written once the batch ends (or is interrupted) & the journal is then
+    removed.
+
+    """
+
+    def __init__(self, manifest_path, bucket_name, work=None):
+        """
+        Args:
+            manifest_path (str): Path of the JSON manifest (e.g. 'upload_failures.json').
+            bucket_name (str): Bucket the data files are uploaded to.
+            work (dict): Dataset type mapped to the data files' relative directory paths of
+                         the batch (lists or re-iterable views). The data files w/out an
+                         outcome are recorded as 'pending'.
+
+        """
+        self.manifest_path = manifest_path
+        self.journal_path = journal_path(manifest_path)
+        self.bucket_name = bucket_name
+        self.work = work
+        self.uploaded = []
+        self.failed = []
+        self.journal = open(self.journal_path, 'w', buffering=1)
+        self._append({'bucket': bucket_name})
+        if work is not None:
+            self._append({'work': {dataset_type: list(file_dirs) for dataset_type, file_dirs in work.items()}})
+
+    def _append(self, record):
+        self.journal.write(json.dumps(record) + '\n')
+        self.journal.flush()
+
+    def record_uploaded(self, file_dir):
+        """
+        Args:
+            file_dir (str): Relative directory path of the uploaded data file.
+
+        Return: None
+
+        """
+        self.uploaded.append(file_dir)
+        self._append({'uploaded': file_dir})
+
+        return
+
+    def record_failed(self, failure):
+        """
+        Args:
+            failure (dict): Dataset type, file directory, attempts & error of the failed data file.
+
+        Return: None
+
+        """
+        self.failed.append(failure)
+        self._append({'failed': failure})
+
+        return
+
+    def close(self, complete=True):
+        """
+        Write the JSON manifest (atomically) & remove the journal.
+
+        Args:
+            complete (bool): False if the batch was interrupted before all data files were
+                             attempted.
+
+        Return: None
+
+        """
+        self.journal.close()
+        manifest = {'bucket': self.bucket_name, 'uploaded': self.uploaded, 'failed': self.failed, 'complete': complete}
+        if self.work is not None:
+            manifest['pending'] = pending_work(self.work, self.uploaded, self.failed)
+        write_manifest(self.manifest_path, manifest)
+        os.remove(self.journal_path)
+
+        return
+
+
+def pending_work(work, uploaded, failed):
+    """
+    Args:
+        work (dict): Dataset type mapped to the data files' relative directory paths of the batch.
+        uploaded (list): Relative directory paths of the uploaded data files.
+        failed (list): Failures (dataset type, file directory, attempts & error) of the batch.
+
+    Return (list): Dataset type & file directory of each data file of the batch w/out an
+    outcome (e.g. never attempted, or in flight when the batch was interrupted).
+
+    """
+    done = set(uploaded) | {failure['file_dir'] for failure in failed}
+
+    return [{'dataset_type': dataset_type, 'file_dir': file_dir}
+            for dataset_type, file_dirs in work.items() for file_dir in file_dirs if file_dir not in done]
+
+
+def journal_path(manifest_path):
+    """
+    Args:
+        manifest_path (str): Path of the JSON manifest.
+
+    Return (str): Path of the manifest's JSON-lines journal (e.g. 'upload_failures.jsonl').
+
+    """
+    return os.path.splitext(manifest_path)[0] + '.jsonl'
+
+
+def write_manifest(manifest_path, manifest):
+    """
+    Write a JSON manifest via a temporary file, so a reader never sees a partial manifest.
+
+    Args:
+        manifest_path (str): Path of the JSON manifest.
+        manifest (dict): Manifest to write.
+
+    Return: None
+
+    """
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, manifest_path)
+
+    return
+
+
+def load_manifest(manifest_path):
+    """
+    Read a manifest written by upload_files2cloud. If the batch died before writing it, the
+    manifest is rebuilt from the journal.
+
+    Args:
+        manifest_path (str): Path of the JSON manifest.
+
+    Return (dict): Bucket, uploaded, failed & pending data files of the batch. A manifest
+    written before the work list was journaled has no 'pending' entry.
+
+    """
+    journal = journal_path(manifest_path)
+    if not os.path.exists(journal):
+        with open(manifest_path) as f:
+            return json.load(f)
+
+    manifest = {'bucket': None, 'uploaded': [], 'failed': [], 'complete': False}
+    work = None
+    with open(journal) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+
+                # Last line cut short by the crash.
+                break
+            if 'bucket' in record:
+                manifest['bucket'] = record['bucket']
+            elif 'work' in record:
+                work = record['work']
+            elif 'uploaded' in record:
+                manifest['uploaded'].append(record['uploaded'])
+            else:
+                manifest['failed'].append(record['failed'])
+    if work is not None:
+        manifest['pending'] = pending_work(work, manifest['uploaded'], manifest['failed'])
+
+    return manifest
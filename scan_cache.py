@@ -0,0 +1,119 @@
+import os
+import pickle
+import time
+
+
+class ScanCache():
+    """
+    Persistent cache of the directory listings of the on-prem data directories, allowing
+    incremental rescans of the source trees.
+
+    Each directory's listing is stored w/ the directory's mtime. On the next scan, a
+    directory whose mtime is unchanged is served from the cache rather than relisted --
+    creating, removing or renaming an entry w/in a directory updates its mtime, so only
+    the changed subtrees are relisted.
+
+    """
+
+    # Bump when the layout of the cached entries changes.
+    VERSION = 1
+
+    # Listings of directories modified this recently are not cached since, a change w/in
+    # the same mtime tick would go unnoticed on the next scan.
+    RACY_SECS = 2
+
+    def __init__(self, cache_path):
+        """
+        Args:
+            cache_path (str): Path of the pickle file holding the cache.
+
+        """
+        self.cache_path = cache_path
+        self.trees = {}
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'rb') as f:
+                    cache = pickle.load(f)
+                if cache.get('version') == self.VERSION:
+                    self.trees = cache['trees']
+            except (OSError, EOFError, pickle.UnpicklingError, AttributeError, KeyError) as e:
+                print(f"Ignoring unreadable scan cache {cache_path}: {e}")
+
+        # Directories served from the cache vs relisted during this run.
+        self.hits = 0
+        self.misses = 0
+
+    def walk(self, tree_key, root_dir, signature, followlinks=True):
+        """
+        Walk a source tree (as os.walk, top-down) using the cached listings of unchanged directories.
+
+        Args:
+            tree_key (str): Name of the tree w/in the cache (e.g. 'fix_data').
+            root_dir (str): Root directory of the tree.
+            signature (tuple): Settings the listings depend on (e.g. root directory & avoid
+                               folders). The tree's cached listings are invalidated if the
+                               signature differs from the one they were cached with.
+            followlinks (bool): If True, descend into symbolic links to directories.
+
+        Return (generator): Yields (root_dir, subfolders, filenames) tuples.
+
+        """
+        tree = self.trees.get(tree_key)
+        if tree is None or tree['signature'] != signature:
+            tree = {'signature': signature, 'dirs': {}}
+        cached_dirs = tree['dirs']
+        scanned_dirs = {}
+        scan_time = time.time()
+
+        stack = [root_dir]
+        while stack:
+            dir_path = stack.pop()
+            try:
+                mtime_ns = os.stat(dir_path).st_mtime_ns
+            except OSError:
+                continue
+
+            cached = cached_dirs.get(dir_path)
+            if cached is not None and cached[0] == mtime_ns:
+                subfolders, filenames = cached[1], cached[2]
+                self.hits += 1
+            else:
+                subfolders, filenames = [], []
+                try:
+                    with os.scandir(dir_path) as entries:
+                        for entry in entries:
+                            try:
+                                is_dir = entry.is_dir(follow_symlinks=followlinks)
+                            except OSError:
+                                is_dir = False
+                            (subfolders if is_dir else filenames).append(entry.name)
+                except OSError:
+                    continue
+                self.misses += 1
+
+            # Only directories visited during this scan are retained (removed ones are pruned).
+            if scan_time - mtime_ns / 1e9 > self.RACY_SECS:
+                scanned_dirs[dir_path] = (mtime_ns, subfolders, filenames)
+            yield dir_path, subfolders, filenames
+            stack.extend(os.path.join(dir_path, name) for name in reversed(subfolders))
+
+        tree['dirs'] = scanned_dirs
+        self.trees[tree_key] = tree
+
+    def save(self):
+        """
+        Write the cache to disk atomically (a concurrent reader sees the old or new cache).
+
+        Args:
+            None
+
+        Return: None
+
+        """
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'version': self.VERSION, 'trees': self.trees}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.cache_path)
+        print(f"Scan cache saved: {self.hits} directories served from cache, {self.misses} relisted.")
+
+        return
@@ -0,0 +1,260 @@
+import argparse
+import os
+import sys
+
+# Only the standard library is imported at module load -- boto3 & the uploader modules are
+# imported w/in the subcommand which needs them, so '--help' & argument errors return at
+# interpreter speed & each subcommand pays only for its own dependencies.
+# (benchmarks/bench_startup.py keeps the startup time in check.)
+
+
+def data_file_dirs(paths, file_list=None):
+    """
+    Establish the relative data file directories to transfer.
+
+    Args:
+        paths (list): Data files &/or folders (walked recursively).
+        file_list (str): Text file listing one relative data file directory per line.
+
+    Return (list): Relative data file directories.
+
+    """
+    file_dirs = []
+    if file_list is not None:
+        with open(file_list) as f:
+            file_dirs.extend(line.strip() for line in f if line.strip())
+    for path in paths:
+        if os.path.isdir(path):
+            for root_dir, subfolders, filenames in os.walk(path, followlinks=True):
+                file_dirs.extend(os.path.normpath(os.path.join(root_dir, file)) for file in filenames)
+        else:
+            file_dirs.append(os.path.normpath(path))
+
+    return file_dirs
+
+
+def upload(args):
+    """
+    Upload data files to cloud (or replay the failures of a previous batch).
+
+    """
+    from upload_data import UploadData
+    with UploadData(file_relative_dirs=None, use_bucket=args.bucket) as uploader_wrapper:
+        if args.replay is not None:
+            result = uploader_wrapper.replay_failures(args.replay, new_manifest=args.manifest,
+                                                      allow_incomplete=args.allow_incomplete)
+        elif args.also_bucket:
+            uploader_wrapper.file_relative_dirs = {'upload': data_file_dirs(args.paths, args.file_list)}
+            report = uploader_wrapper.upload_files2buckets(args.also_bucket, mode=args.fan_out,
+                                                           report_path=args.fan_out_report)
+            result = {'failed': sum(len(entry['failed']) for entry in report.values())}
+        else:
+            uploader_wrapper.file_relative_dirs = {'upload': data_file_dirs(args.paths, args.file_list)}
+            result = uploader_wrapper.upload_files2cloud(failure_manifest=args.manifest,
+                                                         max_attempts=args.max_attempts)
+
+    return 1 if result['failed'] else 0
+
+
+def tar(args):
+    """
+    Upload a tar (optionally zstd compressed) or stream a folder as a tar to the SRW bucket.
+
+    """
+    from transfer_srw_tar import TransferSrwTar
+    TransferSrwTar(args.object_dir, args.key_path, args.zstd)
+
+    return 0
+
+
+def sync(args):
+    """
+    Upload only the data files which are missing from cloud or differ from the on-prem copy.
+
+    """
+    from upload_data import UploadData
+    from verify_upload import VerifyUpload
+    with UploadData(file_relative_dirs=None, use_bucket=args.bucket) as uploader_wrapper:
+        checksum_pool = None
+        if args.checksums:
+            from checksum_pool import ChecksumPool
+            checksum_pool = ChecksumPool()
+        verifier = VerifyUpload(uploader_wrapper, max_workers=args.workers, checksum_pool=checksum_pool)
+        expected = verifier.expected_from_dicts({'sync': data_file_dirs(args.paths, args.file_list)})
+        report = verifier.verify(expected, mode=args.mode, report_path=args.report)
+        if checksum_pool is not None:
+            checksum_pool.shutdown()
+
+        stale = report['missing'] + [entry['key'] for entry in report['size_mismatch'] + report['etag_mismatch']]
+        print(f"{len(stale)} of {len(expected)} data files to upload")
+        if not stale or args.dry_run:
+            return 0
+        uploader_wrapper.file_relative_dirs = {'sync': stale}
+        result = uploader_wrapper.upload_files2cloud(failure_manifest=args.manifest)
+
+    return 1 if result['failed'] else 0
+
+
+def purge(args):
+    """
+    Remove objects w/ the given keys or key prefix from cloud.
+
+    """
+    # A prefix purge may remove a whole folder of the public bucket -- confirm it first.
+    if args.prefix is not None and not args.yes:
+        if not sys.stdin.isatty():
+            print("purge: pass --yes to remove every object under a prefix", file=sys.stderr)
+            return 2
+        answer = input(f"Remove every object under '{args.prefix}' from the {args.bucket} bucket? [y/N] ")
+        if answer.strip().lower() not in ('y', 'yes'):
+            print("purge: aborted", file=sys.stderr)
+            return 1
+
+    from upload_data import UploadData
+    with UploadData(file_relative_dirs=None, use_bucket=args.bucket) as uploader_wrapper:
+        if args.prefix is not None:
+            uploader_wrapper.purge_by_keyprefix(args.prefix)
+        for key_path in args.keys:
+            uploader_wrapper.purge(key_path)
+            print(f"Deleted: {key_path}")
+
+    return 0
+
+
+def list_keys(args):
+    """
+    Print the object keys of the bucket (optionally limited to a key prefix).
+
+    """
+    from upload_data import UploadData
+    with UploadData(file_relative_dirs=None, use_bucket=args.bucket) as uploader_wrapper:
+        for key in uploader_wrapper.get_all_s3_keys(args.prefix):
+            print(key)
+
+    return 0
+
+
+def verify(args):
+    """
+    Verify uploaded data files against cloud (see verify_upload.py).
+
+    """
+    from upload_data import UploadData
+    from verify_upload import VerifyUpload
+    with UploadData(file_relative_dirs=None, use_bucket=args.bucket) as uploader_wrapper:
+        checksum_pool = None
+        if not args.no_checksums:
+            from checksum_pool import ChecksumPool
+            checksum_pool = ChecksumPool()
+        verifier = VerifyUpload(uploader_wrapper, max_workers=args.workers, checksum_pool=checksum_pool)
+        if args.manifest is not None:
+            expected = verifier.expected_from_manifest(args.manifest)
+        else:
+            expected = verifier.expected_from_dicts({'file_list': data_file_dirs([], args.file_list)})
+        report = verifier.verify(expected, mode=args.mode, report_path=args.report)
+        if checksum_pool is not None:
+            checksum_pool.shutdown()
+    failures = ('missing', 'size_mismatch', 'etag_mismatch', 'missing_local', 'error')
+
+    return 1 if any(report[name] for name in failures) else 0
+
+
+def build_parser():
+    """
+    Args:
+        None
+
+    Return (argparse.ArgumentParser): Parser of the unified command line.
+
+    """
+    parser = argparse.ArgumentParser(prog='srw_xfer.py',
+                                     description="Transfer the UFS datasets on-prem to cloud data storage.")
+    parser.add_argument('--bucket', default='srw', choices=['rt', 'srw', 'mrw'], help="Bucket of interest.")
+    parser.add_argument('--profile', nargs='?', const='spans', default=None,
+                        help="Print a phase summary at the end of the run (spans, cprofile &/or tracemalloc).")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    sub = subparsers.add_parser('upload', help="Upload data files (or folders) to cloud.")
+    sub.add_argument('paths', nargs='*', help="Relative data file or folder directories.")
+    sub.add_argument('--file-list', help="Text file listing one relative data file directory per line.")
+    sub.add_argument('--replay', help="Re-upload the failures recorded w/in a failure manifest.")
+    sub.add_argument('--allow-incomplete', action='store_true',
+                     help="Replay only the failures of an interrupted batch whose manifest does not record its pending data files.")
+    sub.add_argument('--manifest', default='upload_failures.json', help="Failure manifest to write.")
+    sub.add_argument('--max-attempts', type=int, default=5)
+    sub.add_argument('--also-bucket', nargs='+', default=None, choices=['rt', 'srw', 'mrw'],
+                     help="Also upload to these buckets, reading each data file once.")
+    sub.add_argument('--fan-out', choices=['auto', 'broadcast', 'copy'], default='auto',
+                     help="Send the same buffers to all buckets or copy server-side after the first upload.")
+    sub.add_argument('--fan-out-report', default='fan_out_report.json', help="Per-bucket report to write.")
+    sub.set_defaults(func=upload)
+
+    sub = subparsers.add_parser('tar', help="Upload a tar, or stream a folder as a tar, to the SRW bucket.")
+    sub.add_argument('object_dir', help="Tar file or folder on-prem.")
+    sub.add_argument('key_path', nargs='?', help="Key of the tar object in cloud.")
+    sub.add_argument('--zstd', type=int, metavar='LEVEL', help="Compress the tar w/ zstd at this level.")
+    sub.set_defaults(func=tar)
+
+    sub = subparsers.add_parser('sync', help="Upload only the data files missing from (or differing in) cloud.")
+    sub.add_argument('paths', nargs='*', help="Relative data file or folder directories.")
+    sub.add_argument('--file-list', help="Text file listing one relative data file directory per line.")
+    sub.add_argument('--checksums', action='store_true', help="Also compare ETags (sizes only by default).")
+    sub.add_argument('--mode', choices=['auto', 'head', 'list'], default='auto')
+    sub.add_argument('--workers', type=int, default=32)
+    sub.add_argument('--report', default='sync_report.json')
+    sub.add_argument('--manifest', default='upload_failures.json', help="Failure manifest to write.")
+    sub.add_argument('--dry-run', action='store_true', help="Report the data files to upload w/out uploading.")
+    sub.set_defaults(func=sync)
+
+    sub = subparsers.add_parser('purge', help="Remove objects from cloud.")
+    sub.add_argument('keys', nargs='*', help="Keys of the objects to remove.")
+    sub.add_argument('--prefix', help="Remove every object w/ this key prefix.")
+    sub.add_argument('--yes', action='store_true', help="Remove the objects under --prefix w/out asking.")
+    sub.set_defaults(func=purge)
+
+    sub = subparsers.add_parser('list', help="List the object keys of the bucket.")
+    sub.add_argument('--prefix', help="Only list the keys w/ this prefix.")
+    sub.set_defaults(func=list_keys)
+
+    sub = subparsers.add_parser('verify', help="Verify uploaded data files against cloud.")
+    source = sub.add_mutually_exclusive_group(required=True)
+    source.add_argument('--manifest', help="Manifest written by upload_files2cloud.")
+    source.add_argument('--file-list', help="Text file listing one relative data file directory per line.")
+    sub.add_argument('--mode', choices=['auto', 'head', 'list'], default='auto')
+    sub.add_argument('--no-checksums', action='store_true', help="Compare sizes only.")
+    sub.add_argument('--workers', type=int, default=32)
+    sub.add_argument('--report', default='verify_report.json')
+    sub.set_defaults(func=verify)
+
+    return parser
+
+
+def main(argv=None):
+    """
+    Args:
+        argv (list): Command line arguments. If None, sys.argv[1:].
+
+    Return (int): Exit status.
+
+    """
+    args = build_parser().parse_args(argv)
+    if args.command == 'purge' and not args.keys and args.prefix is None:
+        print("purge: give the keys or a --prefix of the objects to remove", file=sys.stderr)
+        return 2
+    if args.command == 'purge' and args.prefix is not None and not args.prefix.strip():
+        print("purge: an empty --prefix would remove every object of the bucket", file=sys.stderr)
+        return 2
+    if args.command in ('upload', 'sync') and not (args.paths or args.file_list or getattr(args, 'replay', None)):
+        print(f"{args.command}: give the data files, folders or a --file-list", file=sys.stderr)
+        return 2
+
+    from profiling import PROFILER, span
+    if args.profile is not None:
+        PROFILER.enable(args.profile)
+    with span(f"srw_xfer.{args.command}"):
+        return args.func(args)
+
+
+if __name__ == '__main__':
+
+    sys.exit(main())
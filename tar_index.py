@@ -0,0 +1,372 @@
+import argparse
+import hashlib
+import json
+import os
+import tarfile
+
+# Key suffix of the sidecar index object published alongside a tar object.
+INDEX_SUFFIX = '.index.json'
+
+
+def member_entry(tarinfo):
+    """
+    Index entry of a tar member.
+
+    Args:
+        tarinfo (tarfile.TarInfo): Member read from the tar's headers.
+
+    Return (dict): Name, type, header offset, data offset, size & mtime of the member.
+
+    """
+    if tarinfo.isdir():
+        member_type = 'dir'
+    elif tarinfo.issym() or tarinfo.islnk():
+        member_type = 'link'
+    else:
+        member_type = 'file'
+    entry = {'name': tarinfo.name,
+             'type': member_type,
+             'header_offset': tarinfo.offset,
+             'offset': tarinfo.offset_data,
+             'size': tarinfo.size if tarinfo.isreg() else 0,
+             'mtime': int(tarinfo.mtime)}
+    if member_type == 'link':
+        entry['linkname'] = tarinfo.linkname
+
+    return entry
+
+
+def is_plain_tar(file_dir):
+    """
+    Check whether a file is an uncompressed tar, whose members may be fetched by byte range.
+
+    Args:
+        file_dir (str): Directory path of the file on-prem.
+
+    Return (bool): True if the file is an uncompressed tar.
+
+    """
+    try:
+        with tarfile.open(file_dir, 'r:'):
+            return True
+    except (tarfile.TarError, OSError):
+        return False
+
+
+def member_md5s(tar_dir, ranges, chunk_size=8*1024**2):
+    """
+    MD5s of the data of several tar members, read w/ positional reads. Executed within the
+    checksum pool's workers (or a thread pool).
+
+    Args:
+        tar_dir (str): Directory path of the tar on-prem.
+        ranges (list): (offset, size) of each member's data w/in the tar.
+        chunk_size (int): Bytes read per request.
+
+    Return (list): Hex MD5 of each member's data.
+
+    """
+    md5s = []
+    with open(tar_dir, 'rb') as f:
+        for start, size in ranges:
+            md5 = hashlib.md5()
+            for offset in range(start, start + size, chunk_size):
+                md5.update(os.pread(f.fileno(), min(chunk_size, start + size - offset), offset))
+            md5s.append(md5.hexdigest())
+
+    return md5s
+
+
+def build_tar_index(tar_dir, key_path, checksums=True):
+    """
+    Build the member index of a tar on-prem.
+
+    Args:
+        tar_dir (str): Directory path of the tar on-prem.
+        key_path (str): Key of the tar object in cloud.
+        checksums (bool): If True, the MD5 of each member's data is recorded.
+
+    Return (dict): Member index of the tar object.
+
+    """
+    with tarfile.open(tar_dir, 'r:') as tar_obj:
+        entries = [member_entry(tarinfo) for tarinfo in tar_obj]
+    files = [entry for entry in entries if entry['type'] == 'file'] if checksums else []
+    for entry, md5 in zip(files, member_md5s(tar_dir, [(entry['offset'], entry['size']) for entry in files])):
+        entry['md5'] = md5
+
+    return {'archive_key': key_path, 'archive_size': os.path.getsize(tar_dir), 'members': entries}
+
+
+class PendingTarIndex():
+    """
+    Member index of a tar on-prem whose member MD5s are computed by an executor (e.g. the
+    checksum pool) while the tar is uploaded by filename. Only the headers are read upfront;
+    the upload itself reads its parts lazily, as for any other data file.
+
+    """
+
+    def __init__(self, tar_dir, key_path, executor, task_bytes=64*1024**2):
+        """
+        Args:
+            tar_dir (str): Directory path of the tar on-prem.
+            key_path (str): Key of the tar object in cloud.
+            executor (Executor): Executor running the MD5s (e.g. ChecksumPool.executor).
+            task_bytes (int): Member bytes hashed per task -- consecutive small members are
+                              hashed together.
+
+        """
+        with tarfile.open(tar_dir, 'r:') as tar_obj:
+            entries = [member_entry(tarinfo) for tarinfo in tar_obj]
+        self.index = {'archive_key': key_path, 'archive_size': os.path.getsize(tar_dir), 'members': entries}
+
+        # Consecutive members grouped into tasks of about task_bytes each.
+        self.tasks = []
+        group, group_bytes = [], 0
+        for entry in entries:
+            if entry['type'] != 'file':
+                continue
+            group.append(entry)
+            group_bytes += entry['size']
+            if group_bytes >= task_bytes:
+                self.tasks.append(group)
+                group, group_bytes = [], 0
+        if group:
+            self.tasks.append(group)
+        self.futures = [executor.submit(member_md5s, tar_dir, [(entry['offset'], entry['size']) for entry in group])
+                        for group in self.tasks]
+
+    def result(self):
+        """
+        Args:
+            None
+
+        Return (dict): Member index of the tar object (blocks until the MD5s are computed).
+
+        """
+        for group, future in zip(self.tasks, self.futures):
+            for entry, md5 in zip(group, future.result()):
+                entry['md5'] = md5
+
+        return self.index
+
+
+class S3RangeReader():
+    """
+    Seekable file-like view over an object in cloud data storage, reading only the byte
+    ranges requested (w/ a small read-ahead) via HTTP Range requests.
+
+    """
+
+    def __init__(self, client, bucket_name, key_path, readahead=64*1024):
+        """
+        Args:
+            client (botocore.client.S3): S3 client.
+            bucket_name (str): Cloud data storage bucket.
+            key_path (str): Key of the object.
+            readahead (int): Minimum number of bytes fetched per Range request.
+
+        """
+        self.client = client
+        self.bucket_name = bucket_name
+        self.key_path = key_path
+        self.readahead = readahead
+        self.size = client.head_object(Bucket=bucket_name, Key=key_path)['ContentLength']
+        self.pos = 0
+        self.buf_start = 0
+        self.buf = b''
+
+        # Number of Range requests & bytes fetched.
+        self.requests = 0
+        self.bytes_fetched = 0
+
+    def read(self, size=-1):
+        """
+        Args:
+            size (int): Maximum number of bytes to read. If negative, read to the end of the object.
+
+        Return (bytes): Bytes read.
+
+        """
+        if size is None or size < 0:
+            size = self.size - self.pos
+        size = min(size, self.size - self.pos)
+        if size <= 0:
+            return b''
+
+        # Fetch the range unless it is already buffered.
+        buf_end = self.buf_start + len(self.buf)
+        if not (self.buf_start <= self.pos and self.pos + size <= buf_end):
+            end = min(self.size, self.pos + max(size, self.readahead)) - 1
+            response = self.client.get_object(Bucket=self.bucket_name, Key=self.key_path,
+                                              Range=f"bytes={self.pos}-{end}")
+            self.buf = response['Body'].read()
+            self.buf_start = self.pos
+            self.requests += 1
+            self.bytes_fetched += len(self.buf)
+        start = self.pos - self.buf_start
+        data = self.buf[start:start + size]
+        self.pos += len(data)
+
+        return data
+
+    def seek(self, pos, whence=0):
+        if whence == 1:
+            pos += self.pos
+        elif whence == 2:
+            pos += self.size
+        self.pos = max(pos, 0)
+
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def seekable(self):
+        return True
+
+    def readable(self):
+        return True
+
+
+def build_remote_tar_index(client, bucket_name, key_path, readahead=64*1024):
+    """
+    Build the member index of a tar object already in cloud by scanning only its headers
+    w/ ranged reads -- the members' data is skipped over rather than downloaded.
+
+    Args:
+        client (botocore.client.S3): S3 client.
+        bucket_name (str): Cloud data storage bucket.
+        key_path (str): Key of the tar object.
+        readahead (int): Minimum number of bytes fetched per Range request. Headers of small
+                         adjacent members are served from the same request.
+
+    Return (dict): Member index of the tar object. Member checksums are not recorded since
+    the members' data is not read.
+
+    """
+    reader = S3RangeReader(client, bucket_name, key_path, readahead=readahead)
+    index = {'archive_key': key_path, 'archive_size': reader.size, 'members': []}
+    with tarfile.open(fileobj=reader, mode='r:') as tar_obj:
+        for tarinfo in tar_obj:
+            index['members'].append(member_entry(tarinfo))
+    print(f"Indexed {len(index['members'])} members of {key_path} w/ {reader.requests} Range requests "
+          f"({reader.bytes_fetched} of {reader.size} bytes read).")
+
+    return index
+
+
+def publish_index(client, bucket_name, key_path, index):
+    """
+    Publish a tar object's member index as a sidecar object (key suffixed w/ '.index.json').
+
+    Args:
+        client (botocore.client.S3): S3 client.
+        bucket_name (str): Cloud data storage bucket.
+        key_path (str): Key of the tar object.
+        index (dict): Member index of the tar object.
+
+    Return (str): Key of the sidecar index object.
+
+    """
+    index_key = key_path + INDEX_SUFFIX
+    client.put_object(Bucket=bucket_name, Key=index_key,
+                      Body=json.dumps(index).encode('utf-8'),
+                      ContentType='application/json')
+    print(f"Published member index: {index_key}")
+
+    return index_key
+
+
+class TarMemberClient():
+    """
+    Fetch individual members of a tar object in cloud w/ HTTP Range requests, using the
+    tar's sidecar index -- e.g. a single fix_orog grid file from fix.tar w/out downloading
+    the whole archive.
+
+    """
+
+    def __init__(self, client, bucket_name, key_path):
+        """
+        Args:
+            client (botocore.client.S3): S3 client. For the public buckets, an unsigned
+                                         client may be used, e.g.
+                                         boto3.client('s3', config=Config(signature_version=UNSIGNED)).
+            bucket_name (str): Cloud data storage bucket.
+            key_path (str): Key of the tar object.
+
+        """
+        self.client = client
+        self.bucket_name = bucket_name
+        self.key_path = key_path
+        response = client.get_object(Bucket=bucket_name, Key=key_path + INDEX_SUFFIX)
+        self.index = json.loads(response['Body'].read())
+        self.members = {entry['name']: entry for entry in self.index['members']}
+
+    def list_members(self, prefix=''):
+        """
+        Args:
+            prefix (str): Only list the members whose name starts w/ this prefix.
+
+        Return (list): Names of the data file members.
+
+        """
+        return [name for name, entry in self.members.items()
+                if entry['type'] == 'file' and name.startswith(prefix)]
+
+    def fetch_member(self, name, dest_dir=None):
+        """
+        Fetch a single member's data w/ a Range request.
+
+        Args:
+            name (str): Member name (e.g. 'fix/fix_orog/C403_grid.tile7.halo4.nc').
+            dest_dir (str): If set, the member is written to this file path.
+
+        Return (bytes): Member's data. None if written to dest_dir.
+
+        """
+        entry = self.members[name]
+        if entry['size'] == 0:
+            data = b''
+        else:
+            response = self.client.get_object(Bucket=self.bucket_name, Key=self.key_path,
+                                              Range=f"bytes={entry['offset']}-{entry['offset'] + entry['size'] - 1}")
+            data = response['Body'].read()
+
+        # Verify the member against its recorded checksum.
+        if 'md5' in entry and hashlib.md5(data).hexdigest() != entry['md5']:
+            raise IOError(f"Checksum mismatch for member {name} of {self.key_path}")
+        if dest_dir is None:
+            return data
+        os.makedirs(os.path.dirname(dest_dir) or '.', exist_ok=True)
+        with open(dest_dir, 'wb') as f:
+            f.write(data)
+
+        return
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Member index sidecars for tar objects in cloud.")
+    parser.add_argument('--bucket', default='srw', help="Bucket ('rt', 'srw' or 'mrw').")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    backfill = subparsers.add_parser('backfill', help="Index tar objects already in the bucket via ranged header reads.")
+    backfill.add_argument('key_paths', nargs='+')
+
+    fetch = subparsers.add_parser('fetch', help="Fetch a single member of a tar object.")
+    fetch.add_argument('key_path')
+    fetch.add_argument('member')
+    fetch.add_argument('dest_dir')
+    args = parser.parse_args()
+
+    from upload_data import UploadData
+    uploader_wrapper = UploadData(file_relative_dirs=None, use_bucket=args.bucket)
+    client = uploader_wrapper.s3.meta.client
+    if args.command == 'backfill':
+        for key_path in args.key_paths:
+            index = build_remote_tar_index(client, uploader_wrapper.bucket_name, key_path)
+            publish_index(client, uploader_wrapper.bucket_name, key_path, index)
+    elif args.command == 'fetch':
+        TarMemberClient(client, uploader_wrapper.bucket_name, args.key_path).fetch_member(args.member, args.dest_dir)
+    uploader_wrapper.close()
@@ -0,0 +1,346 @@
+import hashlib
+import json
+import os
+import stat
+import tarfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from part_reader import MemoryBudget
+
+# Tar block & record sizes (see tarfile.BLOCKSIZE & tarfile.RECORDSIZE).
+BLOCKSIZE = tarfile.BLOCKSIZE
+RECORDSIZE = tarfile.RECORDSIZE
+
+# S3 limit on the number of parts per multipart upload.
+MAX_PARTS = 10000
+
+
+def read_range(file_path, offset, length):
+    """
+    Read a byte range of a data file. Executed within the reader threads.
+
+    Args:
+        file_path (str): Data file's full directory path (incl. filename).
+        offset (int): Starting byte of the range.
+        length (int): Number of bytes in the range.
+
+    Return (bytes): Bytes of the range.
+
+    """
+    with open(file_path, 'rb') as f:
+        data = os.pread(f.fileno(), length, offset)
+    if len(data) != length:
+        raise IOError(f"{file_path} changed size while being streamed into the tar.")
+
+    return data
+
+
+class MultipartStreamWriter():
+    """
+    Sequential writer which cuts the bytes written to it into parts & uploads the parts
+    concurrently as a multipart upload.
+
+    """
+
+    def __init__(self, client, bucket_name, key_path, part_size, max_concurrency, memory_budget):
+        """
+        Args:
+            client (botocore.client.S3): S3 client.
+            bucket_name (str): Cloud data storage bucket.
+            key_path (str): Key of the object in cloud.
+            part_size (int): Partition size of each part in bytes.
+            max_concurrency (int): Maximum number of threads uploading parts.
+            memory_budget (MemoryBudget): Cap on the part bytes in flight.
+
+        """
+        self.client = client
+        self.bucket_name = bucket_name
+        self.key_path = key_path
+        self.part_size = part_size
+        self.memory_budget = memory_budget
+        self.buffer = bytearray()
+        self.bytes_written = 0
+        self.futures = []
+        self.failed = threading.Event()
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self.upload_id = client.create_multipart_upload(Bucket=bucket_name, Key=key_path)['UploadId']
+
+    def write(self, data):
+        """
+        Append bytes to the object & submit every full part.
+
+        Args:
+            data (bytes): Bytes to append.
+
+        Return: None
+
+        """
+        self.buffer += data
+        self.bytes_written += len(data)
+        while len(self.buffer) >= self.part_size:
+            part = bytes(self.buffer[:self.part_size])
+            del self.buffer[:self.part_size]
+            self._submit(part)
+
+        return
+
+    def _submit(self, part):
+        """
+        Submit a part for upload once the memory budget has room for it.
+
+        """
+        if self.failed.is_set():
+            for future in self.futures:
+                if future.done() and future.exception() is not None:
+                    raise future.exception()
+        self.memory_budget.acquire(len(part))
+        self.futures.append(self.executor.submit(self._upload_part, len(self.futures) + 1, part))
+
+    def _upload_part(self, part_number, part):
+        try:
+            response = self.client.upload_part(Bucket=self.bucket_name, Key=self.key_path, UploadId=self.upload_id,
+                                               PartNumber=part_number, Body=part)
+        except BaseException:
+            self.failed.set()
+            raise
+        finally:
+            self.memory_budget.release(len(part))
+        print(f"\r{self.key_path}  part {part_number}  {self.bytes_written} bytes streamed", end='')
+
+        return {'ETag': response['ETag'], 'PartNumber': part_number}
+
+    def close(self):
+        """
+        Upload the final part & complete the multipart upload.
+
+        Args:
+            None
+
+        Return (int): Size of the object in bytes.
+
+        """
+        if self.buffer or not self.futures:
+            self._submit(bytes(self.buffer))
+            self.buffer = bytearray()
+        parts = [future.result() for future in self.futures]
+        self.executor.shutdown(wait=True)
+        self.client.complete_multipart_upload(Bucket=self.bucket_name, Key=self.key_path, UploadId=self.upload_id,
+                                              MultipartUpload={'Parts': parts})
+
+        return self.bytes_written
+
+    def abort(self):
+        """
+        Abort the multipart upload so no orphaned parts are billed.
+
+        Args:
+            None
+
+        Return: None
+
+        """
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.client.abort_multipart_upload(Bucket=self.bucket_name, Key=self.key_path, UploadId=self.upload_id)
+
+        return
+
+
+class TarStreamUploader():
+    """
+    Build a tar stream from directory trees on-prem & send it straight into a multipart
+    upload -- no tar is written to, nor read back from, disk.
+
+    """
+
+    def __init__(self, client, bucket_name, part_size=50000*1024, max_concurrency=10,
+                 read_workers=8, readahead_bytes=256*1024**2, read_chunk=8*1024**2, memory_budget=None):
+        """
+        Args:
+            client (botocore.client.S3): S3 client.
+            bucket_name (str): Cloud data storage bucket.
+            part_size (int): Partition size of each part in bytes. Grown automatically if the
+                             tar would exceed the S3 limit of 10000 parts.
+            max_concurrency (int): Maximum number of threads uploading parts.
+            read_workers (int): Number of threads reading the data files.
+            readahead_bytes (int): Maximum bytes read ahead of the tar stream.
+            read_chunk (int): Bytes read per request from a data file.
+            memory_budget (MemoryBudget): Cap on the part bytes in flight. If None, set to
+                                          max_concurrency x part_size.
+
+        """
+        self.client = client
+        self.bucket_name = bucket_name
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+        self.read_workers = read_workers
+        self.readahead_bytes = readahead_bytes
+        self.read_chunk = read_chunk
+        self.memory_budget = memory_budget
+
+    def get_members(self, file_dirs, base_dir):
+        """
+        Establish the tar members (directories & data files) of a list of data files.
+
+        Args:
+            file_dirs (list): Data files' directory paths (e.g. GetSrwData.fix_file_dirs).
+            base_dir (str): Directory the member names are relative to (e.g. the parent of
+                            the 'fix' folder so members are named 'fix/fix_am/...').
+
+        Return (list): List of (TarInfo, file_path) tuples in tar order. file_path is None
+        for directory members.
+
+        """
+        members = []
+        seen_dirs = set()
+        for file_path in sorted(file_dirs):
+            arcname = os.path.relpath(file_path, base_dir).replace(os.sep, '/')
+
+            # Directory members precede their data files, as written by 'tar cf'.
+            parts = arcname.split('/')[:-1]
+            for depth in range(1, len(parts) + 1):
+                dir_name = '/'.join(parts[:depth])
+                if dir_name in seen_dirs:
+                    continue
+                seen_dirs.add(dir_name)
+                dir_stat = os.stat(os.path.join(base_dir, dir_name))
+                tarinfo = tarfile.TarInfo(dir_name)
+                tarinfo.type = tarfile.DIRTYPE
+                tarinfo.mode = stat.S_IMODE(dir_stat.st_mode)
+                tarinfo.mtime = int(dir_stat.st_mtime)
+                members.append((tarinfo, None))
+
+            # Symbolic links are followed (as w/ the data directory walk).
+            file_stat = os.stat(file_path)
+            tarinfo = tarfile.TarInfo(arcname)
+            tarinfo.size = file_stat.st_size
+            tarinfo.mode = stat.S_IMODE(file_stat.st_mode)
+            tarinfo.mtime = int(file_stat.st_mtime)
+            tarinfo.uid, tarinfo.gid = file_stat.st_uid, file_stat.st_gid
+            members.append((tarinfo, file_path))
+
+        return members
+
+    def _tasks(self, members):
+        """
+        Sequence of the tar stream: each member's header followed by its data chunks.
+
+        """
+        for tarinfo, file_path in members:
+            yield ('header', tarinfo, None, None)
+            if file_path is None:
+                continue
+            for offset in range(0, tarinfo.size, self.read_chunk):
+                yield ('data', tarinfo, file_path, (offset, min(self.read_chunk, tarinfo.size - offset)))
+
+    def upload(self, file_dirs, base_dir, key_path, index_path=None, index_checksums=True):
+        """
+        Stream a tar of the data files into a multipart upload.
+
+        Args:
+            file_dirs (list): Data files' directory paths (e.g. GetSrwData.fix_file_dirs).
+            base_dir (str): Directory the member names are relative to.
+            key_path (str): Key of the tar object in cloud.
+            index_path (str): If set, the member index (name, byte range, size & MD5 of
+                              each member) is written to this JSON file.
+            index_checksums (bool): If True, the MD5 of each member is recorded in the index.
+
+        Return (dict): Member index of the tar object.
+
+        Data files are read by a pool of threads ahead of the tar stream (bounded by the
+        readahead bytes) & consumed in order, so the tar's member order is deterministic
+        while the reads of the parallel filesystem overlap.
+
+        """
+        start_time = time.time()
+        members = self.get_members(file_dirs, base_dir)
+
+        # Grow the part size if the tar would exceed the S3 part limit.
+        est_size = sum(3 * BLOCKSIZE + -(-tarinfo.size // BLOCKSIZE) * BLOCKSIZE for tarinfo, _ in members) + RECORDSIZE
+        part_size = max(self.part_size, -(-est_size // (MAX_PARTS - 1)))
+        memory_budget = self.memory_budget or MemoryBudget(self.max_concurrency * part_size)
+        writer = MultipartStreamWriter(self.client, self.bucket_name, key_path, part_size,
+                                       self.max_concurrency, memory_budget)
+
+        index = {'archive_key': key_path, 'members': []}
+        entry, md5 = None, None
+        pending = deque()
+        readahead = 0
+        tasks = self._tasks(members)
+        exhausted = False
+        try:
+            with ThreadPoolExecutor(max_workers=self.read_workers) as readers:
+                while True:
+
+                    # Read ahead of the tar stream while the readahead budget allows.
+                    while not exhausted and (readahead < self.readahead_bytes or not pending):
+                        task = next(tasks, None)
+                        if task is None:
+                            exhausted = True
+                            break
+                        kind, tarinfo, file_path, data_range = task
+                        if kind == 'data':
+                            readahead += data_range[1]
+                            task = (kind, tarinfo, file_path, readers.submit(read_range, file_path, *data_range))
+                        pending.append(task)
+                    if not pending:
+                        break
+
+                    # Write the next piece of the tar stream.
+                    kind, tarinfo, file_path, future = pending.popleft()
+                    if kind == 'header':
+                        self._close_entry(writer, entry, md5)
+                        header_offset = writer.bytes_written
+                        writer.write(tarinfo.tobuf(format=tarfile.PAX_FORMAT, encoding='utf-8',
+                                                   errors='surrogateescape'))
+                        entry = {'name': tarinfo.name,
+                                 'type': 'dir' if tarinfo.isdir() else 'file',
+                                 'header_offset': header_offset,
+                                 'offset': writer.bytes_written,
+                                 'size': tarinfo.size,
+                                 'mtime': tarinfo.mtime}
+                        index['members'].append(entry)
+                        md5 = hashlib.md5() if index_checksums and tarinfo.isreg() else None
+                    else:
+                        data = future.result()
+                        readahead -= len(data)
+                        if md5 is not None:
+                            md5.update(data)
+                        writer.write(data)
+                self._close_entry(writer, entry, md5)
+
+            # End-of-archive marker: two zero blocks, padded to a full record as written by tarfile.
+            writer.write(b'\0' * (2 * BLOCKSIZE))
+            remainder = writer.bytes_written % RECORDSIZE
+            if remainder:
+                writer.write(b'\0' * (RECORDSIZE - remainder))
+            index['archive_size'] = writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+
+        if index_path is not None:
+            with open(index_path, 'w') as f:
+                json.dump(index, f)
+
+        # Processing time to stream the tar.
+        delta = (time.time() - start_time)/60
+        print(f"\nStreamed {len(members)} members ({index['archive_size']} bytes) to {key_path}")
+        print(f'Processing Time (min): {delta}\n')
+
+        return index
+
+    def _close_entry(self, writer, entry, md5):
+        """
+        Pad the previous member's data to a full block & record its checksum.
+
+        """
+        if entry is None:
+            return
+        if md5 is not None:
+            entry['md5'] = md5.hexdigest()
+        remainder = entry['size'] % BLOCKSIZE
+        if remainder:
+            writer.write(b'\0' * (BLOCKSIZE - remainder))
@@ -0,0 +1,44 @@
+import os
+import sys
+
+# The modules live at the top of the repository rather than in a package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture
+def s3_buckets(tmp_path, monkeypatch):
+    """
+    Mock S3 endpoint (moto) w/ the UFS buckets created & the credentials profiles of
+    UploadData.BUCKETS configured. Yields a function creating an UploadData for a bucket.
+
+    """
+    moto = pytest.importorskip('moto')
+    from upload_data import UploadData
+    from transfer_session import TransferSession
+
+    profiles = sorted({profile for _, profile in UploadData.BUCKETS.values()})
+    credentials = tmp_path / 'credentials'
+    credentials.write_text(''.join(f"[{profile}]\naws_access_key_id = testing\naws_secret_access_key = testing\n"
+                                   for profile in profiles))
+    config = tmp_path / 'config'
+    config.write_text(''.join(f"[{'default' if profile == 'default' else 'profile ' + profile}]\nregion = us-east-1\n"
+                              for profile in profiles))
+    monkeypatch.setenv('AWS_SHARED_CREDENTIALS_FILE', str(credentials))
+    monkeypatch.setenv('AWS_CONFIG_FILE', str(config))
+    for name in ['AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_SESSION_TOKEN', 'AWS_PROFILE']:
+        monkeypatch.delenv(name, raising=False)
+
+    with moto.mock_aws():
+        sessions = []
+
+        def uploader(use_bucket='srw', file_relative_dirs=None, **session_args):
+            session = TransferSession(UploadData.BUCKETS[use_bucket][1], **session_args)
+            sessions.append(session)
+            session.client.create_bucket(Bucket=UploadData.BUCKETS[use_bucket][0])
+            return UploadData(file_relative_dirs, use_bucket, transfer_session=session)
+
+        yield uploader
+        for session in sessions:
+            session.close()
@@ -0,0 +1,68 @@
+import base64
+import hashlib
+import os
+
+import pytest
+
+from checksum_pool import ChecksumPool
+
+MB = 1024**2
+
+
+@pytest.fixture
+def pool():
+    with ChecksumPool(max_workers=2, use_processes=False) as pool:
+        yield pool
+
+
+def test_expected_etag_of_multipart_upload(tmp_path, pool):
+    file_path = tmp_path / 'data.grib2'
+    data = os.urandom(2 * MB + 100)
+    file_path.write_bytes(data)
+    expected = pool.submit_etag(str(file_path), MB, MB)
+
+    digests = [hashlib.md5(data[offset:offset + MB]).digest() for offset in range(0, len(data), MB)]
+    assert expected.result() == f"{hashlib.md5(b''.join(digests)).hexdigest()}-3"
+    assert expected.content_md5(2) == base64.b64encode(digests[2]).decode('ascii')
+
+
+def test_mmap_upload_sends_part_md5s_and_checks_etag_wo_head(tmp_path, pool, s3_buckets, monkeypatch):
+    uploader = s3_buckets('srw')
+    uploader.checksum_pool = pool
+    uploader.work_dir = str(tmp_path) + '/'
+    (tmp_path / 'data.grib2').write_bytes(os.urandom(5 * MB + 100))
+    client = uploader.s3.meta.client
+    sent = []
+    upload_part = client.upload_part
+
+    def record_part(**kwargs):
+        sent.append((kwargs['PartNumber'], kwargs['ContentMD5']))
+        return upload_part(**kwargs)
+
+    def no_head(**kwargs):
+        raise AssertionError("the ETag is checked against the upload's response")
+
+    monkeypatch.setattr(client, 'upload_part', record_part)
+    monkeypatch.setattr(client, 'head_object', no_head)
+    uploader.upload_single_file_mmap('data.grib2', 'data.grib2', part_size=5 * MB)
+
+    data = (tmp_path / 'data.grib2').read_bytes()
+    assert sorted(sent) == [(1, base64.b64encode(hashlib.md5(data[:5 * MB]).digest()).decode('ascii')),
+                            (2, base64.b64encode(hashlib.md5(data[5 * MB:]).digest()).decode('ascii'))]
+
+
+def test_mmap_upload_rejects_mismatched_etag(tmp_path, pool, s3_buckets, monkeypatch):
+    uploader = s3_buckets('srw')
+    uploader.checksum_pool = pool
+    uploader.work_dir = str(tmp_path) + '/'
+    (tmp_path / 'data.grib2').write_bytes(os.urandom(1000))
+    client = uploader.s3.meta.client
+    put_object = client.put_object
+
+    def wrong_etag(**kwargs):
+        response = put_object(**kwargs)
+        return dict(response, ETag='"00000000000000000000000000000000"')
+
+    monkeypatch.setattr(client, 'put_object', wrong_etag)
+    with pytest.raises(RuntimeError, match='ETag mismatch'):
+        uploader.upload_single_file_mmap('data.grib2', 'data.grib2')
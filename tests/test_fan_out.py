@@ -0,0 +1,56 @@
+import os
+
+import botocore.exceptions
+import pytest
+
+from fan_out import FanOutUpload
+
+MB = 1024**2
+
+
+class FailedFuture():
+
+    def __init__(self, code, status):
+        self.error = botocore.exceptions.ClientError({'Error': {'Code': code, 'Message': code},
+                                                      'ResponseMetadata': {'HTTPStatusCode': status}}, 'CopyObject')
+
+    def result(self):
+        raise self.error
+
+
+@pytest.fixture
+def buckets(tmp_path, s3_buckets):
+    session_args = {'multipart_threshold': 6 * MB, 'multipart_chunksize': 5 * MB}
+    uploaders = [s3_buckets('srw', **session_args), s3_buckets('mrw', **session_args)]
+    for uploader in uploaders:
+        uploader.work_dir = str(tmp_path) + '/'
+    (tmp_path / 'data.grib2').write_bytes(os.urandom(7 * MB))
+    fan_out = FanOutUpload(uploaders, mode='copy')
+    yield uploaders, fan_out
+    fan_out.close()
+
+
+def etag(uploader, key_path):
+    return uploader.s3.meta.client.head_object(Bucket=uploader.bucket_name, Key=key_path)['ETag']
+
+
+def test_broadcast_and_copy_give_the_same_etag(buckets):
+    (srw, mrw), fan_out = buckets
+    fan_out.upload_file('data.grib2', 'copied.grib2')
+    fan_out.mode = 'broadcast'
+    fan_out.upload_file('data.grib2', 'broadcast.grib2')
+
+    etags = {etag(uploader, key_path) for uploader in (srw, mrw) for key_path in ('copied.grib2', 'broadcast.grib2')}
+    assert len(etags) == 1 and next(iter(etags)).endswith('-2"')
+
+
+@pytest.mark.parametrize('code, status, method, failed', [('AccessDenied', 403, 'broadcast (copy refused)', False),
+                                                         ('SlowDown', 503, 'copy', True)])
+def test_only_refused_copies_fall_back_to_broadcast(buckets, monkeypatch, code, status, method, failed):
+    (srw, mrw), fan_out = buckets
+    monkeypatch.setattr(mrw.transfer_session.transfer_manager, 'copy', lambda *args, **kwargs: FailedFuture(code, status))
+    results = fan_out.upload_file('data.grib2')
+
+    assert results[srw.bucket_name]['error'] is None
+    assert results[mrw.bucket_name]['method'] == method
+    assert (results[mrw.bucket_name]['error'] is not None) == failed
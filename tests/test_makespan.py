@@ -0,0 +1,91 @@
+from makespan import MakespanScheduler, simulate_makespan, sized_items
+from work_queue import UploadWorkQueue
+
+GB, MB = 1024**3, 1024**2
+
+
+def listing():
+
+    # Many small data files listed before a few multi-GB analyses.
+    return ([(('fix', f"fix/small_{i}.nc"), 5 * MB) for i in range(400)] +
+            [(('input_model_data', f"ma/large_{i}.grib2"), size * GB) for i, size in enumerate([8, 6, 5, 3])])
+
+
+def test_simulated_makespan_assigns_next_idle_worker():
+    assert simulate_makespan([4, 3, 2, 2, 1], 2) == 6
+    assert simulate_makespan([], 3) == 0
+
+
+def test_schedule_orders_large_files_first_then_batches():
+    scheduler = MakespanScheduler(n_workers=4, throughput=100 * MB, per_file_secs=0.1)
+    schedule = scheduler.schedule(listing())
+
+    # Every data file is scheduled exactly once.
+    assert sorted(pair for task in schedule.tasks for pair in task) == sorted(listing())
+
+    # Large data files on their own, longest first (LPT), followed by the batches.
+    assert [task[0][1] // GB for task in schedule.tasks[:4]] == [8, 6, 5, 3]
+    assert all(len(task) == 1 for task in schedule.tasks[:4])
+    assert schedule.task_costs == sorted(schedule.task_costs, reverse=True)
+
+    # A batch's cost is capped (but may hold at least one data file).
+    batch_secs = max(scheduler.min_batch_secs, scheduler.batch_fraction * schedule.lower_bound)
+    assert all(cost <= batch_secs for task, cost in zip(schedule.tasks[4:], schedule.task_costs[4:]) if len(task) > 1)
+
+
+def test_batches_follow_the_large_files_at_a_realistic_lower_bound():
+
+    # ~500 GB over 8 workers: the batch cap (2% of a ~1300 s lower bound) is ~26 s, well above
+    # the 1 s a worker takes for a 50 MB data file.
+    items = ([(('input_model_data', f"ma/analysis_{i}.grib2"), 3 * GB) for i in range(160)] +
+             [(('input_model_data', f"ma/forecast_{i}.grib2"), size * MB) for i, size in enumerate(range(60, 1260, 60))] +
+             [(('fix', f"fix/small_{i}.nc"), MB) for i in range(4000)])
+    scheduler = MakespanScheduler(n_workers=8)
+    schedule = scheduler.schedule(items)
+    batch_secs = scheduler.batch_fraction * schedule.lower_bound
+    assert 20 < batch_secs < 30
+
+    # Data files too long to share a batch are scheduled on their own & claimed before every
+    # batch, while the shorter (e.g. 60 & 120 MB) data files are packed into the batches rather
+    # than scheduled on their own behind them.
+    large = [i for i, task in enumerate(schedule.tasks) if task[0][1] == 3 * GB]
+    batches = [i for i, task in enumerate(schedule.tasks) if len(task) > 1]
+    assert len(large) == 160 and all(len(schedule.tasks[i]) == 1 for i in large)
+    assert max(large) < min(batches)
+    task_of = {pair[0]: i for i, task in enumerate(schedule.tasks) for pair in task}
+    assert task_of[('input_model_data', 'ma/forecast_0.grib2')] == task_of[('input_model_data', 'ma/forecast_1.grib2')]
+    assert all(cost <= batch_secs for task, cost in zip(schedule.tasks, schedule.task_costs) if len(task) > 1)
+    assert schedule.task_costs == sorted(schedule.task_costs, reverse=True)
+    assert sorted(pair for task in schedule.tasks for pair in task) == sorted(items)
+    assert schedule.expected_makespan <= 1.05 * schedule.lower_bound
+
+
+def test_schedule_beats_listing_order():
+    schedule = MakespanScheduler(n_workers=4, throughput=100 * MB, per_file_secs=0.1).schedule(listing())
+    summary = schedule.summary()
+
+    assert summary['items'] == len(listing())
+    assert schedule.lower_bound <= schedule.expected_makespan < schedule.fifo_makespan
+
+    # LPT is within 4/3 of the optimum.
+    assert schedule.expected_makespan <= 4 / 3 * schedule.lower_bound
+
+
+def test_sized_items_pairs_each_file_once(tmp_path):
+    (tmp_path / 'a.nc').write_bytes(b'x' * 10)
+    a, missing = str(tmp_path / 'a.nc'), str(tmp_path / 'missing.nc')
+
+    assert sized_items({'fix': [a, missing], 'fix_am': [a]}) == [(('fix', a), 10), (('fix', missing), 0)]
+
+
+def test_scheduled_tasks_are_claimed_whole(tmp_path):
+    items = listing()[:6] + listing()[-2:]
+    schedule = MakespanScheduler(n_workers=2, throughput=100 * MB, per_file_secs=0.1, large_threshold=GB).schedule(items)
+    queue = UploadWorkQueue(str(tmp_path / 'queue.db'))
+    try:
+        assert queue.populate_scheduled(schedule) == len(items)
+        claimed = [[item['file_dir'] for item in queue.claim_batch(f"w{i}")] for i in range(len(schedule.tasks))]
+    finally:
+        queue.close()
+
+    assert claimed == [[file_dir for (_, file_dir), _ in task] for task in schedule.tasks]
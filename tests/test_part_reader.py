@@ -0,0 +1,43 @@
+import threading
+
+from part_reader import MemoryBudget, MmapPartReader, open_mmap
+
+
+def test_reread_bytes_are_reported_once(tmp_path):
+    file_path = tmp_path / 'data.grib2'
+    file_path.write_bytes(bytes(range(256)) * 40)
+    mm = open_mmap(str(file_path))
+    reported = []
+    reader = MmapPartReader(mm, 1024, 8192, reported.append)
+
+    assert bytes(reader.read(3000)) == (bytes(range(256)) * 40)[1024:4024]
+
+    # botocore rewinds the body to retry a request (or after checksumming it).
+    reader.seek(0)
+    while reader.read(1000):
+        pass
+    reader.seek(-100, 2)
+    reader.read()
+
+    assert sum(reported) == 8192
+    assert reported[:2] == [3000, 1000]
+    reader.close()
+    mm.close()
+
+
+def test_memory_budget_caps_bytes_in_flight():
+    budget = MemoryBudget(100)
+    budget.acquire(60)
+    admitted = threading.Event()
+
+    def acquire():
+        budget.acquire(60)
+        admitted.set()
+
+    thread = threading.Thread(target=acquire)
+    thread.start()
+    assert not admitted.wait(0.1)
+    budget.release(60)
+    assert admitted.wait(5)
+    thread.join()
+    assert budget.peak == 60
@@ -0,0 +1,59 @@
+import os
+
+from path_inventory import PathInventory
+
+
+def make_inventory(paths):
+    inventory = PathInventory()
+    for path in paths:
+        inventory.add_path(path)
+    return inventory
+
+
+def test_view_prints_as_list_of_paths():
+    paths = ['./fix/fix_am/a.grb', './fix/fix_lut/b.dat']
+    view = make_inventory(paths).view(replace=('./', ''))
+
+    assert repr(view) == repr(['fix/fix_am/a.grb', 'fix/fix_lut/b.dat'])
+    assert str(view.partition(['fix_am'], replace=('./', ''))['fix_am']) == str(['fix/fix_am/a.grb'])
+
+
+def test_partition_matches_dirs_names_and_straddling_keys():
+    inventory = make_inventory(['./input_model_data/FV3GFS/grib2/2019061200/gfs.t00z.pgrb2.0p25.f000',
+                                './input_model_data/HRRR/2019061518/hrrr.t18z.wrfprsf00.grib2',
+                                './input_model_data/RAP/2019061518/rap.t18z.wrfprsf00.grib2',
+                                './fix/fix_am/global_albedo4.1x1.grb'])
+    partitions = inventory.view(replace=('./', '')).partition(['FV3GFS', 'hrrr', 'grib2', 'HRRR/2019', 'NAM'])
+
+    assert list(partitions['FV3GFS']) == ['./input_model_data/FV3GFS/grib2/2019061200/gfs.t00z.pgrb2.0p25.f000']
+    assert list(partitions['hrrr']) == ['./input_model_data/HRRR/2019061518/hrrr.t18z.wrfprsf00.grib2']
+
+    # A key w/in both the directory & the name of an entry lists the entry once.
+    assert len(partitions['grib2']) == 3
+
+    # A key containing '/' may straddle the directory & name.
+    assert list(partitions['HRRR/2019']) == list(partitions['hrrr'])
+
+    # Keys w/out entries are absent, as w/ the partitioned lists.
+    assert 'NAM' not in partitions
+    assert partitions['NAM'] == []
+
+
+def test_partition_replaces_paths_on_access():
+    inventory = make_inventory(['./fix/fix_am/a.grb', './fix/fix_lut/b.dat', './fix/fix_am/c.grb'])
+    partitions = inventory.view().partition(['fix_am'], replace=('./', ''))
+
+    assert list(partitions['fix_am']) == ['fix/fix_am/a.grb', 'fix/fix_am/c.grb']
+    assert partitions['fix_am'][1] == 'fix/fix_am/c.grb'
+    assert list(partitions['fix_am'][:1]) == ['fix/fix_am/a.grb']
+
+
+def test_select_sorted_and_sized(tmp_path):
+    for name, size in [('b.nc', 30), ('a.nc', 10), ('c.txt', 5)]:
+        (tmp_path / name).write_bytes(b'x' * size)
+    inventory = make_inventory([str(tmp_path / name) for name in ['b.nc', 'a.nc', 'c.txt', 'gone.nc']])
+    view = inventory.view().select(lambda path: path.endswith('.nc')).sorted()
+
+    assert [os.path.basename(path) for path in view] == ['a.nc', 'b.nc', 'gone.nc']
+    assert [size for _, size in view.sized()] == [10, 30, 0]
+    assert view.total_size() == 40
@@ -0,0 +1,62 @@
+import atexit
+import io
+
+import pytest
+
+import profiling
+from profiling import Profiler, enable_from_argv, profiled, span
+
+
+@pytest.fixture
+def profiler(monkeypatch):
+    """
+    Fresh shared profiler, w/out the summary registered at exit.
+
+    """
+    profiler = Profiler()
+    monkeypatch.setattr(profiling, 'PROFILER', profiler)
+    monkeypatch.setattr(atexit, 'register', lambda func: None)
+    return profiler
+
+
+def test_disabled_span_and_profiled_are_no_ops(profiler):
+
+    @profiled()
+    def upload(file_dir):
+        return file_dir
+
+    assert span('UploadData.transfer') is profiling._NULL_SPAN
+    with span('UploadData.transfer'):
+        assert upload('fix/a.nc') == 'fix/a.nc'
+    assert profiler.stats == {}
+
+
+def test_enable_from_argv_strips_the_profile_option(profiler, monkeypatch):
+    assert enable_from_argv(['transfer_srw_tar.py', 'fix.tar', '--profile', 'fix.tar.zst']) == ['transfer_srw_tar.py', 'fix.tar', 'fix.tar.zst']
+    assert profiler.enabled and profiler.cprofiler is None and profiler.tracemalloc is None
+
+    monkeypatch.setattr(profiling, 'PROFILER', Profiler())
+    assert enable_from_argv(['transfer_srw_tar.py', '--profile=spans,cprofile', 'fix.tar']) == ['transfer_srw_tar.py', 'fix.tar']
+    assert profiling.PROFILER.cprofiler is not None
+    profiling.PROFILER.cprofiler.disable()
+
+
+def test_summary_table_lists_each_phase(profiler):
+
+    @profiled('UploadData.upload_single_file')
+    def upload(file_dir):
+        with span('UploadData.transfer'):
+            return file_dir
+
+    profiler.enable('spans')
+    upload('fix/a.nc')
+    upload('fix/b.nc')
+    stream = io.StringIO()
+    profiler.summary(stream=stream)
+
+    lines = stream.getvalue().splitlines()
+    assert 'Profile Summary' in lines[1]
+    assert lines[2].split() == ['phase', 'calls', 'total', 's', 'mean', 's', 'max', 's', '%', 'run']
+    rows = {line.split()[0]: line.split() for line in lines[3:]}
+    assert rows['UploadData.upload_single_file'][1] == '2'
+    assert rows['UploadData.transfer'][1] == '2'
@@ -0,0 +1,209 @@
+import json
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+import botocore.exceptions
+import pytest
+from boto3.s3.transfer import TransferConfig
+
+from retry_queue import RetryQueue, UploadManifest, journal_path, load_manifest
+from upload_data import UploadData
+
+
+class FakeUploader():
+    """
+    Stands in for UploadData in upload_files2cloud (no cloud access).
+
+    """
+    bucket_name = 'noaa-ufs-srw-pds'
+    transfer_session = SimpleNamespace(config=TransferConfig(max_concurrency=1))
+
+    def __init__(self, file_relative_dirs, interrupt_at=None, fail=()):
+        self.file_relative_dirs = file_relative_dirs
+        self.interrupt_at = interrupt_at
+        self.fail = set(fail)
+
+    def upload_single_file(self, file_dir, key_path=None):
+        if file_dir == self.interrupt_at:
+            raise KeyboardInterrupt
+        if file_dir in self.fail:
+            raise FileNotFoundError(file_dir)
+
+
+def test_manifest_written_when_batch_interrupted(tmp_path):
+    manifest_path = str(tmp_path / 'upload_failures.json')
+    uploader = FakeUploader({'fix': ['fix/a.nc', 'fix/b.nc', 'fix/c.nc', 'fix/d.nc']},
+                            interrupt_at='fix/c.nc', fail={'fix/b.nc'})
+    with pytest.raises(KeyboardInterrupt):
+        UploadData.upload_files2cloud(uploader, failure_manifest=manifest_path)
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    assert manifest['uploaded'] == ['fix/a.nc']
+    assert [failure['file_dir'] for failure in manifest['failed']] == ['fix/b.nc']
+    assert manifest['complete'] is False
+    assert not os.path.exists(journal_path(manifest_path))
+
+
+def test_manifest_rebuilt_from_journal_after_crash(tmp_path):
+    manifest_path = str(tmp_path / 'upload_failures.json')
+    manifest = UploadManifest(manifest_path, 'noaa-ufs-srw-pds')
+    manifest.record_uploaded('fix/a.nc')
+    manifest.record_failed({'dataset_type': 'fix', 'file_dir': 'fix/b.nc', 'attempts': 1, 'error': 'boom'})
+
+    # The process dies w/out closing the manifest, mid-way through a journal line.
+    manifest.journal.write('{"uploaded": "fix/')
+    manifest.journal.flush()
+
+    rebuilt = load_manifest(manifest_path)
+    assert rebuilt['bucket'] == 'noaa-ufs-srw-pds'
+    assert rebuilt['uploaded'] == ['fix/a.nc']
+    assert rebuilt['failed'][0]['file_dir'] == 'fix/b.nc'
+    assert rebuilt['complete'] is False
+
+
+def test_completed_batch_manifest(tmp_path):
+    manifest_path = str(tmp_path / 'upload_failures.json')
+    uploader = FakeUploader({'fix': ['fix/a.nc', 'fix/b.nc']}, fail={'fix/b.nc'})
+    assert UploadData.upload_files2cloud(uploader, failure_manifest=manifest_path) == {'uploaded': 1, 'failed': 1}
+    assert load_manifest(manifest_path)['complete'] is True
+
+
+def test_batch_files_upload_concurrently_up_to_max_in_flight(tmp_path):
+    file_dirs = [f"fix/{i}.nc" for i in range(12)]
+    uploader = FakeUploader({'fix': file_dirs}, fail={'fix/5.nc'})
+    lock = threading.Lock()
+    in_flight, peak = [0], [0]
+    upload_single_file = uploader.upload_single_file
+
+    def slow_upload(file_dir, key_path=None):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        upload_single_file(file_dir, key_path)
+
+    uploader.upload_single_file = slow_upload
+    manifest_path = str(tmp_path / 'upload_failures.json')
+    assert UploadData.upload_files2cloud(uploader, failure_manifest=manifest_path, max_in_flight=4) == {'uploaded': 11, 'failed': 1}
+    assert peak[0] == 4
+
+    manifest = load_manifest(manifest_path)
+    assert sorted(manifest['uploaded']) == sorted(set(file_dirs) - {'fix/5.nc'})
+    assert manifest['complete'] is True
+
+
+def test_transient_failures_are_retried_alongside_the_batch(tmp_path, monkeypatch):
+    uploader = FakeUploader({'fix': ['fix/a.nc', 'fix/b.nc', 'fix/c.nc']})
+    attempts = []
+
+    def flaky_upload(file_dir, key_path=None):
+        attempts.append(file_dir)
+        if file_dir == 'fix/a.nc' and attempts.count(file_dir) < 3:
+            raise transient_error()
+
+    uploader.upload_single_file = flaky_upload
+    monkeypatch.setattr(RetryQueue, 'backoff', lambda queue, attempts: 0.01)
+    manifest_path = str(tmp_path / 'upload_failures.json')
+    assert UploadData.upload_files2cloud(uploader, failure_manifest=manifest_path, max_in_flight=2) == {'uploaded': 3, 'failed': 0}
+    assert attempts.count('fix/a.nc') == 3
+
+
+def transient_error():
+    return botocore.exceptions.ClientError({'Error': {'Code': 'SlowDown', 'Message': 'Slow Down'},
+                                            'ResponseMetadata': {'HTTPStatusCode': 503}}, 'PutObject')
+
+
+def test_backoff_is_capped_exponential_w_full_jitter(monkeypatch):
+    queue = RetryQueue(base_delay=2.0, max_delay=10.0)
+    monkeypatch.setattr(random, 'uniform', lambda low, high: (low, high))
+
+    assert [queue.backoff(attempts) for attempts in range(1, 6)] == [(0, 2.0), (0, 4.0), (0, 8.0), (0, 10.0), (0, 10.0)]
+
+
+def test_only_transient_errors_w_attempts_left_are_deferred():
+    queue = RetryQueue(max_attempts=3)
+
+    assert queue.defer(('fix', 'fix/a.nc'), 1, transient_error())
+    assert not queue.defer(('fix', 'fix/b.nc'), 3, transient_error())
+    assert not queue.defer(('fix', 'fix/c.nc'), 1, FileNotFoundError('fix/c.nc'))
+    assert len(queue) == 1
+
+
+def test_retries_are_due_once_their_backoff_elapses(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    monkeypatch.setattr(time, 'sleep', lambda secs: now.__setitem__(0, now[0] + secs))
+    queue = RetryQueue()
+    monkeypatch.setattr(queue, 'backoff', lambda attempts: 5.0 * attempts)
+    queue.defer('later', 2, transient_error())
+    queue.defer('sooner', 1, transient_error())
+
+    assert queue.pop_due() is None
+    assert queue.pending() == [('sooner', 1), ('later', 2)]
+    now[0] += 5.0
+    assert queue.pop_due() == ('sooner', 1)
+    assert queue.pop_due() is None
+
+    # Once nothing else is left to upload, the worker waits for the next retry.
+    assert queue.pop_next() == ('later', 2)
+    assert now[0] == 1010.0
+    assert queue.pop_next() is None
+
+
+def test_interrupted_batch_records_pending_work(tmp_path):
+    manifest_path = str(tmp_path / 'upload_failures.json')
+    uploader = FakeUploader({'fix': ['fix/a.nc', 'fix/b.nc', 'fix/c.nc'], 'ma': ['ma/d.grib2']},
+                            interrupt_at='fix/c.nc', fail={'fix/b.nc'})
+    with pytest.raises(KeyboardInterrupt):
+        UploadData.upload_files2cloud(uploader, failure_manifest=manifest_path)
+
+    assert load_manifest(manifest_path)['pending'] == [{'dataset_type': 'fix', 'file_dir': 'fix/c.nc'},
+                                                       {'dataset_type': 'ma', 'file_dir': 'ma/d.grib2'}]
+
+
+def test_pending_work_rebuilt_from_journal_after_crash(tmp_path):
+    manifest_path = str(tmp_path / 'upload_failures.json')
+    manifest = UploadManifest(manifest_path, 'noaa-ufs-srw-pds', work={'fix': ['fix/a.nc', 'fix/b.nc', 'fix/c.nc']})
+    manifest.record_uploaded('fix/a.nc')
+    manifest.record_failed({'dataset_type': 'fix', 'file_dir': 'fix/b.nc', 'attempts': 1, 'error': 'boom'})
+
+    assert load_manifest(manifest_path)['pending'] == [{'dataset_type': 'fix', 'file_dir': 'fix/c.nc'}]
+
+
+def test_replay_uploads_failed_and_pending_to_the_manifest_bucket(tmp_path, s3_buckets):
+    srw = s3_buckets('srw')
+    mrw = s3_buckets('mrw')
+    for name in ['a.nc', 'b.nc', 'c.nc']:
+        (tmp_path / name).write_bytes(name.encode())
+    manifest_path = str(tmp_path / 'upload_failures.json')
+    manifest = UploadManifest(manifest_path, srw.bucket_name, work={'fix': ['a.nc', 'b.nc', 'c.nc']})
+    manifest.record_uploaded('a.nc')
+    manifest.record_failed({'dataset_type': 'fix', 'file_dir': 'b.nc', 'attempts': 5, 'error': 'boom'})
+    manifest.close(complete=False)
+
+    mrw.work_dir = str(tmp_path) + '/'
+    assert mrw.replay_failures(manifest_path, new_manifest=str(tmp_path / 'replay.json')) == {'uploaded': 2, 'failed': 0}
+
+    client = srw.s3.meta.client
+    assert sorted(obj['Key'] for obj in client.list_objects_v2(Bucket=srw.bucket_name)['Contents']) == ['b.nc', 'c.nc']
+    assert client.list_objects_v2(Bucket=mrw.bucket_name)['KeyCount'] == 0
+    assert load_manifest(str(tmp_path / 'replay.json'))['bucket'] == srw.bucket_name
+
+
+def test_replay_refuses_incomplete_manifest_wo_pending_work(tmp_path, monkeypatch):
+    manifest_path = str(tmp_path / 'upload_failures.json')
+    manifest = UploadManifest(manifest_path, FakeUploader.bucket_name)
+    manifest.record_failed({'dataset_type': 'fix', 'file_dir': 'fix/b.nc', 'attempts': 1, 'error': 'boom'})
+    manifest.close(complete=False)
+    uploader = FakeUploader(None)
+    uploader.upload_files2cloud = lambda failure_manifest: uploader.file_relative_dirs
+
+    with pytest.raises(ValueError, match='interrupted batch'):
+        UploadData.replay_failures(uploader, manifest_path)
+    assert UploadData.replay_failures(uploader, manifest_path, allow_incomplete=True) == {'fix': ['fix/b.nc']}
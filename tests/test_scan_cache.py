@@ -0,0 +1,87 @@
+import os
+import pickle
+
+from scan_cache import ScanCache
+
+# Directory mtimes well past ScanCache.RACY_SECS, so their listings are cached.
+OLD = 1560000000
+
+
+def make_tree(root):
+    for path in ['fix/fix_am/a.grb', 'fix/fix_am/b.grb', 'fix/fix_lut/c.dat']:
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_bytes(b'x')
+    age_dirs(root)
+
+
+def age_dirs(root, mtime=OLD):
+    for dir_path, _, _ in os.walk(root):
+        os.utime(dir_path, (mtime, mtime))
+
+
+def listing(cache, root, signature=('fix',)):
+    return sorted((os.path.relpath(dir_path, root), sorted(subfolders), sorted(filenames))
+                  for dir_path, subfolders, filenames in cache.walk('fix_data', str(root), signature))
+
+
+def test_unchanged_dirs_are_served_from_cache(tmp_path):
+    root = tmp_path / 'develop'
+    make_tree(root)
+    cache_path = str(tmp_path / 'scan_cache.pkl')
+    cache = ScanCache(cache_path)
+    expected = listing(cache, root)
+    cache.save()
+    assert (cache.hits, cache.misses) == (0, 4)
+
+    cache = ScanCache(cache_path)
+    assert listing(cache, root) == expected
+    assert (cache.hits, cache.misses) == (4, 0)
+
+
+def test_changed_dir_is_relisted(tmp_path):
+    root = tmp_path / 'develop'
+    make_tree(root)
+    cache_path = str(tmp_path / 'scan_cache.pkl')
+    cache = ScanCache(cache_path)
+    list(cache.walk('fix_data', str(root), ('fix',)))
+    cache.save()
+
+    # A new data file updates the mtime of its directory only.
+    (root / 'fix' / 'fix_lut' / 'd.dat').write_bytes(b'x')
+    os.utime(root / 'fix' / 'fix_lut', (OLD + 60, OLD + 60))
+    cache = ScanCache(cache_path)
+    found = dict((dir_path, filenames) for dir_path, _, filenames in listing(cache, root))
+
+    assert found[os.path.join('fix', 'fix_lut')] == ['c.dat', 'd.dat']
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_recently_modified_dirs_are_not_cached(tmp_path):
+    root = tmp_path / 'develop'
+    make_tree(root)
+    os.utime(root / 'fix' / 'fix_am')
+    cache = ScanCache(str(tmp_path / 'scan_cache.pkl'))
+    list(cache.walk('fix_data', str(root), ('fix',)))
+    list(cache.walk('fix_data', str(root), ('fix',)))
+
+    # A change w/in the same mtime tick would go unnoticed, so fix_am is relisted.
+    assert (cache.hits, cache.misses) == (3, 5)
+
+
+def test_signature_change_invalidates_tree(tmp_path):
+    root = tmp_path / 'develop'
+    make_tree(root)
+    cache = ScanCache(str(tmp_path / 'scan_cache.pkl'))
+    list(cache.walk('fix_data', str(root), ('fix',)))
+    list(cache.walk('fix_data', str(root), ('fix', 'avoid:fix_lut')))
+
+    assert (cache.hits, cache.misses) == (0, 8)
+
+
+def test_unreadable_or_old_cache_is_ignored(tmp_path):
+    cache_path = tmp_path / 'scan_cache.pkl'
+    cache_path.write_bytes(b'not a pickle')
+    assert ScanCache(str(cache_path)).trees == {}
+
+    cache_path.write_bytes(pickle.dumps({'version': ScanCache.VERSION - 1, 'trees': {'fix_data': {}}}))
+    assert ScanCache(str(cache_path)).trees == {}
@@ -0,0 +1,28 @@
+import io
+
+import pytest
+
+import srw_xfer
+
+
+@pytest.mark.parametrize('prefix', ['', '   '])
+def test_purge_rejects_empty_prefix(prefix, capsys):
+    assert srw_xfer.main(['purge', '--prefix', prefix, '--yes']) == 2
+    assert 'empty --prefix' in capsys.readouterr().err
+
+
+def test_purge_prefix_requires_yes_when_not_interactive(monkeypatch, capsys):
+    monkeypatch.setattr('sys.stdin', io.StringIO(''))
+    assert srw_xfer.main(['purge', '--prefix', 'develop/fix']) == 2
+    assert '--yes' in capsys.readouterr().err
+
+
+def test_purge_prefix_aborts_unless_confirmed(monkeypatch):
+    stdin = io.StringIO('n\n')
+    stdin.isatty = lambda: True
+    monkeypatch.setattr('sys.stdin', stdin)
+    assert srw_xfer.main(['purge', '--prefix', 'develop/fix']) == 1
+
+
+def test_purge_requires_keys_or_prefix():
+    assert srw_xfer.main(['purge']) == 2
@@ -0,0 +1,77 @@
+import gzip
+import io
+import os
+import tarfile
+
+import pytest
+
+from tar_extract import ParallelTarExtractor
+
+
+def make_tar(tar_dir, files):
+    with tarfile.open(tar_dir, 'w') as tar_file:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o640
+            info.mtime = 1560000000
+            tar_file.addfile(info, io.BytesIO(data))
+        link = tarfile.TarInfo('fix/latest.grb')
+        link.type = tarfile.SYMTYPE
+        link.linkname = 'fix_am/large.grb'
+        tar_file.addfile(link)
+
+
+FILES = {'fix/fix_am/large.grb': os.urandom(300000),
+         'fix/fix_am/empty.grb': b'',
+         'fix/fix_lut/optics_BC.v1_3.dat': os.urandom(1000)}
+
+
+def test_parallel_extract_matches_tar(tmp_path):
+    tar_dir = str(tmp_path / 'fix.tar')
+    make_tar(tar_dir, FILES)
+    with tarfile.open(tar_dir) as tar_file:
+
+        # Small ranges, so the large member is copied by several workers.
+        result = ParallelTarExtractor(max_workers=4, range_size=64 * 1024).extract(tar_file, path=str(tmp_path / 'out'))
+
+    assert result['parallel'] is True
+    assert result['bytes'] == sum(len(data) for data in FILES.values())
+    for name, data in FILES.items():
+        target = tmp_path / 'out' / name
+        assert target.read_bytes() == data
+        assert target.stat().st_mode & 0o777 == 0o640
+        assert int(target.stat().st_mtime) == 1560000000
+    assert os.readlink(tmp_path / 'out' / 'fix' / 'latest.grb') == 'fix_am/large.grb'
+
+
+def test_extract_only_given_members(tmp_path):
+    tar_dir = str(tmp_path / 'fix.tar')
+    make_tar(tar_dir, FILES)
+    with tarfile.open(tar_dir) as tar_file:
+        members = [m for m in tar_file.getmembers() if 'fix_lut' not in m.name]
+        ParallelTarExtractor().extract(tar_file, members, path=str(tmp_path / 'out'))
+
+    assert (tmp_path / 'out' / 'fix' / 'fix_am' / 'large.grb').exists()
+    assert not (tmp_path / 'out' / 'fix' / 'fix_lut').exists()
+
+
+def test_member_outside_path_is_rejected(tmp_path):
+    tar_dir = str(tmp_path / 'evil.tar')
+    make_tar(tar_dir, {'../escaped.grb': b'x'})
+    with tarfile.open(tar_dir) as tar_file:
+        with pytest.raises(tarfile.ExtractError):
+            ParallelTarExtractor().extract(tar_file, path=str(tmp_path / 'out'))
+    assert not (tmp_path / 'escaped.grb').exists()
+
+
+def test_compressed_tar_falls_back_to_extractall(tmp_path):
+    tar_dir = tmp_path / 'fix.tar'
+    make_tar(str(tar_dir), FILES)
+    gz_dir = tmp_path / 'fix.tar.gz'
+    gz_dir.write_bytes(gzip.compress(tar_dir.read_bytes()))
+    with tarfile.open(str(gz_dir)) as tar_file:
+        result = ParallelTarExtractor().extract(tar_file, path=str(tmp_path / 'out'))
+
+    assert result['parallel'] is False
+    assert (tmp_path / 'out' / 'fix' / 'fix_am' / 'large.grb').read_bytes() == FILES['fix/fix_am/large.grb']
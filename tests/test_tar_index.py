@@ -0,0 +1,63 @@
+import io
+import json
+import os
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+
+from tar_index import INDEX_SUFFIX, PendingTarIndex, TarMemberClient, build_tar_index
+
+
+def make_tar(tar_dir, sizes):
+    with tarfile.open(tar_dir, 'w') as tar_file:
+        info = tarfile.TarInfo('fix')
+        info.type = tarfile.DIRTYPE
+        tar_file.addfile(info)
+        for i, size in enumerate(sizes):
+            info = tarfile.TarInfo(f"fix/file_{i}.nc")
+            info.size = size
+            tar_file.addfile(info, io.BytesIO(os.urandom(size)))
+
+
+def test_pending_index_matches_index_built_from_disk(tmp_path):
+    tar_dir = str(tmp_path / 'fix.tar')
+    make_tar(tar_dir, [0, 1, 700, 3000, 100000])
+    with ThreadPoolExecutor(max_workers=2) as executor:
+
+        # Small tasks, so consecutive members are split across several tasks.
+        pending = PendingTarIndex(tar_dir, 'fix.tar', executor, task_bytes=2000)
+        assert [len(group) for group in pending.tasks] == [4, 1]
+        index = pending.result()
+    assert index == build_tar_index(tar_dir, 'fix.tar')
+    assert all('md5' in entry for entry in index['members'] if entry['type'] == 'file')
+
+
+def test_tar_upload_by_filename_publishes_index(tmp_path, s3_buckets, monkeypatch):
+    uploader = s3_buckets('srw', multipart_threshold=5*1024**2, multipart_chunksize=5*1024**2)
+    tar_dir = str(tmp_path / 'fix.tar')
+    make_tar(tar_dir, [1000, 6*1024**2, 0, 5*1024**2 + 17])
+
+    # The tar is uploaded from its file (memory-mapped, as it is above the multipart threshold)
+    # rather than through a file-like object s3transfer would buffer.
+    upload, upload_file_mmap = uploader.transfer_session.upload, uploader.upload_file_mmap
+    sources = []
+
+    def record_source(file_obj, *args, **kwargs):
+        sources.append(file_obj)
+        return upload(file_obj, *args, **kwargs)
+
+    def record_mmap_source(file_path, *args, **kwargs):
+        sources.append(('mmap', file_path))
+        return upload_file_mmap(file_path, *args, **kwargs)
+
+    monkeypatch.setattr(uploader.transfer_session, 'upload', record_source)
+    monkeypatch.setattr(uploader, 'upload_file_mmap', record_mmap_source)
+    uploader.upload_single_srw_folder(tar_dir, 'develop/fix.tar')
+    assert sources == [('mmap', tar_dir)]
+
+    client = uploader.s3.meta.client
+    index = json.loads(client.get_object(Bucket=uploader.bucket_name, Key='develop/fix.tar' + INDEX_SUFFIX)['Body'].read())
+    assert index == build_tar_index(tar_dir, 'develop/fix.tar')
+
+    member = TarMemberClient(client, uploader.bucket_name, 'develop/fix.tar')
+    with tarfile.open(tar_dir) as tar_file:
+        assert member.fetch_member('fix/file_3.nc') == tar_file.extractfile('fix/file_3.nc').read()
@@ -0,0 +1,74 @@
+import hashlib
+import io
+import json
+import os
+import tarfile
+
+from tar_stream import TarStreamUploader
+
+MB = 1024**2
+
+
+def test_streamed_tar_members_at_indexed_offsets(tmp_path, s3_buckets):
+    uploader = s3_buckets('srw')
+    client = uploader.s3.meta.client
+    files = {'fix/fix_am/large.grb': os.urandom(6 * MB + 3),
+             'fix/fix_am/empty.grb': b'',
+             'fix/fix_lut/optics_BC.v1_3.dat': os.urandom(1000)}
+    for name, data in files.items():
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(data)
+
+    # Small read chunks & parts, so members span several reads & parts.
+    tar_uploader = TarStreamUploader(client, uploader.bucket_name, part_size=5 * MB, read_workers=3, read_chunk=MB)
+    index_path = str(tmp_path / 'fix.tar.index.json')
+    index = tar_uploader.upload([str(tmp_path / name) for name in files], str(tmp_path), 'fix.tar', index_path=index_path)
+    archive = client.get_object(Bucket=uploader.bucket_name, Key='fix.tar')['Body'].read()
+
+    assert index['archive_size'] == len(archive)
+    with open(index_path) as f:
+        assert json.load(f) == index
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar_file:
+        assert sorted(m.name for m in tar_file.getmembers() if m.isreg()) == sorted(files)
+        offsets = {m.name: (m.offset, m.offset_data) for m in tar_file.getmembers()}
+
+    assert [entry['name'] for entry in index['members']] == ['fix', 'fix/fix_am', 'fix/fix_am/empty.grb',
+                                                             'fix/fix_am/large.grb', 'fix/fix_lut',
+                                                             'fix/fix_lut/optics_BC.v1_3.dat']
+    for entry in index['members']:
+        assert (entry['header_offset'], entry['offset']) == offsets[entry['name']]
+        if entry['type'] == 'file':
+            data = files[entry['name']]
+            assert archive[entry['offset']:entry['offset'] + entry['size']] == data
+            assert entry['md5'] == hashlib.md5(data).hexdigest()
+
+
+def test_srw_datasets_streamed_from_the_scanned_views(tmp_path, s3_buckets, monkeypatch):
+    from get_srw_data import GetSrwData
+    from transfer_srw_tar import stream_srw_datasets
+
+    uploader = s3_buckets('srw')
+    srw_data_root = tmp_path / 'develop'
+    for name in ['fix/fix_am/global_hyblev.l65.txt', 'fix/fix_orog/C403_grid.tile7.nc',
+                 'fix/schin_scratch/notes.txt', 'input_model_data/FV3GFS/gfs.t00z.pgrb2.0p25.f000']:
+        (srw_data_root / name).parent.mkdir(parents=True, exist_ok=True)
+        (srw_data_root / name).write_bytes(name.encode())
+
+    # The avoid folders filtered out by GetSrwData are left out of the tars (no re-walk).
+    srw_data = GetSrwData(None, ['schin_scratch'], None, None, None, None, None, None,
+                          srw_data_root=str(srw_data_root) + '/', scan=False)
+    srw_data.fix_file_dirs = srw_data.get_data_dirs('fix_data')
+    srw_data.ma_file_dirs = srw_data.get_data_dirs('input_model_data')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(os, 'walk', None)
+    indexes = stream_srw_datasets(srw_data, transfer_session=uploader.transfer_session)
+
+    client = uploader.s3.meta.client
+    members = {}
+    for key_path in ['fix.tar', 'input_model_data.tar']:
+        data = client.get_object(Bucket=uploader.bucket_name, Key=key_path)['Body'].read()
+        with tarfile.open(fileobj=io.BytesIO(data)) as tar_file:
+            members[key_path] = sorted(member.name for member in tar_file if member.isfile())
+    assert members == {'fix.tar': ['fix/fix_am/global_hyblev.l65.txt', 'fix/fix_orog/C403_grid.tile7.nc'],
+                       'input_model_data.tar': ['input_model_data/FV3GFS/gfs.t00z.pgrb2.0p25.f000']}
+    assert sorted(indexes) == ['fix.tar', 'input_model_data.tar']
@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+from part_reader import DEFAULT_MEMORY_BUDGET, MemoryBudget
+from transfer_session import TransferSession
+from upload_data import UploadData
+
+MB = 1024**2
+
+
+def test_unknown_bucket_raises():
+    with pytest.raises(ValueError, match='xyz Bucket Does Not Exist'):
+        UploadData(None, 'xyz')
+
+
+def test_uploader_closes_only_its_own_session(s3_buckets, monkeypatch):
+    shared = s3_buckets('srw').transfer_session
+    closed = []
+    monkeypatch.setattr(TransferSession, 'close', lambda session: closed.append(session))
+
+    with UploadData(None, 'srw', transfer_session=shared) as uploader:
+        assert uploader.transfer_session is shared
+    assert closed == []
+
+    with UploadData(None, 'srw') as uploader:
+        assert uploader.transfer_session is not shared
+    assert closed == [uploader.transfer_session]
+
+
+def test_uploaders_share_the_process_memory_budget(s3_buckets):
+    uploader = s3_buckets('srw')
+    with UploadData(None, 'mrw') as other:
+        assert other.memory_budget is uploader.memory_budget is DEFAULT_MEMORY_BUDGET
+
+
+def test_multipart_uploads_are_memory_mapped_within_the_budget(tmp_path, s3_buckets, monkeypatch):
+    uploader = s3_buckets('srw', multipart_threshold=6 * MB, multipart_chunksize=5 * MB)
+    uploader.work_dir = str(tmp_path) + '/'
+    uploader.memory_budget = MemoryBudget(5 * MB)
+    data = os.urandom(11 * MB)
+    (tmp_path / 'large.grib2').write_bytes(data)
+    (tmp_path / 'small.grib2').write_bytes(data[:MB])
+    client = uploader.s3.meta.client
+    parts = []
+    upload_part = client.upload_part
+
+    def record_part(**kwargs):
+        parts.append((kwargs['PartNumber'], kwargs['ContentLength']))
+        return upload_part(**kwargs)
+
+    monkeypatch.setattr(client, 'upload_part', record_part)
+    uploader.upload_single_file('large.grib2')
+    uploader.upload_single_file('small.grib2')
+
+    assert sorted(parts) == [(1, 5 * MB), (2, 5 * MB), (3, MB)]
+    assert uploader.memory_budget.peak == 5 * MB
+    for key, expected in [('large.grib2', data), ('small.grib2', data[:MB])]:
+        assert client.get_object(Bucket=uploader.bucket_name, Key=key)['Body'].read() == expected
+
+
+def test_zstd_folder_upload_round_trip(tmp_path, s3_buckets):
+    zstandard = pytest.importorskip('zstandard')
+    uploader = s3_buckets('srw', multipart_threshold=5 * MB, multipart_chunksize=5 * MB)
+    tar_dir = tmp_path / 'fix.tar'
+    data = (os.urandom(MB) + bytes(3 * MB)) * 3
+    tar_dir.write_bytes(data)
+
+    sizes = uploader.upload_single_srw_folder_zstd(str(tar_dir), 'develop/fix.tar.zst', level=3, threads=2)
+    response = uploader.s3.meta.client.get_object(Bucket=uploader.bucket_name, Key='develop/fix.tar.zst')
+    compressed = response['Body'].read()
+
+    assert response['ContentEncoding'] == 'zstd'
+    assert response['Metadata'] == {'original-size': str(len(data))}
+    assert sizes == {'original_size': len(data), 'compressed_size': len(compressed)}
+    assert len(compressed) < len(data) / 2
+    assert zstandard.ZstdDecompressor().decompress(compressed) == data
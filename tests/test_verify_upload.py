@@ -0,0 +1,50 @@
+import botocore.exceptions
+
+from verify_upload import VerifyUpload
+
+
+def write_folder(folder, n_files):
+    folder.mkdir()
+    for i in range(n_files):
+        (folder / f"file_{i}.nc").write_bytes(b'x' * (i + 1))
+
+
+def test_head_errors_are_recorded_per_key(tmp_path, s3_buckets, monkeypatch):
+    uploader = s3_buckets('srw')
+    uploader.work_dir = str(tmp_path) + '/'
+    write_folder(tmp_path / 'fix', 3)
+    client = uploader.s3.meta.client
+    for i in range(3):
+        client.put_object(Bucket=uploader.bucket_name, Key=f"fix/file_{i}.nc", Body=b'x' * (i + 1))
+    head_object = client.head_object
+
+    def denied(**kwargs):
+        if kwargs['Key'] == 'fix/file_1.nc':
+            raise botocore.exceptions.ClientError({'Error': {'Code': 'AccessDenied', 'Message': 'Access Denied'},
+                                                   'ResponseMetadata': {'HTTPStatusCode': 403}}, 'HeadObject')
+        return head_object(**kwargs)
+
+    monkeypatch.setattr(client, 'head_object', denied)
+    verifier = VerifyUpload(uploader, max_workers=2)
+    report = verifier.verify(verifier.expected_from_dicts({'fix': [f"fix/file_{i}.nc" for i in range(3)]}),
+                             mode='head', report_path=str(tmp_path / 'report.json'))
+
+    assert report['ok'] == ['fix/file_0.nc', 'fix/file_2.nc']
+    assert [entry['key'] for entry in report['error']] == ['fix/file_1.nc']
+    assert report['missing'] == []
+
+
+def test_auto_mode_sizes_listing_by_whole_folder(tmp_path, s3_buckets):
+    uploader = s3_buckets('srw')
+    uploader.work_dir = str(tmp_path) + '/'
+    write_folder(tmp_path / 'fix', 5000)
+    verifier = VerifyUpload(uploader, max_workers=2)
+    report_path = str(tmp_path / 'report.json')
+
+    # Sparse check of a large folder: 5 listing requests vs 4 HEAD requests.
+    sparse = verifier.expected_from_dicts({'fix': [f"fix/file_{i}.nc" for i in range(4)]})
+    assert verifier.verify(sparse, report_path=report_path)['mode'] == 'head'
+
+    # Most of the folder: 5 listing requests vs 3000 HEAD requests.
+    dense = verifier.expected_from_dicts({'fix': [f"fix/file_{i}.nc" for i in range(3000)]})
+    assert verifier.verify(dense, report_path=report_path)['mode'] == 'list'
@@ -0,0 +1,136 @@
+import os
+import time
+
+import pytest
+
+from upload_data import UploadData
+from work_queue import UploadWorkQueue
+
+
+@pytest.fixture
+def work_queue(tmp_path):
+    queue = UploadWorkQueue(str(tmp_path / 'queue.db'), lease_secs=60)
+    queue.populate({'fix': [f"fix/fix_am/file_{i}.nc" for i in range(5)]})
+    yield queue
+    queue.close()
+
+
+def expire_leases(queue, file_dir=None):
+    queue.conn.execute("UPDATE work SET lease_expires = ? WHERE status = 'claimed' AND file_dir = COALESCE(?, file_dir)",
+                       (time.time() - 1, file_dir))
+
+
+def test_claim_batch_claims_each_item_once(work_queue):
+    first = work_queue.claim_batch('w1', batch_size=3)
+    second = work_queue.claim_batch('w2', batch_size=3)
+    assert [item['file_dir'] for item in first] == [f"fix/fix_am/file_{i}.nc" for i in range(3)]
+    assert len(second) == 2
+    assert work_queue.claim_batch('w3') == []
+    assert work_queue.progress()['claimed'] == 5
+
+
+def test_expired_lease_is_reclaimed(work_queue):
+    batch = work_queue.claim_batch('w1', batch_size=5)
+    expire_leases(work_queue)
+    reclaimed = work_queue.claim_batch('w2', batch_size=5)
+    assert [item['item_id'] for item in reclaimed] == [item['item_id'] for item in batch]
+    assert all(item['attempts'] == 2 for item in reclaimed)
+
+
+def test_stolen_lease_cannot_record_completion_or_failure(work_queue):
+    stale = work_queue.claim_batch('w1', batch_size=1)[0]
+    expire_leases(work_queue)
+    fresh = work_queue.claim_batch('w2', batch_size=1)[0]
+    assert fresh['item_id'] == stale['item_id']
+
+    assert not work_queue.mark_done(stale['item_id'], stale['claim_token'])
+    assert not work_queue.mark_failed(stale['item_id'], stale['claim_token'], 'boom')
+    assert work_queue.mark_done(fresh['item_id'], fresh['claim_token'])
+    assert work_queue.progress()['done'] == 1
+
+
+def test_items_fail_after_max_attempts(tmp_path):
+    queue = UploadWorkQueue(str(tmp_path / 'queue.db'), max_attempts=2)
+    queue.populate({'fix': ['fix/a.nc']})
+    for _ in range(2):
+        item = queue.claim_batch('w1')[0]
+        assert queue.mark_failed(item['item_id'], item['claim_token'], 'boom')
+    assert queue.claim_batch('w1') == []
+    assert queue.failed_items() == [('fix/a.nc', 'fix/a.nc', 'boom')]
+    queue.close()
+
+
+def test_heartbeat_renews_lease(work_queue):
+    item = work_queue.claim_batch('w1', batch_size=1)[0]
+    expire_leases(work_queue)
+    assert work_queue.renew_lease(item['claim_token']) == 1
+    assert work_queue.claim_batch('w2', batch_size=5)[0]['item_id'] != item['item_id']
+
+
+class FakeUploader():
+    """
+    Stands in for UploadData in upload_files_from_queue (no cloud access).
+
+    """
+
+    def __init__(self, work_queue, uploaded=(), steal=(), fail=()):
+        self.work_queue = work_queue
+        self.uploaded = set(uploaded)
+        self.steal = set(steal)
+        self.fail = set(fail)
+        self.calls = []
+
+    def upload_single_file(self, file_dir, key_path=None):
+        self.calls.append(file_dir)
+        if file_dir in self.steal:
+            expire_leases(self.work_queue, file_dir)
+            self.work_queue.claim_batch('thief', batch_size=1)
+        if file_dir in self.fail:
+            raise RuntimeError('boom')
+
+    def is_uploaded(self, file_dir, key_path, mode='file'):
+        return file_dir in self.uploaded
+
+
+def test_worker_counts_only_recorded_completions(tmp_path):
+    queue = UploadWorkQueue(str(tmp_path / 'queue.db'), max_attempts=1)
+    queue.populate({'fix': ['fix/a.nc', 'fix/b.nc', 'fix/c.nc']})
+    uploader = FakeUploader(queue, steal={'fix/a.nc'}, fail={'fix/c.nc'})
+    result = UploadData.upload_files_from_queue(uploader, queue, 'w1', batch_size=3)
+    assert result == {'uploaded': 1, 'skipped': 0, 'failed': 1, 'lease_lost': 1}
+    queue.close()
+
+
+def test_worker_skips_reclaimed_items_already_in_cloud(tmp_path):
+    queue = UploadWorkQueue(str(tmp_path / 'queue.db'))
+    queue.populate({'fix': ['fix/a.nc', 'fix/b.nc']})
+    queue.claim_batch('dead', batch_size=2)
+    expire_leases(queue)
+    uploader = FakeUploader(queue, uploaded={'fix/a.nc'})
+    result = UploadData.upload_files_from_queue(uploader, queue, 'w1', batch_size=2)
+    assert result == {'uploaded': 1, 'skipped': 1, 'failed': 0, 'lease_lost': 0}
+    assert uploader.calls == ['fix/b.nc']
+    assert queue.progress()['done'] == 2
+    queue.close()
+
+
+
+@pytest.mark.parametrize('in_cloud', [False, True])
+def test_reclaimed_absolute_path_tar(tmp_path, s3_buckets, in_cloud):
+    tar_dir = tmp_path / 'fix.tar'
+    tar_dir.write_bytes(os.urandom(3000))
+    uploader = s3_buckets('srw')
+    client = uploader.s3.meta.client
+    if in_cloud:
+        client.put_object(Bucket=uploader.bucket_name, Key='fix.tar', Body=tar_dir.read_bytes())
+    queue = UploadWorkQueue(str(tmp_path / 'queue.db'))
+    queue.populate_objects([str(tar_dir)], ['fix.tar'])
+
+    # The first worker dies holding the tar.
+    queue.claim_batch('dead', batch_size=1)
+    expire_leases(queue)
+    result = uploader.upload_files_from_queue(queue, 'w1')
+    queue.close()
+
+    assert result == {'uploaded': 0 if in_cloud else 1, 'skipped': 1 if in_cloud else 0, 'failed': 0, 'lease_lost': 0}
+    assert client.head_object(Bucket=uploader.bucket_name, Key='fix.tar')['ContentLength'] == 3000
@@ -0,0 +1,92 @@
+import boto3
+from boto3.s3.transfer import TransferConfig, ProgressCallbackInvoker, create_transfer_manager
+from botocore.config import Config
+
+
+class TransferSession():
+    """
+    Long-lived transfer session reusing a single boto3 Session, S3 client, HTTP connection
+    pool & TransferManager (incl. its thread pool) for a whole batch of uploads.
+
+    Calling upload_file on the client builds a new TransferManager & thread pool for every
+    data file, which dominates the upload time of small data files. Sharing one session
+    across TransferSrwTar, TransferSrwData & UploadData avoids that per-file setup.
+
+    """
+
+    def __init__(self, profile_name, max_concurrency=10, multipart_threshold=100*1024**2,
+                 multipart_chunksize=50000*1024, max_pool_connections=None, endpoint_url=None):
+        """
+        Args:
+            profile_name (str): AWS credentials profile of the bucket(s) (e.g. 'srw-app').
+            max_concurrency (int): Maximum number of threads making requests.
+            multipart_threshold (int): Transfer size threshold at which a multipart upload
+                                       is triggered.
+            multipart_chunksize (int): Partition size of each part of a multipart upload.
+            max_pool_connections (int): Size of the HTTP connection pool. If None, sized to the
+                                        transfer concurrency plus headroom for the requests
+                                        made outside the TransferManager (e.g. HEAD requests).
+                                        botocore's default of 10 would cap the concurrency.
+            endpoint_url (str): If set, requests are sent to this S3-compatible endpoint
+                                (e.g. a MinIO or moto server for the benchmarks).
+
+        """
+        self.profile_name = profile_name
+        self.max_pool_connections = max_pool_connections or max_concurrency + 16
+        self.session = boto3.Session(profile_name=profile_name)
+
+        # 'num_download_attempts' only applies to downloads -- uploads are retried by botocore's
+        # retry handler (throttling, 5xx & connection errors).
+        self.client_config = Config(max_pool_connections=self.max_pool_connections,
+                                    retries={'max_attempts': 10, 'mode': 'adaptive'})
+        self.s3 = self.session.resource('s3', config=self.client_config, endpoint_url=endpoint_url)
+        self.client = self.s3.meta.client
+        self.config = TransferConfig(multipart_threshold=multipart_threshold,
+                                     max_concurrency=max_concurrency,
+                                     multipart_chunksize=multipart_chunksize,
+                                     num_download_attempts=2,
+                                     use_threads=True)
+        self.transfer_manager = create_transfer_manager(self.client, self.config)
+
+    def upload(self, file_obj, bucket_name, key_path, callback=None, extra_args=None):
+        """
+        Submit an upload to the shared TransferManager.
+
+        Args:
+            file_obj (str or file): Data file's full directory path or a readable file-like object.
+            bucket_name (str): Cloud data storage bucket.
+            key_path (str): Key of the object in cloud.
+            callback (ProgressPercentage): If set, receives the bytes transferred.
+            extra_args (dict): Extra arguments of the upload (e.g. ContentEncoding, Metadata).
+
+        Return (TransferFuture): Future of the upload -- call result() to wait for it.
+
+        """
+        subscribers = [ProgressCallbackInvoker(callback)] if callback is not None else None
+
+        return self.transfer_manager.upload(file_obj, bucket_name, key_path,
+                                            extra_args=extra_args, subscribers=subscribers)
+
+    def close(self):
+        """
+        Wait for the submitted uploads & shut down the TransferManager's thread pool.
+
+        Args:
+            None
+
+        Return: None
+
+        """
+        self.transfer_manager.shutdown()
+
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.transfer_manager.shutdown(cancel=True)
+        else:
+            self.close()
+        return False
@@ -1,6 +1,10 @@
 from get_srw_data import GetSrwData
 from progress_bar import ProgressPercentage
 from upload_data import UploadData
+from transfer_session import TransferSession
+from transfer_srw_tar import stream_srw_datasets
+from profiling import PROFILER, span
+import argparse
 
 
 class TransferSrwData():
@@ -8,12 +12,18 @@ class TransferSrwData():
     Obtain directories for the datasets tracked by the data tracker bot.
     
     """
-    def __init__(self, linked_home_dir, platform="orion"):
+    def __init__(self, linked_home_dir, platform="orion", upload=False, stream_tars=False):
         """
         Args: 
              linked_home_dir (str): User directory linked to the RDHPCS' root
                                     data directory.
              platform (str): RDHPCS of where the datasets will be sourced.
+             upload (bool): If set, the fixed, input model & Natural Earth data are uploaded
+                            over a single transfer session. Otherwise, the datasets are only
+                            listed.
+             stream_tars (bool): If set, the fixed & input model data files (filtered) are
+                                 also streamed to cloud as 'fix.tar' & 'input_model_data.tar'
+                                 over the same transfer session.
         """
     
         # Establish locality of where the dataseta will be sourced.
@@ -49,14 +59,43 @@ class TransferSrwData():
         print("\033[1m" + f"\nSRW Fix data:" + "\033[0m" + f"\n{self.srw_fix_dict}")
         print("\033[1m" + f"\nSRW Natural Earth data:" + "\033[0m" + f"\n{self.srw_ne_dict}")
     
-        # Upload fixed, input model, & Natural Earth data.
-        #UploadData(srw_fix_dict, use_bucket='srw').upload_files2cloud()
-        #UploadData(srw_ma_dict, use_bucket='srw').upload_files2cloud()      
-        #UploadData(srw_ne_dict, use_bucket='srw').upload_files2cloud()     
+        if not (upload or stream_tars):
+            return
+        
+        # Upload fixed, input model, & Natural Earth data over a single transfer session (client,
+        # connection pool & TransferManager), shut down once all uploads are done.
+        with TransferSession(UploadData.BUCKETS['srw'][1]) as transfer_session:
+            if upload:
+                for name, datasets in [('fix', self.srw_fix_dict), ('ma', self.srw_ma_dict), ('ne', self.srw_ne_dict)]:
+                    UploadData(datasets, use_bucket='srw', transfer_session=transfer_session).upload_files2cloud(
+                        failure_manifest=f'upload_failures_{name}.json')
+            if stream_tars:
+                stream_srw_datasets(self.srw_uploader, transfer_session=transfer_session)
         print("\033[1m" + f"\nSRW Fix, MA, & Natural Earth data transfer to S3 bucket complete." + "\033[0m") 
         
         
 if __name__ == '__main__': 
     
-    # Obtain directories & upload to cloud for all the fix and model input SRW datasets
-    srw_xfer = TransferSrwData(linked_home_dir="/home/schin/work", platform="orion")
+    parser = argparse.ArgumentParser(description="Upload the SRW fix, input model & natural earth datasets to cloud.")
+    parser.add_argument('--replay', default=None, help="Failure manifest of a previous run to re-upload.")
+    parser.add_argument('--allow-incomplete', action='store_true',
+                        help="Replay only the failures of an interrupted run whose manifest does not record its pending data files.")
+    parser.add_argument('--upload', action='store_true', help="Upload the datasets (otherwise they are only listed).")
+    parser.add_argument('--stream-tars', action='store_true',
+                        help="Stream the fix & input model data files (filtered) to cloud as tars.")
+    parser.add_argument('--profile', nargs='?', const='spans', default=None,
+                        help="Print a phase summary at the end of the run. Optional modes: spans,cprofile,tracemalloc.")
+    args = parser.parse_args()
+    if args.profile is not None:
+        PROFILER.enable(args.profile)
+    
+    # Re-upload the data files which failed during a previous run.
+    if args.replay is not None:
+        with UploadData(file_relative_dirs=None, use_bucket='srw') as uploader_wrapper:
+            uploader_wrapper.replay_failures(args.replay, allow_incomplete=args.allow_incomplete)
+    else:
+    
+        # Obtain directories & upload to cloud for all the fix and model input SRW datasets
+        with span('TransferSrwData'):
+            srw_xfer = TransferSrwData(linked_home_dir="/home/schin/work", platform="orion", upload=args.upload,
+                                       stream_tars=args.stream_tars)
@@ -0,0 +1,155 @@
+from upload_data import UploadData
+from work_queue import UploadWorkQueue, default_worker_id
+from makespan import MakespanScheduler, sized_items
+import argparse
+
+
+class TransferSrwShard():
+    """
+    Distribute the SRW uploads across multiple nodes via a work queue on a shared filesystem.
+
+    Example w/ a Slurm job array of 8 workers:
+
+        python transfer_srw_shard.py enqueue-tar /work/queue.db fix.tar input_model_data.tar
+        python transfer_srw_shard.py enqueue-list /work/queue.db files.txt --workers 8
+        sbatch --array=0-7 --wrap "python transfer_srw_shard.py worker /work/queue.db"
+        python transfer_srw_shard.py status /work/queue.db
+
+    """
+    def __init__(self, queue_path, use_bucket='srw', lease_secs=1800):
+        """
+        Args:
+            queue_path (str): Path of the work queue on the shared filesystem.
+            use_bucket (str): Cloud data storage bucket to upload to ('rt', 'srw' or 'mrw').
+            lease_secs (int): Seconds a claimed item is reserved for a worker.
+
+        """
+        self.use_bucket = use_bucket
+        self.work_queue = UploadWorkQueue(queue_path, lease_secs=lease_secs)
+
+    def enqueue_data(self, file_relative_dirs, n_workers=None, throughput=50*1024**2):
+        """
+        Coordinator: write the data files (e.g. GetSrwData partitions) into the work queue.
+
+        Args:
+            file_relative_dirs (dict): Dictionary partitioning the file directories into the
+                                       dataset types.
+            n_workers (int): If set, the data files are scheduled by size for this many
+                             workers -- large data files longest first, small data files in
+                             batches filling the gaps (see MakespanScheduler).
+            throughput (float): Expected upload throughput of a worker in bytes/s.
+
+        Return (int): Number of items added to the work queue.
+
+        """
+        if n_workers is None:
+            return self.work_queue.populate(file_relative_dirs)
+
+        schedule = MakespanScheduler(n_workers, throughput=throughput).schedule(sized_items(file_relative_dirs))
+        summary = schedule.summary()
+        print(f"Scheduled {summary['items']} data files ({summary['bytes'] / 1024**3:.1f} GB) as "
+              f"{summary['tasks']} tasks for {n_workers} workers. Expected makespan: "
+              f"{summary['expected_makespan'] / 60:.1f} min (listing order: {summary['fifo_makespan'] / 60:.1f} min, "
+              f"lower bound: {summary['lower_bound'] / 60:.1f} min)")
+
+        return self.work_queue.populate_scheduled(schedule)
+
+    def enqueue_tars(self, object_dirs, key_paths=None):
+        """
+        Coordinator: write the tar objects into the work queue.
+
+        Args:
+            object_dirs (list): Directory paths of the tar objects.
+            key_paths (list): Keys to set for the tar objects in cloud. If None, the key of
+                              each object will be set to its local directory location.
+
+        Return (int): Number of items added to the work queue.
+
+        """
+        return self.work_queue.populate_objects(object_dirs, key_paths)
+
+    def run_worker(self, worker_id=None, batch_size=50):
+        """
+        Worker: claim & upload batches until the work queue is drained.
+
+        Args:
+            worker_id (str): Unique name of the worker. If None, derived from the Slurm
+                             array task, host & process.
+            batch_size (int): Number of items to claim per batch.
+
+        Return (dict): Number of items uploaded & failed by this worker.
+
+        """
+        if worker_id is None:
+            worker_id = default_worker_id()
+        with UploadData(file_relative_dirs=None, use_bucket=self.use_bucket) as uploader_wrapper:
+            return uploader_wrapper.upload_files_from_queue(self.work_queue, worker_id, batch_size)
+
+    def status(self):
+        """
+        Display the progress of the work queue.
+
+        Args:
+            None
+
+        Return (dict): Number of items per status.
+
+        """
+        counts = self.work_queue.progress()
+        print("\033[1m" + "Work Queue Status:" + "\033[0m" + f"\n{counts}")
+        makespan = self.work_queue.makespan()
+        if makespan.get('actual_makespan') is not None:
+            print(f"Actual makespan: {makespan['actual_makespan'] / 60:.1f} min over {makespan['workers']} workers "
+                  f"(last worker finished {makespan['finish_spread'] / 60:.1f} min after the first)")
+            if makespan.get('throughput_per_worker'):
+                print(f"Measured throughput per worker: {makespan['throughput_per_worker'] / 1024**2:.1f} MB/s")
+        if 'schedule' in makespan:
+            schedule = makespan['schedule']
+            print(f"Expected makespan: {schedule['expected_makespan'] / 60:.1f} min for {schedule['workers']} workers "
+                  f"(listing order: {schedule['fifo_makespan'] / 60:.1f} min, lower bound: {schedule['lower_bound'] / 60:.1f} min)")
+        for file_dir, key_path, last_error in self.work_queue.failed_items():
+            print(f"FAILED {file_dir} -> {key_path}: {last_error}")
+
+        return counts
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Sharded upload of SRW datasets to cloud.")
+    parser.add_argument('--bucket', default='srw', help="Bucket to upload to ('rt', 'srw' or 'mrw').")
+    parser.add_argument('--lease-secs', type=int, default=1800)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    enqueue_tar = subparsers.add_parser('enqueue-tar', help="Add tar objects to the work queue.")
+    enqueue_tar.add_argument('queue_path')
+    enqueue_tar.add_argument('object_dirs', nargs='+', help="Tar object, optionally as 'path:key'.")
+
+    enqueue_list = subparsers.add_parser('enqueue-list', help="Add the data files listed in a text file.")
+    enqueue_list.add_argument('queue_path')
+    enqueue_list.add_argument('list_file', help="One relative data file directory per line.")
+    enqueue_list.add_argument('--workers', type=int, default=None,
+                              help="Schedule the data files by size for this many workers.")
+    enqueue_list.add_argument('--throughput-mbps', type=float, default=50,
+                              help="Expected upload throughput of a worker in MB/s (for the schedule).")
+
+    worker = subparsers.add_parser('worker', help="Claim & upload items until the queue is drained.")
+    worker.add_argument('queue_path')
+    worker.add_argument('--worker-id', default=None)
+    worker.add_argument('--batch-size', type=int, default=50)
+
+    status = subparsers.add_parser('status', help="Display the progress of the work queue.")
+    status.add_argument('queue_path')
+    args = parser.parse_args()
+
+    shard = TransferSrwShard(args.queue_path, use_bucket=args.bucket, lease_secs=args.lease_secs)
+    if args.command == 'enqueue-tar':
+        pairs = [obj.split(':', 1) if ':' in obj else [obj, obj] for obj in args.object_dirs]
+        shard.enqueue_tars([p[0] for p in pairs], [p[1] for p in pairs])
+    elif args.command == 'enqueue-list':
+        with open(args.list_file) as f:
+            shard.enqueue_data({'file_list': [line.strip() for line in f if line.strip()]},
+                               n_workers=args.workers, throughput=args.throughput_mbps * 1024**2)
+    elif args.command == 'worker':
+        shard.run_worker(args.worker_id, args.batch_size)
+    elif args.command == 'status':
+        shard.status()
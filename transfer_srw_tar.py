@@ -1,5 +1,7 @@
 from progress_bar import ProgressPercentage
 from upload_data import UploadData
+from profiling import enable_from_argv, span
+import os
 import sys
 
 class TransferSrwTar():
@@ -7,27 +9,102 @@ class TransferSrwTar():
     Obtain directories for the datasets on-disk & migrate to SRW cloud storage.
     
     """
-    def __init__(self, object_dir, key_path = None):
+    def __init__(self, object_dir, key_path = None, compression_level = None, transfer_session = None):
         """
         Upload a single data file to cloud w/ an established API configuraton.
 
         Args:
             file_dir (str): Relative directory path of the object (e.g. tar folder) on RDHPCS
-                            to transfer to cloud data storage.
+                            to transfer to cloud data storage. If a directory (e.g. the
+                            'fix' folder), a tar of the directory is built & streamed
+                            straight to cloud w/out writing the tar to disk.
             key_path (str): Establish key for object in cloud. If None, the key
                             of the object will be set to the object's local folder 
                             directory location by default.
+            compression_level (int): If set, the object is compressed w/ zstd at this level
+                                     while streaming to cloud (requires zstandard).
+            transfer_session (TransferSession): Session to reuse across multiple objects. If
+                                                None, a session is created for this object.
         """
         
         # Instantiate SRW uploader
-        uploader_wrapper = UploadData(file_relative_dirs = None, use_bucket = 'srw')
+        # (A session created by the uploader is shut down once the object is uploaded.)
+        with UploadData(file_relative_dirs = None, use_bucket = 'srw', transfer_session = transfer_session) as uploader_wrapper:
         
-        # Migrate object to SRW cloud bucket
-        uploader_wrapper.upload_single_srw_folder(object_dir, key_path)
-   
+            # Migrate object to SRW cloud bucket
+            if os.path.isdir(object_dir):
+                self.stream_folder_as_tar(uploader_wrapper, object_dir, key_path)
+            elif compression_level is None:
+                uploader_wrapper.upload_single_srw_folder(object_dir, key_path)
+            else:
+                uploader_wrapper.upload_single_srw_folder_zstd(object_dir, key_path, level=compression_level)
+
+    def stream_folder_as_tar(self, uploader_wrapper, folder_dir, key_path = None):
+        """
+        Stream a tar of an on-prem folder to SRW cloud storage & save its member index.
+
+        Args:
+            uploader_wrapper (UploadData): SRW uploader.
+            folder_dir (str): Directory path of the folder (e.g. fix) on RDHPCS.
+            key_path (str): Establish key for the tar object in cloud. If None, set to
+                            the folder's name suffixed w/ '.tar'.
+
+        Return (dict): Member index of the tar object.
+
+        """
+        folder_dir = os.path.abspath(folder_dir)
+        if key_path == None:
+            key_path = os.path.basename(folder_dir) + '.tar'
+
+        # All data files w/in the folder.
+        file_dirs = []
+        for root_dir, subfolders, filenames in os.walk(folder_dir, followlinks=True):
+            for file in filenames:
+                file_dirs.append(os.path.join(root_dir, file))
+
+        return uploader_wrapper.upload_tar_stream(file_dirs,
+                                                  os.path.dirname(folder_dir),
+                                                  key_path,
+                                                  index_path=os.path.basename(key_path) + '.index.json')
+
+
+def stream_srw_datasets(srw_data, datasets = ('fix', 'input_model_data'), transfer_session = None):
+    """
+    Stream the fix & input model data files discovered by GetSrwData to SRW cloud storage as
+    tars, w/out re-walking the folders -- the avoid folders filtered out by GetSrwData are
+    left out of the tars.
+
+    Args:
+        srw_data (GetSrwData): Scanned SRW datasets (fix_file_dirs & ma_file_dirs).
+        datasets (tuple): Datasets to stream: 'fix' and/or 'input_model_data'. Each is
+                          uploaded as '<dataset>.tar' w/ its members named relative to the
+                          SRW data root (e.g. 'fix/fix_am/...').
+        transfer_session (TransferSession): Session to reuse across the tars. If None, a
+                                            session is created for them.
+
+    Return (dict): Key of each tar object mapped to its member index.
+
+    """
+    views = {'fix': srw_data.fix_file_dirs, 'input_model_data': srw_data.ma_file_dirs}
+    indexes = {}
+    with UploadData(file_relative_dirs = None, use_bucket = 'srw', transfer_session = transfer_session) as uploader_wrapper:
+        for dataset in datasets:
+            key_path = dataset + '.tar'
+            indexes[key_path] = uploader_wrapper.upload_tar_stream(views[dataset],
+                                                                   srw_data.srw_data_root,
+                                                                   key_path,
+                                                                   index_path=key_path + '.index.json')
+
+    return indexes
+
 if __name__ == '__main__':
     
     # Migrate object to SRW cloud bucket
-    TransferSrwTar(sys.argv[1], sys.argv[2])
+    # Optional '--profile[=spans,cprofile,tracemalloc]' prints a phase summary at the end of the run.
+    argv = enable_from_argv(sys.argv)
+    
+    # Optional 3rd argument: zstd compression level.
+    with span('TransferSrwTar'):
+        TransferSrwTar(argv[1], argv[2], int(argv[3]) if len(argv) > 3 else None)
     
 
@@ -1,13 +1,25 @@
 # Create S3 resource to connect to S3 via SDK
-import boto3
 from boto3.s3.transfer import TransferConfig
 import botocore
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
 from pathlib import Path
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import os
+import threading
 import time
-from progress_bar import ProgressPercentage
+from progress_bar import ProgressPercentage, ProgressReader
+from part_reader import DEFAULT_MEMORY_BUDGET, MmapPartReader, open_mmap
+from tar_stream import TarStreamUploader
+from transfer_session import TransferSession
+from profiling import profiled, span
+from tar_index import PendingTarIndex, is_plain_tar, publish_index
+from retry_queue import RetryQueue, UploadManifest, load_manifest
+from fan_out import FanOutUpload
+
+# Optional dependency for compressing the SRW tar objects while streaming.
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 
 class UploadData():
@@ -15,7 +27,12 @@ class UploadData():
     Upload datasets of interest to cloud data storage.
     
     """
-    def __init__(self, file_relative_dirs, use_bucket):
+    # Cloud data storage bucket & AWS credentials profile per 'use_bucket' option.
+    BUCKETS = {'rt': ('noaa-ufs-regtests-pds', 'default'),
+               'srw': ('noaa-ufs-srw-pds', 'srw-app'),
+               'mrw': ('noaa-ufs-mrw-pds', 'mrw-app')}
+    
+    def __init__(self, file_relative_dirs, use_bucket, checksum_pool=None, memory_budget=None, transfer_session=None):
         """
         Args: 
             file_relative_dirs (list): List of relative directory paths on-prem to obtain 
@@ -25,7 +42,19 @@ class UploadData():
                               'srw' datasets will be uploaded to the cloud data
                               storage bucket designated for the UFS SRW datasets.If set to 
                               'mrw' datasets will be uploaded to the cloud data
-                              storage bucket designated for the UFS MRW datasets.
+                              storage bucket designated for the UFS MRW datasets. Any other value raises a ValueError.
+            checksum_pool (ChecksumPool): If set, the ETag of each uploaded object is computed
+                                          within this process pool while the upload is in flight
+                                          & verified against the ETag reported by cloud data storage.
+            memory_budget (MemoryBudget): Cap on the multipart part bytes in flight, shared by
+                                          all concurrent memory-mapped uploads. If None, the
+                                          process-wide budget (the default max_concurrency x
+                                          multipart_chunksize) shared by all uploaders is used.
+            transfer_session (TransferSession): Long-lived session (client, connection pool &
+                                                TransferManager) to share w/ other uploaders of
+                                                the same credentials profile. If None, the
+                                                uploader creates its own session, reused for
+                                                all of its uploads.
                               
         """
         
@@ -38,20 +67,50 @@ class UploadData():
         # TODO: Setup of UFS RT datasets deviates from the way the SRW and MRW are currently 
         # handled and structured by NOAA. May remove the 'use_bucket' argument of 'rt' & keep 
         # script made specially for the UFS-WM RT dataset uploadinh. TBD.
-        if use_bucket == 'rt':
-            self.bucket_name = 'noaa-ufs-regtests-pds'
-            self.profile_name = 'default'
-        elif use_bucket == 'srw':
-            self.bucket_name = 'noaa-ufs-srw-pds'
-            self.profile_name = 'srw-app'
-        elif use_bucket == 'mrw':
-            self.bucket_name = 'noaa-ufs-mrw-pds'
-            self.profile_name = 'mrw-app'
-        else:
-            print(f"{use_bucket} Bucket Does Not Exist.")
+        if use_bucket not in self.BUCKETS:
+            raise ValueError(f"{use_bucket} Bucket Does Not Exist (expected one of {', '.join(self.BUCKETS)}).")
+        self.bucket_name, self.profile_name = self.BUCKETS[use_bucket]
             
-        self.s3 = boto3.Session(profile_name=self.profile_name).resource('s3')
+        # Shared client, connection pool & TransferManager for all uploads of the batch. A
+        # session created here is owned (& shut down by close) by this uploader.
+        self.owns_session = transfer_session is None or transfer_session.profile_name != self.profile_name
+        if self.owns_session:
+            transfer_session = TransferSession(self.profile_name)
+        self.transfer_session = transfer_session
+        self.s3 = transfer_session.s3
+
+        # Process pool for the CPU-bound checksums (kept separate from the I/O-bound transfer threads).
+        self.checksum_pool = checksum_pool
+
+        # Cap on the part buffers in flight across the memory-mapped uploads (of all uploaders
+        # of the process, unless a budget is given).
+        self.memory_budget = memory_budget or DEFAULT_MEMORY_BUDGET
+
+    def close(self):
+        """
+        Shut down the transfer session if it was created by this uploader (a session passed
+        in is left to its owner).
+
+        Args:
+            None
+
+        Return: None
+
+        """
+        if self.owns_session:
+            self.transfer_session.close()
 
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.owns_session:
+            self.transfer_session.__exit__(exc_type, exc_value, traceback)
+        return False
+
+    @profiled()
     def upload_single_file(self, file_dir, key_path = None):
         """
         Upload a single data file to cloud w/ an established API configuraton.
@@ -65,8 +124,10 @@ class UploadData():
             
         Return: None
         
-        The AWS SDK uploader will manage data file retries and handle multipart as well as 
-        non-multipart data transfers. To retain the current dataset
+        The AWS SDK uploader will manage data file retries and handle non-multipart data
+        transfers. Data files at or above the multipart threshold are uploaded as memory-mapped
+        multipart uploads (see upload_file_mmap), whose parts in flight are capped by the
+        shared memory budget. To retain the current dataset
         directory paths established on the RDPHPCS, Orion, each key of a data 
         file object will be set to their source directory path as designated on Orion. 
         Reason: Configured as sch to avoid altering too many variables within the 
@@ -83,25 +144,29 @@ class UploadData():
 
         """
 
-        # Configuration for multipart upload.
-        KB, MB, GB = 1024, 1024**2, 1024**3
-
+        # Configuration for multipart upload (shared by the session's TransferManager).
         start_time = time.time()
-        config = TransferConfig(multipart_threshold=100*MB,
-                                max_concurrency=10,
-                                multipart_chunksize=50000*KB,
-                                num_download_attempts=2,
-                                use_threads=True)
+        config = self.transfer_session.config
         
         # Upload file w/out extra arguments.
         # Track multi-part upload progress current percentage, total, remaining size, etc
         if key_path == None:
             key_path = file_dir
-        self.s3.meta.client.upload_file(self.work_dir + file_dir,
-                                   self.bucket_name,
-                                   key_path,
-                                   Config=config,
-                                   Callback=ProgressPercentage(self.work_dir + file_dir))
+
+        # Multipart uploads are served from a memory map w/in the shared memory budget.
+        if os.path.getsize(self.work_dir + file_dir) >= config.multipart_threshold:
+            with span('UploadData.transfer'):
+                self.upload_file_mmap(self.work_dir + file_dir, key_path,
+                                      part_size=config.multipart_chunksize,
+                                      max_concurrency=config.max_concurrency)
+        else:
+            expected_etag = self.submit_expected_etag(self.work_dir + file_dir, config)
+            with span('UploadData.transfer'):
+                self.transfer_session.upload(self.work_dir + file_dir,
+                                             self.bucket_name,
+                                             key_path,
+                                             callback=ProgressPercentage(self.work_dir + file_dir)).result()
+            self.verify_etag(key_path, expected_etag)
         
         # Upload file w/ extra arguments.
         #self.s3.meta.client.upload_file(self.work_dir + file_dir,
@@ -119,7 +184,8 @@ class UploadData():
 
         return 
 
-    def upload_single_srw_folder(self, file_dir, key_path = None):
+    @profiled()
+    def upload_single_srw_folder(self, file_dir, key_path = None, index_members = True):
         """
         Upload a single data file to cloud w/ an established API configuraton.
 
@@ -129,11 +195,17 @@ class UploadData():
             key_path (str): Establish key for object in cloud. If None, the key
                             of the object will be set to the object's local folder 
                             directory location by default.
+            index_members (bool): If True & the object is an uncompressed tar, a sidecar
+                                  index object (key suffixed w/ '.index.json') mapping each
+                                  member to its byte range, size & MD5 is also published.
+                                  The MD5s are computed alongside the upload.
             
         Return: None
         
-        The AWS SDK uploader will manage data file retries and handle multipart as well as 
-        non-multipart data transfers. To retain the current dataset
+        The AWS SDK uploader will manage data file retries and handle non-multipart data
+        transfers. Data files at or above the multipart threshold are uploaded as memory-mapped
+        multipart uploads (see upload_file_mmap), whose parts in flight are capped by the
+        shared memory budget. To retain the current dataset
         directory paths established on the RDPHPCS, Orion, each key of a data 
         file object will be set to their source directory path as designated on Orion. 
         Reason: Configured as sch to avoid altering too many variables within the 
@@ -150,25 +222,43 @@ class UploadData():
 
         """
 
-        # Configuration for multipart upload.
-        KB, MB, GB = 1024, 1024**2, 1024**3
-
+        # Configuration for multipart upload (shared by the session's TransferManager).
         start_time = time.time()
-        config = TransferConfig(multipart_threshold=100*MB,
-                                max_concurrency=10,
-                                multipart_chunksize=50000*KB,
-                                num_download_attempts=2,
-                                use_threads=True)
+        config = self.transfer_session.config
         
         # Upload file w/out extra arguments.
         # Track multi-part upload progress current percentage, total, remaining size, etc
         if key_path == None:
             key_path = file_dir
-        self.s3.meta.client.upload_file(file_dir,
-                                   self.bucket_name,
-                                   key_path,
-                                   Config=config,
-                                   Callback=ProgressPercentage(file_dir))
+        multipart = os.path.getsize(file_dir) >= config.multipart_threshold
+        expected_etag = None if multipart else self.submit_expected_etag(file_dir, config)
+
+        # Hash the tar's members (w/in the checksum pool, or else a couple of threads) while
+        # the tar is uploaded from its file, so the upload still reads its parts lazily.
+        pending_index, executor = None, None
+        if index_members and is_plain_tar(file_dir):
+            executor = self.checksum_pool.executor if self.checksum_pool is not None else ThreadPoolExecutor(max_workers=2)
+            pending_index = PendingTarIndex(file_dir, key_path, executor)
+        try:
+            with span('UploadData.transfer'):
+                if multipart:
+                    self.upload_file_mmap(file_dir, key_path,
+                                          part_size=config.multipart_chunksize,
+                                          max_concurrency=config.max_concurrency)
+                else:
+                    self.transfer_session.upload(file_dir,
+                                                 self.bucket_name,
+                                                 key_path,
+                                                 callback=ProgressPercentage(file_dir)).result()
+            self.verify_etag(key_path, expected_etag)
+
+            # Publish the tar's member index so single members may be fetched by byte range.
+            if pending_index is not None:
+                with span('UploadData.tar_index'):
+                    publish_index(self.s3.meta.client, self.bucket_name, key_path, pending_index.result())
+        finally:
+            if executor is not None and self.checksum_pool is None:
+                executor.shutdown(cancel_futures=True)
         
         # Upload file w/ extra arguments.
         #self.s3.meta.client.upload_file(file_dir,
@@ -186,14 +276,308 @@ class UploadData():
 
         return 
     
-    def upload_files2cloud(self):
+    @profiled()
+    def upload_single_srw_folder_zstd(self, file_dir, key_path = None, level = 3, threads = -1):
+        """
+        Upload a single object (e.g. tar folder) to cloud while compressing it w/ zstd.
+
+        Args:
+            file_dir (str): Relative directory path of the object (e.g. tar folder) on RDHPCS
+                            to transfer to cloud data storage.
+            key_path (str): Establish key for object in cloud. If None, the key of the
+                            object will be set to the object's local folder directory
+                            location suffixed w/ '.zst'.
+            level (int): zstd compression level (1-22). Higher levels trade throughput
+                         for a better compression ratio.
+            threads (int): Number of zstd compression threads. If -1, set to the number
+                           of CPUs.
+
+        Return (dict): Original & compressed size of the object in bytes.
+
+        The object is compressed by multi-threaded zstd as it is read & the compressed stream
+        is fed straight into the multipart upload parts -- no temporary compressed file is
+        written to disk. The object's Content-Encoding is set to 'zstd' & its original size is
+        recorded w/in the 'original-size' metadata so consumers may decompress on the fly.
+
+        """
+        if zstandard is None:
+            raise ImportError("zstandard is required for compressed uploads: pip install zstandard")
+
+        start_time = time.time()
+        if key_path == None:
+            key_path = file_dir + '.zst'
+        original_size = os.path.getsize(file_dir)
+        compressor = zstandard.ZstdCompressor(level=level, threads=threads, write_checksum=True)
+
+        # Track upload progress against the uncompressed bytes read from the object.
+        with open(file_dir, 'rb') as f:
+            source = ProgressReader(f, ProgressPercentage(file_dir))
+            with compressor.stream_reader(source, size=original_size, closefd=False) as reader:
+                self.transfer_session.upload(reader,
+                                             self.bucket_name,
+                                             key_path,
+                                             extra_args={'ContentEncoding': 'zstd',
+                                                         'Metadata': {'original-size': str(original_size)}}).result()
+
+        end_time = time.time()
+        compressed_size = self.s3.meta.client.head_object(Bucket=self.bucket_name, Key=key_path)['ContentLength']
+
+        # Processing time & compression ratio.
+        delta = (end_time-start_time)/60
+        print(f'\nCompression Ratio: {original_size / max(compressed_size, 1):.2f} '
+              f'({original_size} -> {compressed_size} bytes)')
+        print(f'Processing Time (min): {delta}\n')
+
+        return {'original_size': original_size, 'compressed_size': compressed_size}
+
+    def upload_single_file_mmap(self, file_dir, key_path = None, part_size = 50000*1024, max_concurrency = 10):
+        """
+        Upload a single data file to cloud as a multipart upload whose part bodies are
+        served as zero-copy slices of a memory map of the data file.
+
+        Args:
+            file_dir (str): Relative directory path of the data file on RDHPCS to
+                            transfer to cloud data storage.
+            key_path (str): Establish key for object in cloud. If None, the key of the
+                            object will be set to the object's local file directory
+                            location by default.
+            part_size (int): Partition size of each part in bytes.
+            max_concurrency (int): Maximum number of threads uploading parts.
+
+        Return: None
+
+        See upload_file_mmap.
+
+        """
+        if key_path == None:
+            key_path = file_dir
+
+        return self.upload_file_mmap(self.work_dir + file_dir, key_path, part_size, max_concurrency)
+
+    @profiled()
+    def upload_file_mmap(self, file_path, key_path, part_size = 50000*1024, max_concurrency = 10):
+        """
+        Upload a data file to cloud as a multipart upload whose part bodies are served as
+        zero-copy slices of a memory map of the data file. Used by upload_single_file &
+        upload_single_srw_folder for the data files at or above the multipart threshold.
+
+        Args:
+            file_path (str): Data file's full directory path (incl. filename).
+            key_path (str): Key of the object in cloud.
+            part_size (int): Partition size of each part in bytes.
+            max_concurrency (int): Maximum number of threads uploading parts.
+
+        Return: None
+
+        The bytes of parts in flight are bounded by the memory budget shared across all
+        concurrent uploads -- a part is not submitted until the budget has room for it.
+        Once a part is uploaded, its pages are dropped from the resident set. On failure
+        the multipart upload is aborted so no orphaned parts are billed.
+
+        If a checksum pool has been set, the MD5 of each part is computed by the pool &
+        sent as the part's Content-MD5, so cloud data storage rejects a part corrupted in
+        transit. The ETag returned on completion is then checked against the one expected
+        from the part digests (w/out a further request).
+
+        """
+        start_time = time.time()
+        file_size = os.path.getsize(file_path)
+        client = self.s3.meta.client
+        progress = ProgressPercentage(file_path)
+        expected_etag = None
+        if self.checksum_pool is not None:
+            expected_etag = self.checksum_pool.submit_etag(file_path, part_size + 1, part_size)
+
+        def content_md5(part_index):
+            if expected_etag is None:
+                return {}
+            return {'ContentMD5': expected_etag.content_md5(part_index)}
+
+        # Single part upload for data files below the part size.
+        mm = open_mmap(file_path)
+        if file_size <= part_size:
+            body = MmapPartReader(mm, 0, file_size, progress) if mm is not None else b''
+            self.memory_budget.acquire(file_size)
+            try:
+                response = client.put_object(Bucket=self.bucket_name, Key=key_path, Body=body,
+                                             ContentLength=file_size, **content_md5(0))
+            finally:
+                if mm is not None:
+                    body.close()
+                    mm.close()
+                self.memory_budget.release(file_size)
+            self.check_etag(key_path, expected_etag, response['ETag'])
+            print(f'\nProcessing Time (min): {(time.time()-start_time)/60}\n')
+            return
+
+        failed = threading.Event()
+
+        def upload_part(part_number, offset, length):
+            body = MmapPartReader(mm, offset, length, progress)
+            try:
+                response = client.upload_part(Bucket=self.bucket_name, Key=key_path, UploadId=upload_id,
+                                              PartNumber=part_number, Body=body, ContentLength=length,
+                                              **content_md5(part_number - 1))
+            except BaseException:
+                failed.set()
+                raise
+            finally:
+                body.close()
+                self.memory_budget.release(length)
+
+            return {'ETag': response['ETag'], 'PartNumber': part_number}
+
+        upload_id = client.create_multipart_upload(Bucket=self.bucket_name, Key=key_path)['UploadId']
+        try:
+            with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                futures = []
+                for part_number, offset in enumerate(range(0, file_size, part_size), start=1):
+
+                    # Stop submitting parts once one has failed.
+                    if failed.is_set():
+                        break
+                    length = min(part_size, file_size - offset)
+                    self.memory_budget.acquire(length)
+                    futures.append(executor.submit(upload_part, part_number, offset, length))
+                parts = [future.result() for future in futures]
+            response = client.complete_multipart_upload(Bucket=self.bucket_name, Key=key_path, UploadId=upload_id,
+                                                        MultipartUpload={'Parts': parts})
+        except BaseException:
+            client.abort_multipart_upload(Bucket=self.bucket_name, Key=key_path, UploadId=upload_id)
+            raise
+        finally:
+            mm.close()
+        self.check_etag(key_path, expected_etag, response['ETag'])
+
+        # Processing time to upload file.
+        delta = (time.time()-start_time)/60
+        print(f'\nPeak Part Memory In Flight (MB): {self.memory_budget.peak / 1024**2:.1f}')
+        print(f'Processing Time (min): {delta}\n')
+
+        return
+
+    @profiled()
+    def upload_tar_stream(self, file_dirs, base_dir, key_path, index_path = None, read_workers = 8, index_members = True):
+        """
+        Build a tar of data files on-prem & stream it straight into cloud as a single object
+        w/out writing a tar to disk.
+
+        Args:
+            file_dirs (list): Data files' directory paths to include in the tar (e.g. the
+                              fix or input model data files discovered by GetSrwData).
+            base_dir (str): Directory the member names are relative to (e.g. the 'develop'
+                            folder so members are named 'fix/fix_am/...').
+            key_path (str): Establish key for the tar object in cloud.
+            index_path (str): If set, the member index of the tar (byte range, size & MD5 of
+                              each member) is written to this JSON file.
+            read_workers (int): Number of threads reading the data files in parallel.
+            index_members (bool): If True, the member index is also published as a sidecar
+                                  index object (key suffixed w/ '.index.json').
+
+        Return (dict): Member index of the tar object.
+
+        """
+        tar_uploader = TarStreamUploader(self.s3.meta.client,
+                                         self.bucket_name,
+                                         part_size=50000*1024,
+                                         max_concurrency=10,
+                                         read_workers=read_workers,
+                                         memory_budget=self.memory_budget)
+
+        index = tar_uploader.upload(file_dirs, base_dir, key_path, index_path=index_path)
+        if index_members:
+            publish_index(self.s3.meta.client, self.bucket_name, key_path, index)
+
+        return index
+
+    def submit_expected_etag(self, file_path, config):
+        """
+        Submit the computation of the ETag expected for a data file to the checksum pool,
+        to run alongside the upload.
+
+        Args:
+            file_path (str): Data file's full directory path (incl. filename).
+            config (TransferConfig): Configuration of the upload -- its multipart threshold &
+                                     chunksize determine the part boundaries.
+
+        Return (ExpectedETag): Handle resolving to the expected ETag. None if no checksum pool
+        has been set.
+
+        """
+        if self.checksum_pool is None:
+            return None
+
+        return self.checksum_pool.submit_etag(file_path,
+                                              config.multipart_threshold,
+                                              config.multipart_chunksize)
+
+    @profiled()
+    def verify_etag(self, key_path, expected_etag):
+        """
+        Compare the ETag of an uploaded object against the ETag computed from its local file.
+
+        Args:
+            key_path (str): Key of the uploaded object.
+            expected_etag (ExpectedETag): Handle returned by submit_expected_etag. If None,
+                                          verification is skipped.
+
+        Return: None
+
+        """
+        if expected_etag is None:
+            return
+        remote_etag = self.s3.meta.client.head_object(Bucket=self.bucket_name, Key=key_path)['ETag']
+        self.check_etag(key_path, expected_etag, remote_etag)
+
+        return
+
+    def check_etag(self, key_path, expected_etag, remote_etag):
+        """
+        Args:
+            key_path (str): Key of the uploaded object.
+            expected_etag (ExpectedETag): Handle returned by submit_expected_etag. If None,
+                                          the check is skipped.
+            remote_etag (str): ETag returned by cloud data storage for the object.
+
+        Return: None
+
+        """
+        if expected_etag is None:
+            return
+        local_etag = expected_etag.result()
+        remote_etag = remote_etag.strip('"')
+        if local_etag != remote_etag:
+            raise RuntimeError(f"ETag mismatch for {key_path}: local {local_etag}, cloud {remote_etag}")
+        print(f"\nVerified ETag: {remote_etag}")
+
+        return
+
+    @profiled()
+    def upload_files2cloud(self, failure_manifest='upload_failures.json', max_attempts=5, max_in_flight=None):
         """
         Iterates through the list of data files' relative directory paths on-prem. 
 
         Args:
-            None
+            failure_manifest (str): JSON file to which the uploaded & failed data files are
+                                    written at the end of the batch (or on interruption).
+                                    Each outcome is first appended to a '.jsonl' journal
+                                    beside it. May be consumed by replay_failures
+                                    (i.e. '--replay').
+            max_attempts (int): Maximum number of attempts per data file.
+            max_in_flight (int): Maximum number of data files uploading at once. If None, set
+                                 to the max_concurrency of the transfer session.
             
-        Return: None
+        Return (dict): Number of data files uploaded & failed.
+        
+        The data files are submitted concurrently (up to max_in_flight at a time) through the
+        shared transfer session, so the per-request latency of the small data files overlaps
+        rather than adding up. The multipart uploads of the large data files remain capped by
+        the shared memory budget.
+
+        A failed data file does not stop the batch. Transient errors (e.g. timeouts, throttling,
+        5xx responses) are deferred to a retry queue w/ jittered exponential backoff while the
+        remaining data files continue uploading. Permanent errors & data files out of attempts
+        are recorded w/in the failure manifest.
         
         *Note: For UFS-WM RT will be keeping 'INPUTDATA_ROOT_WW3' as a key within
         the mapped dictionary -- in case, the NOAA development team decides 
@@ -202,12 +586,266 @@ class UploadData():
         related data files.
         
         """
-        for dataset_type, ts_files in self.file_relative_dirs.items():
-            for file_dir in ts_files:
-                self.upload_single_file(file_dir, None)
-                
-        return 
-    
+        if max_in_flight is None:
+            max_in_flight = self.transfer_session.config.max_concurrency
+        retry_queue = RetryQueue(max_attempts=max_attempts)
+        manifest = UploadManifest(failure_manifest, self.bucket_name, work=self.file_relative_dirs)
+        executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        in_flight = {}
+
+        def submit(item, attempts):
+            in_flight[executor.submit(self.upload_single_file, item[1], None)] = (item, attempts)
+
+        def record(future):
+            # Outcomes are recorded by the submitting thread only, so the manifest & retry
+            # queue need no locking.
+            (dataset_type, file_dir), attempts = in_flight.pop(future)
+            e = future.exception()
+            if e is None:
+                manifest.record_uploaded(file_dir)
+            elif not isinstance(e, Exception):
+                raise e
+            elif retry_queue.defer((dataset_type, file_dir), attempts, e):
+                print(f"\nUpload of {file_dir} failed (attempt {attempts}), retry deferred: {e}")
+            else:
+                print(f"\nUpload of {file_dir} failed (attempt {attempts}): {e}")
+                manifest.record_failed({'dataset_type': dataset_type, 'file_dir': file_dir,
+                                        'attempts': attempts, 'error': f"{type(e).__name__}: {e}"})
+
+        complete = False
+        try:
+            # Retries are interleaved w/ the remaining data files once their backoff elapses.
+            work = ((dataset_type, file_dir) for dataset_type, ts_files in self.file_relative_dirs.items()
+                    for file_dir in ts_files)
+            work_left = True
+            while True:
+                while len(in_flight) < max_in_flight:
+                    due = retry_queue.pop_due()
+                    if due is not None:
+                        submit(due[0], due[1] + 1)
+                        continue
+                    item = next(work, None) if work_left else None
+                    if item is None:
+                        work_left = False
+                        break
+                    submit(item, 1)
+
+                if not in_flight:
+                    # Drain the remaining retries.
+                    pending = retry_queue.pop_next()
+                    if pending is None:
+                        break
+                    submit(pending[0], pending[1] + 1)
+                    continue
+                done, _ = wait(in_flight, timeout=retry_queue.next_delay(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    record(future)
+            complete = True
+        finally:
+            # Record the uploads which finished while the batch was interrupted.
+            executor.shutdown(wait=True, cancel_futures=True)
+            for future, ((dataset_type, file_dir), attempts) in list(in_flight.items()):
+                if not future.cancelled() and future.exception() is None:
+                    manifest.record_uploaded(file_dir)
+
+            # Record the outcome of the batch, incl. the retries cut short by an interruption.
+            for (dataset_type, file_dir), attempts in retry_queue.pending():
+                manifest.record_failed({'dataset_type': dataset_type, 'file_dir': file_dir,
+                                        'attempts': attempts, 'error': 'interrupted before retry'})
+            manifest.close(complete=complete)
+            print("\033[1m" + f"\nUploaded: {len(manifest.uploaded)}, Failed: {len(manifest.failed)}" + "\033[0m" +
+                  f" (manifest: {failure_manifest})")
+
+        return {'uploaded': len(manifest.uploaded), 'failed': len(manifest.failed)}
+
+    @profiled()
+    def upload_files2buckets(self, use_buckets, mode='auto', report_path='fan_out_report.json'):
+        """
+        Upload the data files to this uploader's bucket & to other buckets, reading each
+        data file (or part) from disk only once.
+
+        Args:
+            use_buckets (list): Other buckets of interest (e.g. ['mrw']). See 'use_bucket'.
+            mode (str): 'broadcast' to send the same buffers to all buckets concurrently,
+                        'copy' to make server-side copies after the upload to this bucket, or
+                        'auto' to broadcast the small data files & copy the large ones.
+            report_path (str): JSON file to which the per-bucket report is written.
+
+        Return (dict): Bucket name mapped to its uploaded, copied & failed data files, the
+        bytes sent over the on-prem link & the seconds spent.
+
+        """
+        uploaders = [self]
+        for use_bucket in use_buckets:
+            if self.BUCKETS[use_bucket][0] != self.bucket_name:
+                uploaders.append(UploadData(self.file_relative_dirs, use_bucket,
+                                            memory_budget=self.memory_budget,
+                                            transfer_session=self.transfer_session))
+        fan_out = FanOutUpload(uploaders, mode=mode)
+        try:
+            return fan_out.upload_files(self.file_relative_dirs, report_path=report_path)
+        finally:
+            fan_out.close()
+            for uploader in uploaders[1:]:
+                uploader.close()
+
+    def replay_failures(self, failure_manifest, new_manifest='upload_failures_replay.json', allow_incomplete=False):
+        """
+        Re-upload the data files recorded as failed w/in a failure manifest, along w/ the data
+        files of an interrupted batch which were never attempted (or still in flight).
+
+        Args:
+            failure_manifest (str): Failure manifest written by upload_files2cloud.
+            new_manifest (str): Failure manifest to write for the replay.
+            allow_incomplete (bool): If True, an interrupted batch whose manifest does not
+                                     record its pending data files (i.e. written before the
+                                     work list was journaled) is replayed from its failures
+                                     only. Otherwise such a manifest is refused.
+
+        Return (dict): Number of data files uploaded & failed.
+
+        The data files are uploaded to the bucket recorded w/in the manifest, whichever
+        bucket this uploader was created for.
+
+        """
+        manifest = load_manifest(failure_manifest)
+        if not manifest['complete'] and 'pending' not in manifest and not allow_incomplete:
+            raise ValueError(f"{failure_manifest} is from an interrupted batch & does not record the data files "
+                             f"never attempted; re-run the batch or replay its failures only w/ allow_incomplete.")
+        replay = manifest['failed'] + manifest.get('pending', [])
+        replay_dirs = {}
+        for entry in replay:
+            replay_dirs.setdefault(entry['dataset_type'], []).append(entry['file_dir'])
+        print(f"Replaying {len(manifest['failed'])} failed & {len(manifest.get('pending', []))} pending uploads "
+              f"from {failure_manifest} to {manifest['bucket']}")
+
+        # Upload to the manifest's bucket.
+        uploader = self
+        if manifest['bucket'] != self.bucket_name:
+            use_bucket = next((use_bucket for use_bucket, (bucket_name, _) in self.BUCKETS.items()
+                               if bucket_name == manifest['bucket']), None)
+            if use_bucket is None:
+                raise ValueError(f"{failure_manifest} records the unknown bucket {manifest['bucket']}.")
+            uploader = UploadData(replay_dirs, use_bucket, checksum_pool=self.checksum_pool,
+                                  memory_budget=self.memory_budget, transfer_session=self.transfer_session)
+            uploader.work_dir = self.work_dir
+        uploader.file_relative_dirs = replay_dirs
+        try:
+            return uploader.upload_files2cloud(failure_manifest=new_manifest)
+        finally:
+            if uploader is not self:
+                uploader.close()
+
+    @profiled()
+    def upload_files_from_queue(self, work_queue, worker_id, batch_size=50):
+        """
+        Claim batches of data files from a shared work queue & upload them until the
+        queue is drained. Multiple workers (e.g. Slurm array tasks on separate nodes) may
+        drain the same queue concurrently.
+
+        Args:
+            work_queue (UploadWorkQueue): Work queue populated by the coordinator.
+            worker_id (str): Unique name of this worker.
+            batch_size (int): Number of items to claim per batch.
+
+        Return (dict): Number of items uploaded, skipped (already in cloud), failed & lost
+        to an expired lease by this worker.
+
+        The lease of a claimed batch is renewed in the background while its items are
+        being uploaded. Each item is recorded as completed only after its upload succeeds,
+        so items held by a worker that dies are reclaimed & uploaded by another worker. A
+        reclaimed item already in cloud is not uploaded again, but two workers may still both
+        upload an item whose lease expired mid-upload (delivery is at-least-once).
+
+        """
+        n_done, n_skipped, n_failed, n_lost = 0, 0, 0, 0
+        while True:
+            batch = work_queue.claim_batch(worker_id, batch_size)
+            if not batch:
+                break
+            print(f"\nWorker {worker_id} claimed {len(batch)} items.")
+
+            with work_queue.heartbeat(batch[0]['claim_token']):
+                for item in batch:
+                    try:
+                        # A reclaimed item may have landed before its previous worker lost the lease.
+                        if item['attempts'] > 1 and self.is_uploaded(item['file_dir'], item['key_path'], item['mode']):
+                            print(f"\n{item['key_path']} already in cloud, skipping reclaimed item.")
+                            skipped = True
+                        elif item['mode'] == 'folder':
+                            self.upload_single_srw_folder(item['file_dir'], item['key_path'])
+                            skipped = False
+                        else:
+                            self.upload_single_file(item['file_dir'], item['key_path'])
+                            skipped = False
+                    except Exception as e:
+                        print(f"\nUpload of {item['file_dir']} failed: {e}")
+                        if work_queue.mark_failed(item['item_id'], item['claim_token'], e):
+                            n_failed += 1
+                        else:
+                            print(f"\nLease on {item['file_dir']} expired before its failure was recorded.")
+                            n_lost += 1
+                        continue
+                    if not work_queue.mark_done(item['item_id'], item['claim_token']):
+                        print(f"\nLease on {item['file_dir']} expired before completion was recorded.")
+                        n_lost += 1
+                    elif skipped:
+                        n_skipped += 1
+                    else:
+                        n_done += 1
+        print(f"\nWorker {worker_id} finished: {n_done} uploaded, {n_skipped} already in cloud, "
+              f"{n_failed} failed, {n_lost} lost to an expired lease.")
+
+        return {'uploaded': n_done, 'skipped': n_skipped, 'failed': n_failed, 'lease_lost': n_lost}
+
+    def is_uploaded(self, file_dir, key_path, mode='file'):
+        """
+        Check whether a data file is already in cloud w/ the size (& ETag, if a checksum pool
+        has been set) of its on-prem copy.
+
+        Args:
+            file_dir (str): Relative directory path of the data file on-prem (or the path of
+                            the object if mode is 'folder').
+            key_path (str): Key of the object in cloud.
+            mode (str): Upload mode of the item ('file' or 'folder'). As w/ the uploads, the
+                        path of a 'file' item is relative to the work directory & the path of
+                        a 'folder' item (e.g. a tar) is used as given.
+
+        Return (bool): True if the object matches the data file.
+
+        """
+        file_path = file_dir if mode == 'folder' else self.work_dir + file_dir
+        try:
+            head = self.s3.meta.client.head_object(Bucket=self.bucket_name, Key=key_path)
+        except botocore.exceptions.ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+        if head['ContentLength'] != os.path.getsize(file_path):
+            return False
+        expected_etag = self.submit_expected_etag(file_path, self.transfer_session.config)
+
+        return expected_etag is None or expected_etag.result() == head['ETag'].strip('"')
+
+    @profiled()
+    def verify_uploads(self, report_path='verify_report.json', mode='auto', max_workers=32):
+        """
+        Verify the data files of this uploader landed in cloud w/ the right size & ETag.
+
+        Args:
+            report_path (str): JSON file to which the verification report is written.
+            mode (str): 'head', 'list' or 'auto' (see VerifyUpload.verify).
+            max_workers (int): Number of concurrent HEAD/LIST requests.
+
+        Return (dict): Report of the ok, missing, mismatched & extra objects. ETags are
+        compared only if a checksum pool has been set.
+
+        """
+        from verify_upload import VerifyUpload
+        verifier = VerifyUpload(self, max_workers=max_workers, checksum_pool=self.checksum_pool)
+
+        return verifier.verify(verifier.expected_from_dicts(self.file_relative_dirs), mode=mode, report_path=report_path)
+
     def multi_part_upload_with_s3_withTuning(self, file_dir, chunk_sz_list):
         """
         Tuning API parameters for uploading a single data file to cloud data storage.
@@ -291,10 +929,13 @@ class UploadData():
             proc_time_list.append(delta)
         
         # Log processing time to upload file and the corespond. set data partition size.
+        # pandas is imported here rather than at module load to keep the scripts' startup fast.
+        import pandas as pd
         time2chunksz_df = pd.DataFrame([chunk_sz_list, proc_time_list], index=['chunk_sz', 'xfer_time']).T
 
         return time2chunksz_df
     
+    @profiled()
     def purge(self, key_path):
         """
         Remove data file object w/ the given key from cloud data storage.
@@ -309,6 +950,7 @@ class UploadData():
 
         return
 
+    @profiled()
     def purge_by_keyprefix(self, key_prefix):
         """
         Remove data file object w/ the given key prefix from cloud data storage.
@@ -329,12 +971,13 @@ class UploadData():
         
         return
     
-    def get_all_s3_keys(self):
+    @profiled()
+    def get_all_s3_keys(self, key_prefix=None):
         """
         Extract all data file object keys w/ from cloud data storage.
         
         Args:
-            None
+            key_prefix (str): If set, only the keys starting w/ this prefix are extracted.
             
         Return (list): List of all objects within the bucket of interest.
 
@@ -342,13 +985,15 @@ class UploadData():
         
         # Instantiate bucket of interest.
         bucket_ob = self.s3.Bucket(self.bucket_name)
+        objects = bucket_ob.objects.all() if key_prefix is None else bucket_ob.objects.filter(Prefix=key_prefix)
         keys = []
-        for obj in bucket_ob.objects.all():
+        for obj in objects:
             keys.append(obj.key)
         keys.sort()    
         
         return keys
     
+    @profiled()
     def rename_s3_keys(self, source_key_path, new_key_path):
         """
         'Rename' an existing object's key.
@@ -0,0 +1,270 @@
+import argparse
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import botocore.exceptions
+
+from checksum_pool import ChecksumPool
+from retry_queue import load_manifest
+
+
+class VerifyUpload():
+    """
+    Verify that the data files on-prem landed in cloud data storage w/ the right size &
+    content, producing a machine-readable report of the missing, mismatched & extra objects.
+
+    """
+
+    def __init__(self, uploader, max_workers=32, checksum_pool=None,
+                 multipart_threshold=100*1024**2, multipart_chunksize=50000*1024):
+        """
+        Args:
+            uploader (UploadData): Uploader of the bucket to verify.
+            max_workers (int): Number of concurrent HEAD/LIST requests.
+            checksum_pool (ChecksumPool): Process pool computing the expected ETags. If None,
+                                          the ETags are not compared (size only).
+            multipart_threshold (int): Multipart threshold the data files were uploaded with.
+            multipart_chunksize (int): Part size the data files were uploaded with.
+
+        """
+        self.uploader = uploader
+        self.client = uploader.s3.meta.client
+        self.bucket_name = uploader.bucket_name
+        self.max_workers = max_workers
+        self.checksum_pool = checksum_pool
+        self.multipart_threshold = multipart_threshold
+        self.multipart_chunksize = multipart_chunksize
+
+    def expected_from_dicts(self, file_relative_dirs):
+        """
+        Establish the expected objects from dictionaries partitioning the data files (e.g.
+        the GetSrwData partitions), keyed as upload_files2cloud keys them.
+
+        Args:
+            file_relative_dirs (dict): Dictionary partitioning the file directories into the
+                                       dataset types.
+
+        Return (dict): Mapping of object key to local data file path.
+
+        """
+        return {file_dir: self.uploader.work_dir + file_dir
+                for ts_files in file_relative_dirs.values() for file_dir in ts_files}
+
+    def expected_from_manifest(self, manifest_path):
+        """
+        Establish the expected objects from the uploaded data files recorded w/in a manifest
+        written by upload_files2cloud.
+
+        Args:
+            manifest_path (str): Path of the manifest.
+
+        Return (dict): Mapping of object key to local data file path.
+
+        """
+        manifest = load_manifest(manifest_path)
+
+        return {file_dir: self.uploader.work_dir + file_dir for file_dir in manifest['uploaded']}
+
+    def head_objects(self, keys, errors):
+        """
+        Obtain the size & ETag of each object w/ concurrent HEAD requests.
+
+        Args:
+            keys (list): Object keys.
+            errors (dict): Object key mapped to the error of its request, for the requests
+                           which failed other than w/ a 404 (e.g. permission denied or
+                           throttling) -- filled in so the remaining keys are still checked.
+
+        Return (dict): Mapping of object key to (size, etag). Missing objects are omitted.
+
+        """
+        def head(key):
+            try:
+                response = self.client.head_object(Bucket=self.bucket_name, Key=key)
+            except botocore.exceptions.ClientError as e:
+                if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                    return key, None
+                errors[key] = str(e)
+                return key, None
+            except botocore.exceptions.BotoCoreError as e:
+                errors[key] = str(e)
+                return key, None
+            return key, (response['ContentLength'], response['ETag'].strip('"'))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = executor.map(head, keys)
+
+            return {key: found for key, found in results if found is not None}
+
+    def list_objects(self, prefixes, errors):
+        """
+        Obtain the size & ETag of every object directly w/in the given key prefixes via the
+        bucket listing (up to 1000 objects per request).
+
+        Args:
+            prefixes (list): Key prefixes ending w/ '/' (or '' for the top of the bucket).
+            errors (dict): Key prefix mapped to the error of its listing, for the listings
+                           which failed -- filled in so the remaining prefixes are still listed.
+
+        Return (dict): Mapping of object key to (size, etag).
+
+        """
+        def list_prefix(prefix):
+            found = {}
+            paginator = self.client.get_paginator('list_objects_v2')
+            try:
+                for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix, Delimiter='/'):
+                    for obj in page.get('Contents', []):
+                        found[obj['Key']] = (obj['Size'], obj['ETag'].strip('"'))
+            except (botocore.exceptions.ClientError, botocore.exceptions.BotoCoreError) as e:
+                errors[prefix] = str(e)
+                return {}
+            return found
+
+        remote = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for found in executor.map(list_prefix, prefixes):
+                remote.update(found)
+
+        return remote
+
+    def listing_requests(self, keys_by_prefix, expected):
+        """
+        Estimate the number of listing requests needed to verify the expected objects. A
+        listing returns every object of a folder, not only the expected ones, so each folder
+        is sized by its on-prem counterpart (the bucket mirrors the on-prem tree).
+
+        Args:
+            keys_by_prefix (dict): Key prefix mapped to its expected object keys.
+            expected (dict): Mapping of object key to local data file path.
+
+        Return (int): Estimated number of listing requests (up to 1000 objects each).
+
+        """
+        requests = 0
+        for keys in keys_by_prefix.values():
+            local_dir = os.path.dirname(expected[keys[0]]) or '.'
+            try:
+                with os.scandir(local_dir) as entries:
+                    n_objects = sum(1 for _ in entries)
+            except OSError:
+                n_objects = 0
+            requests += -(-max(n_objects, len(keys)) // 1000)
+
+        return requests
+
+    def verify(self, expected, mode='auto', report_path='verify_report.json'):
+        """
+        Compare the objects in cloud against the data files on-prem.
+
+        Args:
+            expected (dict): Mapping of object key to local data file path.
+            mode (str): If set to 'head', each object is checked w/ a HEAD request. If set to
+                        'list', the objects are obtained from the bucket listing of their
+                        folders (which also reports extra objects). If set to 'auto', the
+                        listing is used when it requires fewer requests.
+            report_path (str): JSON file to which the report is written.
+
+        Return (dict): Report of the ok, missing, mismatched & extra objects, & of the objects
+        whose request failed (e.g. permission denied), which are left unverified.
+
+        """
+        start_time = time.time()
+        keys_by_prefix = defaultdict(list)
+        for key in expected:
+            keys_by_prefix[key.rsplit('/', 1)[0] + '/' if '/' in key else ''].append(key)
+        if mode == 'auto':
+
+            # A listing request covers up to 1000 objects of a folder; a HEAD request covers one.
+            mode = 'list' if self.listing_requests(keys_by_prefix, expected) < len(expected) / 2 else 'head'
+        print(f"Verifying {len(expected)} objects in {self.bucket_name} via {mode} requests...")
+        errors = {}
+        if mode == 'list':
+            remote = self.list_objects(sorted(keys_by_prefix), errors)
+            errors = {key: errors[prefix] for prefix, keys in keys_by_prefix.items() if prefix in errors for key in keys}
+        else:
+            remote = self.head_objects(sorted(expected), errors)
+
+        # Expected ETags computed in the process pool while the sizes are compared.
+        etags = {}
+        if self.checksum_pool is not None:
+            for key, file_path in expected.items():
+                if key in remote and os.path.exists(file_path) and os.path.getsize(file_path) == remote[key][0]:
+                    etags[key] = self.checksum_pool.submit_etag(file_path, self.multipart_threshold,
+                                                                self.multipart_chunksize)
+
+        report = {'bucket': self.bucket_name, 'mode': mode, 'checked': len(expected), 'ok': [],
+                  'missing': [], 'size_mismatch': [], 'etag_mismatch': [], 'etag_unverified': [],
+                  'missing_local': [], 'extra': [], 'error': []}
+        for key, file_path in sorted(expected.items()):
+            if not os.path.exists(file_path):
+                report['missing_local'].append(key)
+                continue
+            if key in errors:
+                report['error'].append({'key': key, 'error': errors[key]})
+                continue
+            if key not in remote:
+                report['missing'].append(key)
+                continue
+            remote_size, remote_etag = remote[key]
+            local_size = os.path.getsize(file_path)
+            if remote_size != local_size:
+                report['size_mismatch'].append({'key': key, 'local_size': local_size, 'remote_size': remote_size})
+                continue
+            if key not in etags:
+                report['ok'].append(key)
+                continue
+
+            # A multipart ETag w/ a different part count was uploaded w/ another part size.
+            local_etag = etags[key].result()
+            remote_parts = remote_etag.split('-')[1] if '-' in remote_etag else None
+            local_parts = local_etag.split('-')[1] if '-' in local_etag else None
+            if local_etag == remote_etag:
+                report['ok'].append(key)
+            elif remote_parts != local_parts:
+                report['etag_unverified'].append({'key': key, 'local_etag': local_etag, 'remote_etag': remote_etag})
+            else:
+                report['etag_mismatch'].append({'key': key, 'local_etag': local_etag, 'remote_etag': remote_etag})
+
+        # Objects w/in the listed folders which have no data file on-prem.
+        if mode == 'list':
+            report['extra'] = sorted(key for key in remote if key not in expected)
+
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=1)
+        summary = {name: len(value) if isinstance(value, list) else value for name, value in report.items()}
+        print("\033[1m" + "Verification Report:" + "\033[0m" + f"\n{summary}")
+        print(f"Report written to {report_path}. Processing Time (min): {(time.time() - start_time)/60}\n")
+
+        return report
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Verify uploaded SRW data files against cloud data storage.")
+    parser.add_argument('--bucket', default='srw', help="Bucket ('rt', 'srw' or 'mrw').")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--manifest', help="Manifest written by upload_files2cloud.")
+    source.add_argument('--file-list', help="Text file listing one relative data file directory per line.")
+    parser.add_argument('--mode', choices=['auto', 'head', 'list'], default='auto')
+    parser.add_argument('--no-checksums', action='store_true', help="Compare sizes only.")
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--report', default='verify_report.json')
+    args = parser.parse_args()
+
+    from upload_data import UploadData
+    uploader_wrapper = UploadData(file_relative_dirs=None, use_bucket=args.bucket)
+    checksum_pool = None if args.no_checksums else ChecksumPool()
+    verifier = VerifyUpload(uploader_wrapper, max_workers=args.workers, checksum_pool=checksum_pool)
+    if args.manifest is not None:
+        expected = verifier.expected_from_manifest(args.manifest)
+    else:
+        with open(args.file_list) as f:
+            expected = verifier.expected_from_dicts({'file_list': [line.strip() for line in f if line.strip()]})
+    verifier.verify(expected, mode=args.mode, report_path=args.report)
+    if checksum_pool is not None:
+        checksum_pool.shutdown()
+    uploader_wrapper.close()
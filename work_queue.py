@@ -0,0 +1,443 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+
+class UploadWorkQueue():
+    """
+    Shared-filesystem work queue for distributing the SRW uploads across multiple nodes.
+
+    A coordinator populates a SQLite claim table residing on a filesystem visible to all
+    of the workers (e.g. Slurm array tasks). Each worker claims a batch of items under a
+    lease, uploads them & records their completion. Items claimed by a worker whose lease
+    expired (e.g. the worker died or its node was drained) are reclaimed by the next worker
+    requesting a batch.
+
+    """
+
+    def __init__(self, queue_path, lease_secs=1800, max_attempts=3, timeout_secs=600):
+        """
+        Args:
+            queue_path (str): Path of the SQLite claim table on the shared filesystem.
+            lease_secs (int): Seconds a claimed item is reserved for a worker before it is
+                              considered abandoned & becomes claimable again.
+            max_attempts (int): Number of times an item may be claimed before it is marked
+                                as failed.
+            timeout_secs (int): Seconds to wait on the claim table's lock before raising.
+
+        *Note: The SQLite rollback journal is used rather than WAL since, WAL requires shared
+        memory which is not coherent across nodes. The shared filesystem must support POSIX
+        locks (e.g. GPFS or Lustre mounted w/ the 'flock' option).
+
+        """
+
+        # Claim table location & lease settings.
+        self.queue_path = queue_path
+        self.lease_secs = lease_secs
+        self.max_attempts = max_attempts
+        self.timeout_secs = timeout_secs
+
+        # Autocommit mode -- transactions are managed explicitly w/ BEGIN IMMEDIATE.
+        self.conn = self._connect()
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS work (
+                                 item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                 dataset_type TEXT,
+                                 file_dir TEXT NOT NULL,
+                                 key_path TEXT NOT NULL,
+                                 mode TEXT NOT NULL DEFAULT 'file',
+                                 status TEXT NOT NULL DEFAULT 'pending',
+                                 worker_id TEXT,
+                                 claim_token TEXT,
+                                 lease_expires REAL,
+                                 attempts INTEGER NOT NULL DEFAULT 0,
+                                 last_error TEXT,
+                                 completed_at REAL,
+                                 size INTEGER,
+                                 batch_id INTEGER,
+                                 claimed_at REAL,
+                                 UNIQUE(file_dir, key_path))""")
+
+        # Columns added since the first claim tables were created.
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(work)")}
+        for column, column_type in [('size', 'INTEGER'), ('batch_id', 'INTEGER'), ('claimed_at', 'REAL')]:
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE work ADD COLUMN {column} {column_type}")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS work_status ON work(status, item_id)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS work_batch ON work(batch_id, status)")
+
+        # Expected makespan of the scheduled items (see populate_scheduled).
+        self.conn.execute("CREATE TABLE IF NOT EXISTS schedule (name TEXT PRIMARY KEY, summary TEXT)")
+
+    def _connect(self):
+        """
+        Open a connection to the claim table.
+
+        Args:
+            None
+
+        Return (sqlite3.Connection): Connection in autocommit mode.
+
+        """
+        conn = sqlite3.connect(self.queue_path, timeout=self.timeout_secs, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.execute("PRAGMA synchronous=FULL")
+
+        return conn
+
+    def populate(self, file_relative_dirs, mode='file'):
+        """
+        Write the work list into the claim table. Items already in the table are ignored
+        so the coordinator may be rerun safely.
+
+        Args:
+            file_relative_dirs (dict): Dictionary partitioning the file directories into the
+                                       dataset types (e.g. the partitions of GetSrwData).
+            mode (str): If set to 'file', items are uploaded w/ UploadData.upload_single_file.
+                        If set to 'folder', items (e.g. tar objects) are uploaded w/
+                        UploadData.upload_single_srw_folder.
+
+        Return (int): Number of items added to the claim table.
+
+        """
+        rows = []
+        for dataset_type, ts_files in file_relative_dirs.items():
+            for file_dir in ts_files:
+                rows.append((dataset_type, file_dir, file_dir, mode, None, None))
+
+        return self._insert(rows)
+
+    def populate_scheduled(self, schedule, mode='file'):
+        """
+        Write a size-aware schedule (see MakespanScheduler) into the claim table. The items
+        are inserted in the schedule's order & each task (a large data file, or a batch of
+        small data files) is claimed as a whole by one worker.
+
+        Args:
+            schedule (UploadSchedule): Tasks of ((dataset_type, file_dir), size) pairs.
+            mode (str): If set to 'file', items are uploaded w/ UploadData.upload_single_file.
+                        If set to 'folder', items (e.g. tar objects) are uploaded w/
+                        UploadData.upload_single_srw_folder.
+
+        Return (int): Number of items added to the claim table.
+
+        """
+        first_batch = self.conn.execute("SELECT COALESCE(MAX(batch_id), 0) + 1 FROM work").fetchone()[0]
+        rows = []
+        for batch_id, task in enumerate(schedule.tasks, first_batch):
+            for (dataset_type, file_dir), size in task:
+                rows.append((dataset_type, file_dir, file_dir, mode, size, batch_id))
+        added = self._insert(rows)
+        self.conn.execute("INSERT OR REPLACE INTO schedule (name, summary) VALUES ('latest', ?)",
+                          (json.dumps(schedule.summary()),))
+
+        return added
+
+    def populate_objects(self, object_dirs, key_paths=None):
+        """
+        Write a list of objects (e.g. tar folders) into the claim table.
+
+        Args:
+            object_dirs (list): Directory paths of the objects to transfer to cloud.
+            key_paths (list): Keys to set for the objects in cloud. If None, the key of each
+                              object will be set to its local directory location.
+
+        Return (int): Number of items added to the claim table.
+
+        """
+        if key_paths is None:
+            key_paths = object_dirs
+        rows = [(None, obj_dir, key_path, 'folder', None, None) for obj_dir, key_path in zip(object_dirs, key_paths)]
+
+        return self._insert(rows)
+
+    def _insert(self, rows):
+        """
+        Insert work items into the claim table within a single transaction.
+
+        Args:
+            rows (list): Tuples of (dataset_type, file_dir, key_path, mode, size, batch_id).
+
+        Return (int): Number of items added to the claim table.
+
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = self.conn.total_changes
+            self.conn.executemany("""INSERT OR IGNORE INTO work (dataset_type, file_dir, key_path, mode, size, batch_id)
+                                     VALUES (?, ?, ?, ?, ?, ?)""", rows)
+            added = self.conn.total_changes - before
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        print(f"Added {added} of {len(rows)} items to the work queue: {self.queue_path}")
+
+        return added
+
+    def claim_batch(self, worker_id, batch_size=50):
+        """
+        Claim a batch of pending items for a worker. Expired leases of abandoned items are
+        reclaimed before claiming.
+
+        Args:
+            worker_id (str): Unique name of the worker claiming the batch.
+            batch_size (int): Maximum number of items to claim. Scheduled items are instead
+                              claimed a whole task at a time (see populate_scheduled).
+
+        Return (list): List of dictionaries describing the claimed items (incl. the number
+        of times each was claimed -- an item claimed before may already be in cloud). Empty
+        once there is no more work left to claim.
+
+        """
+        now = time.time()
+        claim_token = uuid.uuid4().hex
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+
+            # Reclaim items from dead workers or mark them failed once out of attempts.
+            self.conn.execute("""UPDATE work SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                                                 last_error = 'lease expired (worker ' || worker_id || ')',
+                                                 claim_token = NULL
+                                 WHERE status = 'claimed' AND lease_expires < ?""", (self.max_attempts, now))
+
+            # Claim the next scheduled task, or else the oldest unscheduled pending items.
+            head = self.conn.execute("""SELECT batch_id FROM work WHERE status = 'pending'
+                                        ORDER BY item_id LIMIT 1""").fetchone()
+            if head is not None and head[0] is not None:
+                item_ids = [row[0] for row in self.conn.execute("""SELECT item_id FROM work WHERE status = 'pending'
+                                                                   AND batch_id = ? ORDER BY item_id""", head)]
+            else:
+                item_ids = [row[0] for row in self.conn.execute("""SELECT item_id FROM work WHERE status = 'pending'
+                                                                   AND batch_id IS NULL ORDER BY item_id LIMIT ?""",
+                                                                (batch_size,))]
+            self.conn.executemany("""UPDATE work SET status = 'claimed', worker_id = ?, claim_token = ?,
+                                                     lease_expires = ?, claimed_at = ?, attempts = attempts + 1
+                                     WHERE item_id = ?""",
+                                  [(worker_id, claim_token, now + self.lease_secs, now, item_id) for item_id in item_ids])
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        if not item_ids:
+            return []
+
+        # Claimed work items.
+        placeholders = ",".join("?" * len(item_ids))
+        cursor = self.conn.execute(f"""SELECT item_id, dataset_type, file_dir, key_path, mode, claim_token, attempts
+                                       FROM work WHERE item_id IN ({placeholders}) ORDER BY item_id""", item_ids)
+        columns = [col[0] for col in cursor.description]
+
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def renew_lease(self, claim_token, conn=None):
+        """
+        Extend the lease of all items held under a claim.
+
+        Args:
+            claim_token (str): Token returned w/ the claimed items.
+            conn (sqlite3.Connection): Connection to use. If None, the queue's connection is used.
+
+        Return (int): Number of items whose lease was extended.
+
+        """
+        conn = conn or self.conn
+        cursor = conn.execute("""UPDATE work SET lease_expires = ?
+                                 WHERE claim_token = ? AND status = 'claimed'""",
+                              (time.time() + self.lease_secs, claim_token))
+
+        return cursor.rowcount
+
+    def heartbeat(self, claim_token):
+        """
+        Keep the lease of a claimed batch alive while its items are being uploaded.
+
+        Args:
+            claim_token (str): Token returned w/ the claimed items.
+
+        Return (LeaseHeartbeat): Context manager renewing the lease in a background thread.
+
+        """
+        return LeaseHeartbeat(self, claim_token)
+
+    def mark_done(self, item_id, claim_token):
+        """
+        Record the completion of an item.
+
+        Args:
+            item_id (int): Item's ID within the claim table.
+            claim_token (str): Token returned w/ the claimed item.
+
+        Return (bool): True if the completion was recorded. False if the lease had already
+        expired & the item was reclaimed by another worker -- that worker checks for the
+        object before uploading, but may rewrite the same key w/ the same content if both
+        uploads overlap (delivery is at-least-once).
+
+        """
+        cursor = self.conn.execute("""UPDATE work SET status = 'done', completed_at = ?, last_error = NULL
+                                      WHERE item_id = ? AND claim_token = ? AND status = 'claimed'""",
+                                   (time.time(), item_id, claim_token))
+
+        return cursor.rowcount == 1
+
+    def mark_failed(self, item_id, claim_token, error):
+        """
+        Release an item after a failed upload. The item returns to the pending items until
+        it runs out of attempts.
+
+        Args:
+            item_id (int): Item's ID within the claim table.
+            claim_token (str): Token returned w/ the claimed item.
+            error (str): Error message to record for the item.
+
+        Return (bool): True if the failure was recorded. False if the lease had already
+        expired & the item was reclaimed by another worker.
+
+        """
+        cursor = self.conn.execute("""UPDATE work SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                                                      claim_token = NULL, last_error = ?
+                                      WHERE item_id = ? AND claim_token = ? AND status = 'claimed'""",
+                                   (self.max_attempts, str(error), item_id, claim_token))
+
+        return cursor.rowcount == 1
+
+    def progress(self):
+        """
+        Count the items in the claim table by status.
+
+        Args:
+            None
+
+        Return (dict): Number of items per status (pending, claimed, done, failed).
+
+        """
+        counts = {'pending': 0, 'claimed': 0, 'done': 0, 'failed': 0}
+        for status, count in self.conn.execute("SELECT status, COUNT(*) FROM work GROUP BY status"):
+            counts[status] = count
+
+        return counts
+
+    def makespan(self):
+        """
+        Compare the actual makespan of the completed items against the schedule's expected
+        makespan (if the items were scheduled).
+
+        Args:
+            None
+
+        Return (dict): Actual makespan (first claim to last completion), the spread
+        between the workers' last completions (time the earliest finishing worker sat idle),
+        the per-worker throughput & the schedule's expected makespans, in seconds.
+
+        """
+        workers = list(self.conn.execute("""SELECT worker_id, MIN(claimed_at), MAX(completed_at), SUM(size)
+                                            FROM work WHERE status = 'done' GROUP BY worker_id"""))
+        report = {'workers': len(workers)}
+        if workers:
+            starts = [w[1] for w in workers if w[1] is not None]
+            finishes = [w[2] for w in workers]
+            report['actual_makespan'] = max(finishes) - min(starts) if starts else None
+            report['finish_spread'] = max(finishes) - min(finishes)
+            busy = sum(w[2] - w[1] for w in workers if w[1] is not None)
+            sized = sum(w[3] or 0 for w in workers)
+            report['throughput_per_worker'] = sized / busy if busy > 0 and sized else None
+        row = self.conn.execute("SELECT summary FROM schedule WHERE name = 'latest'").fetchone()
+        if row is not None:
+            report['schedule'] = json.loads(row[0])
+
+        return report
+
+    def failed_items(self):
+        """
+        List the items which ran out of attempts.
+
+        Args:
+            None
+
+        Return (list): List of (file_dir, key_path, last_error) tuples.
+
+        """
+        return list(self.conn.execute("""SELECT file_dir, key_path, last_error FROM work
+                                         WHERE status = 'failed' ORDER BY item_id"""))
+
+    def close(self):
+        """
+        Close the connection to the claim table.
+
+        Args:
+            None
+
+        Return: None
+
+        """
+        self.conn.close()
+
+        return
+
+
+class LeaseHeartbeat():
+    """
+    Renew the lease of a claimed batch in a background thread so long running uploads
+    (e.g. multi-GB tar objects) are not reclaimed by other workers.
+
+    """
+
+    def __init__(self, work_queue, claim_token):
+        """
+        Args:
+            work_queue (UploadWorkQueue): Work queue the batch was claimed from.
+            claim_token (str): Token returned w/ the claimed items.
+
+        """
+        self.work_queue = work_queue
+        self.claim_token = claim_token
+
+        # Renew well before the lease expires.
+        self.interval = max(1, work_queue.lease_secs / 3)
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        """
+        Renew the lease until stopped. SQLite connections may not be shared across threads,
+        hence the heartbeat opens its own connection.
+
+        """
+        conn = self.work_queue._connect()
+        try:
+            while not self.stop_event.wait(self.interval):
+                try:
+                    self.work_queue.renew_lease(self.claim_token, conn)
+                except sqlite3.OperationalError as e:
+                    print(f"\nUnable to renew lease {self.claim_token}: {e}")
+        finally:
+            conn.close()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop_event.set()
+        self.thread.join()
+        return False
+
+
+def default_worker_id():
+    """
+    Establish a unique worker name from the Slurm array task (if any), host & process.
+
+    Args:
+        None
+
+    Return (str): Worker name.
+
+    """
+    slurm_task = os.environ.get('SLURM_ARRAY_TASK_ID')
+    slurm_job = os.environ.get('SLURM_ARRAY_JOB_ID', os.environ.get('SLURM_JOB_ID'))
+    prefix = f"{slurm_job}_{slurm_task}@" if slurm_task is not None else ""
+
+    return f"{prefix}{socket.gethostname()}:{os.getpid()}"